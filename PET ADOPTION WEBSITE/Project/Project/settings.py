@@ -1,5 +1,6 @@
 from pathlib import Path
 import os
+import tempfile
 
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -29,12 +30,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'app.middleware.RequestProfilingMiddleware',
+    'app.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'app.middleware.ReplicaPinningMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'app.middleware.ProfilerMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -60,12 +65,101 @@ WSGI_APPLICATION = 'Project.wsgi.application'
 
 
 
+# Connections are kept open between requests (and health-checked before reuse)
+# so the PRAGMA profile in SQLITE_PRAGMAS is paid once per worker thread.
+# IMMEDIATE transactions take the write lock up front: a deferred transaction
+# that reads and then writes cannot wait on busy_timeout and fails straight
+# away with "database is locked".
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+        },
+        # An on-disk test database locks like production (WAL, busy_timeout);
+        # the in-memory default fails concurrent writers instead of queueing them.
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
+    }
+}
+
+# Read replicas. SQLITE_REPLICAS=2 adds file copies db.replica1.sqlite3 and
+# db.replica2.sqlite3, refreshed from the primary with `manage.py sync_replicas`.
+# Replicas lag until the next sync, so schedule it (e.g. from cron every minute).
+REPLICA_DATABASES = []
+for n in range(1, int(os.environ.get('SQLITE_REPLICAS', '0')) + 1):
+    DATABASES[f'replica{n}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / f'db.replica{n}.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'TEST': {'MIRROR': 'default'},
     }
+    REPLICA_DATABASES.append(f'replica{n}')
+
+DATABASE_ROUTERS = ['app.routers.PrimaryReplicaRouter']
+
+# A visitor whose request wrote reads the primary until the next sync_replicas
+# run. This caps the pin cookie's lifetime and should be far longer than the
+# sync interval: a visitor whose pin expires first reads the stale replica.
+REPLICA_PIN_MAX_SECONDS = 24 * 3600
+
+# Applied to every new SQLite connection by app.db.configure_connection.
+# WAL lets readers run alongside the single writer; synchronous=NORMAL is
+# durable across application crashes in WAL mode and skips an fsync per commit.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'busy_timeout': 5000,
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64000,
+    'temp_store': 'MEMORY',
+}
+
+
+# Home page stats, featured pets, image records and the version stamps behind
+# ETag/Last-Modified are kept without a TTL and changed from model signals,
+# management commands and `runworker`, so every process must share this cache:
+# files are shared on one host; use Redis/memcached across hosts.
+CACHES = {
+    'default': {
+        'BACKEND': 'app.cache_backends.InstrumentedFileBasedCache',
+        'LOCATION': os.environ.get('CACHE_DIR', os.path.join(tempfile.gettempdir(), 'petadopt-cache')),
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+    # Rendered pet cards ({% cache ... using="fragments" %}). Keys carry the
+    # pet's updated_at and the breed/image stamps, so entries are never
+    # invalidated, only superseded; a per-process cache is fine here.
+    'fragments': {
+        'BACKEND': 'app.cache_backends.InstrumentedLocMemCache',
+        'LOCATION': 'petadopt-fragments',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+    # Session cache for SESSION_STORE = 'cached_db'. It must be shared by all
+    # worker processes: files are, on one host; use Redis/memcached across hosts.
+    'sessions': {
+        'BACKEND': 'app.cache_backends.InstrumentedFileBasedCache',
+        'LOCATION': os.environ.get('SESSION_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'petadopt-sessions')),
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+}
+
+# Where sessions live (compare them with `manage.py benchmark_sessions`):
+# 'cached_db' reads through the sessions cache and writes through to
+# django_session, 'db' uses only the table, 'signed_cookies' keeps no state
+# on the server (a session cannot be revoked before it expires).
+SESSION_STORE = os.environ.get('SESSION_STORE', 'cached_db')
+SESSION_ENGINES = {
+    'cached_db': 'app.sessions',
+    'db': 'django.contrib.sessions.backends.db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
 }
+SESSION_ENGINE = SESSION_ENGINES[SESSION_STORE]
+SESSION_CACHE_ALIAS = 'sessions'
 
 
 
@@ -108,6 +202,39 @@ MEDIA_ROOT = BASE_DIR / 'media'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
+# Share of requests profiled by app.middleware.RequestProfilingMiddleware
+# (Server-Timing header plus a JSON line on the app.requests logger); 0 turns it off.
+REQUEST_PROFILING_SAMPLE_RATE = float(os.environ.get('REQUEST_PROFILING_SAMPLE_RATE', '0.1'))
+
+# /metrics: each worker process writes its counters here and a scrape merges
+# them. Clear the directory on deploy/restart so exited workers' files go away.
+METRICS_DIR = os.environ.get('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'petadopt-metrics'))
+METRICS_ALLOWED_IPS = os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')
+
+# Profiles taken with ?_profile=1 by staff (app.middleware.ProfilerMiddleware).
+PROFILES_DIR = os.environ.get('PROFILES_DIR', os.path.join(tempfile.gettempdir(), 'petadopt-profiles'))
+
+# Profiled requests log at INFO, or WARNING when slow or repeating a query;
+# set REQUEST_LOG_LEVEL=INFO to see every profiled request.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'requests': {'class': 'logging.StreamHandler', 'formatter': 'message'},
+    },
+    'loggers': {
+        'app.requests': {
+            'handlers': ['requests'],
+            'level': os.environ.get('REQUEST_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
+
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'home'
 LOGOUT_REDIRECT_URL = 'home'
@@ -1,5 +1,30 @@
-from django.contrib import admin
-from .models import Breed, Pet, UserProfile, AdoptionRequest, Review
+from django.contrib import admin, messages
+from .models import Breed, Pet, UserProfile, AdoptionRequest, Review, Job
+from .pagination import EstimatedCountPaginator
+from . import adoptions, jobs
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelist settings for tables that grow without bound.
+
+    No exact ``COUNT(*)`` of the table per page view (``EstimatedCountPaginator``
+    and no "N total" count), and list_display relations joined in up front.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+class TaskFilter(admin.SimpleListFilter):
+    """Choices from the registered tasks, not a ``SELECT DISTINCT`` over every job."""
+    title = 'task'
+    parameter_name = 'task'
+
+    def lookups(self, request, model_admin):
+        return [(name, name) for name in jobs.task_names()]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(task=self.value())
+        return queryset
 
 @admin.register(Breed)
 class BreedAdmin(admin.ModelAdmin):
@@ -9,30 +34,58 @@ class BreedAdmin(admin.ModelAdmin):
     readonly_fields = ['created_at']
 
 @admin.register(Pet)
-class PetAdmin(admin.ModelAdmin):
+class PetAdmin(LargeTableAdmin):
     list_display = ['name', 'breed', 'age', 'status', 'gender', 'created_at']
     list_filter = ['status', 'gender', 'breed', 'created_at']
+    list_select_related = ['breed']
     search_fields = ['name', 'breed__name']
+    autocomplete_fields = ['breed', 'posted_by']
     readonly_fields = ['created_at', 'updated_at', 'arrival_date']
 
 @admin.register(UserProfile)
-class UserProfileAdmin(admin.ModelAdmin):
+class UserProfileAdmin(LargeTableAdmin):
     list_display = ['user', 'city', 'is_verified', 'created_at']
     list_filter = ['is_verified', 'created_at']
+    list_select_related = ['user']
     search_fields = ['user__username', 'city']
+    autocomplete_fields = ['user']
     readonly_fields = ['created_at', 'updated_at']
 
 @admin.register(AdoptionRequest)
-class AdoptionRequestAdmin(admin.ModelAdmin):
+class AdoptionRequestAdmin(LargeTableAdmin):
     list_display = ['requester', 'pet', 'status', 'requested_date']
     list_filter = ['status', 'requested_date']
+    list_select_related = ['requester', 'pet__breed']
     search_fields = ['requester__username', 'pet__name']
+    autocomplete_fields = ['pet', 'requester']
     readonly_fields = ['requested_date', 'updated_date']
+    actions = ['approve_selected', 'reject_selected']
+
+    @admin.action(description='Approve selected requests (one per pet, competing requests rejected)',
+                  permissions=['change'])
+    def approve_selected(self, request, queryset):
+        approved, rejected = adoptions.approve_many(queryset)
+        self.message_user(
+            request, f'{approved} request(s) approved, {rejected} competing request(s) rejected.', messages.SUCCESS,
+        )
+
+    @admin.action(description='Reject selected pending requests', permissions=['change'])
+    def reject_selected(self, request, queryset):
+        rejected = adoptions.reject_many(queryset)
+        self.message_user(request, f'{rejected} request(s) rejected.', messages.SUCCESS)
 
 @admin.register(Review)
-class ReviewAdmin(admin.ModelAdmin):
+class ReviewAdmin(LargeTableAdmin):
     list_display = ['author', 'pet', 'rating', 'created_at']
     list_filter = ['rating', 'created_at']
+    list_select_related = ['author', 'pet__breed']
     search_fields = ['author__username', 'pet__name', 'title']
+    autocomplete_fields = ['pet', 'author']
     readonly_fields = ['created_at', 'updated_at']
 
+@admin.register(Job)
+class JobAdmin(LargeTableAdmin):
+    list_display = ['task', 'status', 'attempts', 'run_after', 'created_at', 'finished_at']
+    list_filter = ['status', TaskFilter]
+    search_fields = ['task', 'idempotency_key']
+    readonly_fields = ['created_at', 'updated_at', 'finished_at', 'locked_by', 'locked_until']
@@ -0,0 +1,105 @@
+"""Approving an adoption request as one transaction.
+
+The pet row is locked before anything is read, so two staff members approving
+competing requests for the same pet serialize: the first commits, the second
+sees the pet already adopted and gets ``ApprovalConflict``. (SQLite has no
+``SELECT ... FOR UPDATE``; there the default connection's ``BEGIN IMMEDIATE``
+takes the write lock up front, which serializes the same way.)
+
+``approve_many`` and ``reject_many`` do the same for a whole selection (the
+admin's bulk actions) with a fixed number of UPDATE statements rather than
+one transaction per request.
+"""
+from django.db import router, transaction
+from django.utils import timezone
+
+from . import caching, counters
+from .models import Pet, AdoptionRequest
+
+
+class ApprovalConflict(Exception):
+    pass
+
+
+def approve(adoption_request_id):
+    """Approve one pending request, adopt its pet and reject every other pending request for it.
+
+    Returns ``(adoption_request, rejected_count)``.
+    """
+    using = router.db_for_write(AdoptionRequest)
+    requests = AdoptionRequest.objects.using(using)
+    pet_id = requests.values_list('pet_id', flat=True).get(pk=adoption_request_id)
+    with transaction.atomic(using=using):
+        pet = Pet.objects.using(using).select_for_update().get(pk=pet_id)
+        adoption_request = requests.select_for_update().get(pk=adoption_request_id)
+        if pet.status == 'adopted':
+            raise ApprovalConflict(f"{pet.name} has already been adopted.")
+        if adoption_request.status != 'pending':
+            raise ApprovalConflict(f"This request is already {adoption_request.get_status_display().lower()}.")
+
+        adoption_request.status = 'approved'
+        adoption_request.save(update_fields=['status', 'updated_date'])
+
+        competing = requests.filter(pet_id=pet_id, status='pending').exclude(pk=adoption_request_id)
+        previous = list(competing.values_list('pet_id', 'status'))
+        rejected = competing.update(status='rejected', updated_date=timezone.now())
+        # update() skips the signals that keep the pet's request counters current.
+        counters.record_bulk_update(AdoptionRequest, previous, status='rejected')
+
+        pet.status = 'adopted'
+        pet.save(update_fields=['status', 'updated_at'])
+    adoption_request.pet = pet
+    return adoption_request, rejected
+
+
+def approve_many(queryset):
+    """Approve the pending requests in ``queryset`` as ``approve`` would, a few UPDATEs in all.
+
+    A pet is adopted by at most one request: the earliest selected one. Every
+    other pending request for the adopted pets is rejected, and requests for
+    pets that were already adopted are left alone. Returns
+    ``(approved_count, rejected_count)``.
+    """
+    using = router.db_for_write(AdoptionRequest)
+    requests = AdoptionRequest.objects.using(using)
+    pets = Pet.objects.using(using)
+    with transaction.atomic(using=using):
+        candidates = (
+            queryset.using(using).select_for_update().filter(status='pending')
+            .exclude(pet__status='adopted').order_by('requested_date', 'pk').values_list('pet_id', 'pk')
+        )
+        chosen = {}
+        for pet_id, pk in candidates:
+            chosen.setdefault(pet_id, pk)
+        if not chosen:
+            return 0, 0
+        now = timezone.now()
+
+        adopted = pets.filter(pk__in=chosen)
+        previous_pets = list(adopted.values_list('breed_id', 'status'))
+        adopted.update(status='adopted', updated_at=now)
+        counters.record_bulk_update(Pet, previous_pets, status='adopted')
+
+        approved = requests.filter(pk__in=chosen.values()).update(status='approved', updated_date=now)
+        counters.record_bulk_update(AdoptionRequest, [(pet_id, 'pending') for pet_id in chosen], status='approved')
+
+        competing = requests.filter(pet_id__in=chosen, status='pending')
+        previous = list(competing.values_list('pet_id', 'status'))
+        rejected = competing.update(status='rejected', updated_date=now)
+        counters.record_bulk_update(AdoptionRequest, previous, status='rejected')
+    # The pets and requests changed status without their save signals.
+    caching.catalog_bulk_changed()
+    caching.adoption_requests_bulk_changed(chosen)
+    return approved, rejected
+
+
+def reject_many(queryset):
+    """Reject the pending requests in ``queryset`` with one UPDATE; return how many were rejected."""
+    using = router.db_for_write(AdoptionRequest)
+    with transaction.atomic(using=using):
+        pending = queryset.using(using).filter(status='pending')
+        previous = list(pending.values_list('pet_id', 'status'))
+        rejected = pending.update(status='rejected', updated_date=timezone.now())
+        counters.record_bulk_update(AdoptionRequest, previous, status='rejected')
+    caching.adoption_requests_bulk_changed(pet_id for pet_id, _ in previous)
+    return rejected
@@ -6,4 +6,5 @@ class AppConfig(AppConfig):
     name = 'app'
     
     def ready(self):
+        import app.checks
         import app.signals
@@ -0,0 +1,76 @@
+"""In-memory prefix index over breed names, for autocomplete and canonical names.
+
+Names are normalized case-insensitively with punctuation folded to spaces, so
+"golden-retriever" and "Golden Retriever" are the same breed. The index is a
+sorted array with one entry per word start ("golden retriever", "retriever"),
+so a lookup is a bisect plus a short scan. Each process builds it once and
+rebuilds it when the breeds stamp in ``app.caching`` moves, i.e. after any
+breed is saved, deleted or bulk-imported in any process, as long as the
+default cache holding the stamp is shared (check ``app.W001``). A change
+made while a request is already using the index is seen on the next one,
+so callers that store a matched id confirm it first (``BreedFieldMixin``).
+"""
+import re
+import threading
+from bisect import bisect_left
+
+from . import caching
+from .models import Breed
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def normalize(name):
+    return ' '.join(re.findall(r'\w+', (name or '').casefold()))
+
+
+class BreedIndex:
+
+    def __init__(self, breeds, version=None):
+        self.version = version
+        self.by_key = {}
+        entries = []
+        for pk, name in breeds:
+            key = normalize(name)
+            if not key:
+                continue
+            self.by_key.setdefault(key, (pk, name))
+            words = key.split(' ')
+            for position in range(len(words)):
+                entries.append((' '.join(words[position:]), position, name, pk))
+        entries.sort()
+        self.entries = entries
+
+    def canonical(self, name):
+        """Return ``(id, name)`` of the existing breed ``name`` normalizes to, or ``None``."""
+        return self.by_key.get(normalize(name))
+
+    def search(self, query, limit=10):
+        """Breeds whose name, or a word in it, starts with ``query``; whole-name matches first."""
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        matches = {}
+        start = bisect_left(self.entries, (prefix,))
+        for key, position, name, pk in self.entries[start:]:
+            if not key.startswith(prefix):
+                break
+            if pk not in matches or position < matches[pk][0]:
+                matches[pk] = (position, name)
+        ranked = sorted(matches.items(), key=lambda item: (item[1][0], item[1][1].casefold()))
+        return [{'id': pk, 'name': name} for pk, (_, name) in ranked[:limit]]
+
+
+def get_index():
+    """Return the current index, rebuilding it if breeds changed since it was built."""
+    global _index
+    version = caching.get_stamp(caching.BREEDS_STAMP_KEY)
+    index = _index
+    if index is None or index.version != version:
+        with _lock:
+            if _index is None or _index.version != version:
+                _index = BreedIndex(Breed.objects.values_list('pk', 'name'), version)
+            index = _index
+    return index
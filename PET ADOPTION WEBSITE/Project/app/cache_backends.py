@@ -0,0 +1,45 @@
+"""Cache backends that count hits and misses for ``/metrics``."""
+import itertools
+import os
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from . import metrics
+
+
+class CountingCacheMixin:
+    """Record each lookup under the last part of the cache's ``LOCATION``.
+
+    ``get_many`` on these backends goes through ``get``.
+    """
+
+    def __init__(self, name, params):
+        super().__init__(name, params)
+        self.metrics_name = os.path.basename(str(name).rstrip('/\\')) or 'default'
+
+    def get(self, key, default=None, version=None):
+        sentinel = object()
+        value = super().get(key, sentinel, version)
+        hit = value is not sentinel
+        metrics.record_cache_lookup(self.metrics_name, int(hit), int(not hit))
+        return value if hit else default
+
+
+class InstrumentedLocMemCache(CountingCacheMixin, LocMemCache):
+    pass
+
+
+class InstrumentedFileBasedCache(CountingCacheMixin, FileBasedCache):
+    """File cache that checks ``MAX_ENTRIES`` every ``cull_every`` writes instead of on each one.
+
+    Django's check lists the whole cache directory, which made every login
+    (a session write) slower as the session cache filled up.
+    """
+
+    cull_every = 100
+    _writes = itertools.count()
+
+    def _cull(self):
+        if next(self._writes) % self.cull_every == 0:
+            super()._cull()
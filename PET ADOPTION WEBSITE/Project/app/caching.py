@@ -0,0 +1,110 @@
+import time
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from .models import Pet, AdoptionRequest
+
+
+HOME_STATS_KEY = 'home:stats'
+FEATURED_PETS_KEY = 'home:featured_pets'
+FEATURED_PETS_COUNT = 6
+
+# Version stamps (time of the last change) used as HTTP validators.
+CATALOG_STAMP_KEY = 'stamp:catalog'
+BREEDS_STAMP_KEY = 'stamp:breeds'
+# Moves whenever new image derivatives are written (they change every srcset).
+IMAGES_STAMP_KEY = 'stamp:images'
+
+
+def pet_stamp_key(pet_id):
+    return f'stamp:pet:{pet_id}'
+
+
+def _primary(model):
+    # Entries live until invalidated, so they are never filled from a lagging replica.
+    return model.objects.using(DEFAULT_DB_ALIAS)
+
+
+def get_home_stats():
+    """Landing page totals, cached until a pet or adoption request changes."""
+    stats = cache.get(HOME_STATS_KEY)
+    if stats is None:
+        stats = {
+            'total_pets': _primary(Pet).filter(status='available').count(),
+            'total_adoptions': _primary(AdoptionRequest).filter(status='approved').count(),
+        }
+        cache.set(HOME_STATS_KEY, stats, None)
+    return stats
+
+
+def get_featured_pets():
+    pets = cache.get(FEATURED_PETS_KEY)
+    if pets is None:
+        pets = list(
+            _primary(Pet).filter(status='available')
+            .select_related('breed')
+            .order_by('-created_at')[:FEATURED_PETS_COUNT]
+        )
+        cache.set(FEATURED_PETS_KEY, pets, None)
+    return pets
+
+
+def invalidate(*keys):
+    """Drop ``keys`` now and again once the surrounding transaction commits.
+
+    The second delete covers a reader that repopulated the cache from the
+    pre-commit state in between.
+    """
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def get_stamp(key):
+    """Return when the resource behind ``key`` last changed, as a Unix timestamp.
+
+    A missing stamp (cold or evicted cache) is treated as "changed now", which
+    only costs clients one full response.
+    """
+    stamp = cache.get(key)
+    if stamp is None:
+        cache.add(key, time.time(), None)
+        stamp = cache.get(key)
+    return stamp
+
+
+def bump(*keys):
+    """Record a change now and again once the surrounding transaction commits."""
+    cache.set_many({key: time.time() for key in keys}, None)
+    transaction.on_commit(lambda: cache.set_many({key: time.time() for key in keys}, None))
+
+
+def pet_changed(pet):
+    invalidate(HOME_STATS_KEY, FEATURED_PETS_KEY)
+    bump(CATALOG_STAMP_KEY, pet_stamp_key(pet.pk))
+
+
+def adoption_request_changed(adoption_request):
+    invalidate(HOME_STATS_KEY)
+    bump(pet_stamp_key(adoption_request.pet_id))
+
+
+def adoption_requests_bulk_changed(pet_ids):
+    """For request updates that bypass model signals; ``pet_ids`` are the pets they belong to."""
+    invalidate(HOME_STATS_KEY)
+    bump(*(pet_stamp_key(pet_id) for pet_id in set(pet_ids)))
+
+
+def review_changed(review):
+    bump(pet_stamp_key(review.pet_id))
+
+
+def breed_changed():
+    invalidate(FEATURED_PETS_KEY)
+    bump(CATALOG_STAMP_KEY, BREEDS_STAMP_KEY)
+
+
+def catalog_bulk_changed():
+    """For writes that bypass model signals (``bulk_create``, ``update()``)."""
+    invalidate(HOME_STATS_KEY, FEATURED_PETS_KEY)
+    bump(CATALOG_STAMP_KEY, BREEDS_STAMP_KEY)
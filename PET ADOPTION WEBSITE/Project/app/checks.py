@@ -0,0 +1,22 @@
+"""System checks for settings the app depends on."""
+from django.conf import settings
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Tags, Warning, register
+from django.utils.module_loading import import_string
+
+
+@register(Tags.caches)
+def check_default_cache_is_shared(app_configs, **kwargs):
+    backend = import_string(settings.CACHES['default']['BACKEND'])
+    if issubclass(backend, (LocMemCache, DummyCache)):
+        return [Warning(
+            "CACHES['default'] is local to each process.",
+            hint=(
+                'The version stamps behind ETag/Last-Modified and the cache invalidations in '
+                'app.caching would only reach the process that made the change, so other '
+                'workers would answer 304 for changed resources. Use a shared backend.'
+            ),
+            id='app.W001',
+        )]
+    return []
@@ -0,0 +1,62 @@
+"""ETag / Last-Modified validators for ``django.views.decorators.http.condition``.
+
+Every validator is built from the version stamps in ``app.caching``, so a
+conditional GET is answered from the cache without running the view's queries.
+The stamps must live in a cache shared by every process (check ``app.W001``):
+a stamp bumped only in the writer's own memory would let the other workers
+answer 304 for a resource that changed.
+
+Only the JSON API is validated this way. The HTML pages also carry a CSRF
+token and one-shot flash messages, neither of which the stamps describe.
+"""
+import hashlib
+from datetime import datetime, timezone
+
+from django.views.decorators.http import condition
+
+from . import caching
+
+
+def _last_modified(*keys):
+    return datetime.fromtimestamp(max(caching.get_stamp(key) for key in keys), tz=timezone.utc)
+
+
+def _etag(*parts):
+    return hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def catalog_etag(request, *args, **kwargs):
+    # The body depends on the filters, the cursor and the negotiated format,
+    # and on which image derivatives exist (the srcsets).
+    return _etag(
+        caching.get_stamp(caching.CATALOG_STAMP_KEY),
+        caching.get_stamp(caching.IMAGES_STAMP_KEY),
+        request.GET.urlencode(),
+        request.headers.get('Accept', ''),
+    )
+
+
+def catalog_last_modified(request, *args, **kwargs):
+    return _last_modified(caching.CATALOG_STAMP_KEY, caching.IMAGES_STAMP_KEY)
+
+
+def _pet_keys(kwargs):
+    pet_id = kwargs.get('pet_id', kwargs.get('pk'))
+    return caching.pet_stamp_key(pet_id), caching.BREEDS_STAMP_KEY, caching.IMAGES_STAMP_KEY
+
+
+def pet_etag(request, *args, **kwargs):
+    return _etag(*(caching.get_stamp(key) for key in _pet_keys(kwargs)))
+
+
+def breeds_etag(request, *args, **kwargs):
+    return _etag(caching.get_stamp(caching.BREEDS_STAMP_KEY), request.GET.urlencode())
+
+
+def pet_last_modified(request, *args, **kwargs):
+    return _last_modified(*_pet_keys(kwargs))
+
+
+catalog_condition = condition(etag_func=catalog_etag, last_modified_func=catalog_last_modified)
+breeds_condition = condition(etag_func=breeds_etag)
+pet_condition = condition(etag_func=pet_etag, last_modified_func=pet_last_modified)
@@ -0,0 +1,162 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+
+from .models import Pet, Breed, AdoptionRequest, Review
+
+
+def review_contribution(pet_id, rating):
+    return Pet, pet_id, {'review_count': 1, 'rating_sum': rating}
+
+
+def adoption_request_contribution(pet_id, status):
+    deltas = {'adoption_request_count': 1}
+    if status == 'pending':
+        deltas['pending_request_count'] = 1
+    elif status == 'approved':
+        deltas['approved_request_count'] = 1
+    return Pet, pet_id, deltas
+
+
+def pet_contribution(breed_id, status):
+    return Breed, breed_id, {'available_pets': 1} if status == 'available' else {}
+
+
+# Source model -> (columns the counters depend on, contribution of one row).
+TRACKED = {
+    Review: (('pet_id', 'rating'), review_contribution),
+    AdoptionRequest: (('pet_id', 'status'), adoption_request_contribution),
+    Pet: (('breed_id', 'status'), pet_contribution),
+}
+
+
+def _values(instance):
+    fields, _ = TRACKED[type(instance)]
+    return tuple(getattr(instance, field) for field in fields)
+
+
+def _apply(changes):
+    """Run one UPDATE per target row with the non-zero net deltas."""
+    for (model, pk), deltas in changes.items():
+        updates = {name: F(name) + value for name, value in deltas.items() if value}
+        if pk is not None and updates:
+            model._base_manager.filter(pk=pk).update(**updates)
+
+
+def _accumulate(changes, contribution, sign):
+    model, pk, deltas = contribution
+    target = changes.setdefault((model, pk), Counter())
+    for name, value in deltas.items():
+        target[name] += sign * value
+
+
+def remember_previous(instance, update_fields=None, using=None):
+    """Capture the row's counted columns before it is overwritten (pre_save).
+
+    The row is locked until the save commits (``AtomicSaveMixin`` opens the
+    transaction), so a concurrent save waits and then reads the new values.
+    """
+    fields, _ = TRACKED[type(instance)]
+    instance._counter_previous = None
+    if instance._state.adding:
+        return
+    if update_fields is not None and not set(fields) & {
+        instance._meta.get_field(name).attname for name in update_fields
+    }:
+        instance._counter_previous = _values(instance)
+        return
+    rows = type(instance)._base_manager.using(using).filter(pk=instance.pk)
+    if transaction.get_connection(using).in_atomic_block:
+        rows = rows.select_for_update()
+    instance._counter_previous = rows.values_list(*fields).first()
+
+
+def record_save(instance):
+    """Move the instance's contribution from its previous values to its current ones (post_save)."""
+    _, contribution = TRACKED[type(instance)]
+    changes = {}
+    previous = getattr(instance, '_counter_previous', None)
+    if previous is not None:
+        _accumulate(changes, contribution(*previous), -1)
+    _accumulate(changes, contribution(*_values(instance)), 1)
+    _apply(changes)
+    instance._counter_previous = None
+
+
+def record_bulk_create(instances):
+    """Add the contribution of rows inserted with ``bulk_create``, one UPDATE per target row."""
+    changes = {}
+    for instance in instances:
+        _, contribution = TRACKED[type(instance)]
+        _accumulate(changes, contribution(*_values(instance)), 1)
+    _apply(changes)
+
+
+def record_bulk_update(model, previous, **values):
+    """Move the contribution of rows changed with ``update(**values)``.
+
+    ``previous`` holds each row's counted columns as they were before the update.
+    """
+    fields, contribution = TRACKED[model]
+    changes = {}
+    for row in previous:
+        _accumulate(changes, contribution(*row), -1)
+        current = tuple(values.get(field, value) for field, value in zip(fields, row))
+        _accumulate(changes, contribution(*current), 1)
+    _apply(changes)
+
+
+def record_delete(instance):
+    _, contribution = TRACKED[type(instance)]
+    changes = {}
+    _accumulate(changes, contribution(*_values(instance)), -1)
+    _apply(changes)
+
+
+def expected_pet_counters(pks=None):
+    """Recompute every pet counter (or those of ``pks``) from the source tables, keyed by pet id."""
+    expected = {}
+    reviews, requests = Review.objects.all(), AdoptionRequest.objects.all()
+    if pks is not None:
+        reviews, requests = reviews.filter(pet_id__in=pks), requests.filter(pet_id__in=pks)
+    reviews = reviews.values('pet_id').annotate(
+        review_count=Count('id'), rating_sum=Sum('rating'),
+    ).order_by()
+    for row in reviews:
+        expected.setdefault(row.pop('pet_id'), {}).update(row)
+    requests = requests.values('pet_id').annotate(
+        adoption_request_count=Count('id'),
+        pending_request_count=Count('id', filter=Q(status='pending')),
+        approved_request_count=Count('id', filter=Q(status='approved')),
+    ).order_by()
+    for row in requests:
+        expected.setdefault(row.pop('pet_id'), {}).update(row)
+    return expected
+
+
+def expected_breed_counters(pks=None):
+    rows = Pet.objects.filter(status='available')
+    if pks is not None:
+        rows = rows.filter(breed_id__in=pks)
+    rows = rows.values('breed_id').annotate(
+        available_pets=Count('id'),
+    ).order_by()
+    return {row['breed_id']: {'available_pets': row['available_pets']} for row in rows}
+
+
+def find_drift(model, expected, batch_size=2000, pks=None):
+    """Yield ``(instance, {field: (stored, expected)})`` for rows (all, or ``pks``) whose counters disagree."""
+    fields = model.counter_fields
+    rows = model._base_manager.only('pk', *fields)
+    if pks is not None:
+        rows = rows.filter(pk__in=pks)
+    for instance in rows.iterator(chunk_size=batch_size):
+        wanted = expected.get(instance.pk, {})
+        diff = {
+            field: (getattr(instance, field), wanted.get(field, 0))
+            for field in fields
+            if getattr(instance, field) != wanted.get(field, 0)
+        }
+        if diff:
+            yield instance, diff
@@ -0,0 +1,32 @@
+"""Per-connection SQLite tuning.
+
+``configure_connection`` runs from the ``connection_created`` signal and applies
+``settings.SQLITE_PRAGMAS`` to every new SQLite connection, primary and
+replicas alike. With persistent connections (``CONN_MAX_AGE``) that happens
+once per worker thread rather than once per request.
+"""
+from django.conf import settings
+
+
+def get_pragmas():
+    return getattr(settings, 'SQLITE_PRAGMAS', {})
+
+
+def configure_connection(connection, pragmas=None):
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = get_pragmas() if pragmas is None else pragmas
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def read_pragmas(connection, names=None):
+    """Return the effective value of each pragma, e.g. to check a deployment."""
+    with connection.cursor() as cursor:
+        values = {}
+        for name in names or get_pragmas():
+            cursor.execute(f'PRAGMA {name}')
+            row = cursor.fetchone()
+            values[name] = row[0] if row else None
+        return values
@@ -0,0 +1,168 @@
+"""Breed, gender, breed size and age facets for the pet browse page and API.
+
+One grouped aggregate over (breed, gender, age bucket) is run per status and
+search text and cached against the catalog stamp. The per-facet counts are
+rolled up from those rows in Python: each facet counts the pets matching
+every *other* active filter, so "Labrador (42)" stays meaningful while a
+different breed is selected.
+"""
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.db.models import Case, Count, IntegerField, Value, When
+from django.db.models.functions import Lower
+
+from . import caching
+from .models import Pet, Breed
+from .search import filter_matches, search_pets
+
+
+# (key, label, youngest, oldest); ``None`` leaves the bucket open-ended.
+AGE_BUCKETS = [
+    ('baby', 'Under 1 year', 0, 0),
+    ('young', '1-3 years', 1, 3),
+    ('adult', '4-7 years', 4, 7),
+    ('senior', '8+ years', 8, None),
+]
+FACET_CACHE_TIMEOUT = 600
+
+GENDER_CHOICES = Pet._meta.get_field('gender').choices
+SIZE_CHOICES = Breed._meta.get_field('size').choices
+
+
+def _age_range(bucket):
+    for key, _, youngest, oldest in AGE_BUCKETS:
+        if key == bucket:
+            return youngest, oldest
+    return None
+
+
+def normalize_filters(params, status=None):
+    """Canonical filters from browse-page (``breed``, ``q``) or API (``breed_id``, ``search``) params.
+
+    Values are trimmed and lower-cased, unknown choices are dropped, and
+    ``status`` overrides whatever the request asked for.
+    """
+    def clean(name):
+        return ' '.join((params.get(name) or '').split()).lower()
+
+    filters = {
+        'status': status or clean('status') or 'available',
+        'q': clean('q') or clean('search'),
+        'breed': clean('breed'),
+        'gender': clean('gender'),
+        'size': clean('size'),
+        'age': clean('age'),
+    }
+    try:
+        filters['breed_id'] = int(params.get('breed_id'))
+    except (TypeError, ValueError):
+        pass
+    if filters['gender'] not in dict(GENDER_CHOICES):
+        filters['gender'] = ''
+    if filters['size'] not in dict(SIZE_CHOICES):
+        filters['size'] = ''
+    if _age_range(filters['age']) is None:
+        filters['age'] = ''
+    return {key: value for key, value in filters.items() if value not in ('', None)}
+
+
+def apply_filters(queryset, filters, rank=True):
+    """Narrow a pet queryset to ``filters``; ranked by relevance when searching."""
+    queryset = queryset.filter(status=filters.get('status', 'available'))
+    if 'breed_id' in filters:
+        queryset = queryset.filter(breed_id=filters['breed_id'])
+    if 'breed' in filters:
+        queryset = queryset.filter(breed__name__icontains=filters['breed'])
+    if 'gender' in filters:
+        queryset = queryset.filter(gender=filters['gender'])
+    if 'size' in filters:
+        queryset = queryset.filter(breed__size=filters['size'])
+    if 'age' in filters:
+        youngest, oldest = _age_range(filters['age'])
+        queryset = queryset.filter(age__gte=youngest)
+        if oldest is not None:
+            queryset = queryset.filter(age__lte=oldest)
+    if 'q' in filters:
+        if rank:
+            return search_pets(queryset, filters['q'])
+        return filter_matches(queryset, filters['q'])
+    return queryset.order_by('-created_at')
+
+
+def _age_bucket_expression():
+    whens = [
+        When(age__lte=oldest, then=Value(index))
+        for index, (_, _, _, oldest) in enumerate(AGE_BUCKETS) if oldest is not None
+    ]
+    return Case(*whens, default=Value(len(AGE_BUCKETS) - 1), output_field=IntegerField())
+
+
+def grouped_counts(filters):
+    """Pet counts per (breed, gender, age bucket) for the status and search text in ``filters``."""
+    base = {key: filters[key] for key in ('status', 'q') if key in filters}
+    digest = hashlib.md5(json.dumps(base, sort_keys=True).encode()).hexdigest()
+    key = f'facets:{caching.get_stamp(caching.CATALOG_STAMP_KEY)}:{digest}'
+    rows = cache.get(key)
+    if rows is None:
+        queryset = apply_filters(Pet.objects.all(), base, rank=False)
+        rows = list(
+            queryset.order_by()
+            .annotate(age_bucket=_age_bucket_expression(), breed_key=Lower('breed__name'))
+            .values('breed_id', 'breed__name', 'breed_key', 'breed__size', 'gender', 'age_bucket')
+            .annotate(count=Count('id'))
+        )
+        cache.set(key, rows, FACET_CACHE_TIMEOUT)
+    return rows
+
+
+def _matches(row, filters, skip):
+    if skip != 'breed':
+        if 'breed_id' in filters and row['breed_id'] != filters['breed_id']:
+            return False
+        if 'breed' in filters and filters['breed'] not in row['breed_key']:
+            return False
+    if skip != 'gender' and 'gender' in filters and row['gender'] != filters['gender']:
+        return False
+    if skip != 'size' and 'size' in filters and row['breed__size'] != filters['size']:
+        return False
+    if skip != 'age' and 'age' in filters and AGE_BUCKETS[row['age_bucket']][0] != filters['age']:
+        return False
+    return True
+
+
+def _choice_facet(rows, filters, name, choices, value_of):
+    counts = dict.fromkeys((value for value, _ in choices), 0)
+    for row in rows:
+        value = value_of(row)
+        if value in counts and _matches(row, filters, skip=name):
+            counts[value] += row['count']
+    return [
+        {'value': value, 'label': label, 'count': counts[value], 'selected': filters.get(name) == value}
+        for value, label in choices
+    ]
+
+
+def get_facets(filters):
+    rows = grouped_counts(filters)
+    breeds = {}
+    for row in rows:
+        if _matches(row, filters, skip='breed'):
+            entry = breeds.setdefault(row['breed_id'], {
+                'value': row['breed_id'],
+                'label': row['breed__name'],
+                'count': 0,
+                'selected': filters.get('breed_id') == row['breed_id'] or filters.get('breed') == row['breed_key'],
+            })
+            entry['count'] += row['count']
+    return {
+        'total': sum(row['count'] for row in rows if _matches(row, filters, skip=None)),
+        'breed': sorted(breeds.values(), key=lambda entry: entry['label']),
+        'gender': _choice_facet(rows, filters, 'gender', GENDER_CHOICES, lambda row: row['gender']),
+        'size': _choice_facet(rows, filters, 'size', SIZE_CHOICES, lambda row: row['breed__size']),
+        'age': _choice_facet(
+            rows, filters, 'age', [(key, label) for key, label, _, _ in AGE_BUCKETS],
+            lambda row: AGE_BUCKETS[row['age_bucket']][0],
+        ),
+    }
@@ -1,7 +1,9 @@
 from django import forms
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import UserCreationForm
+from django.urls import reverse_lazy
 from .models import Pet, Breed, UserProfile, AdoptionRequest, Review
+from . import breeds
 
 
 
@@ -21,69 +23,75 @@ class CustomUserCreationForm(UserCreationForm):
         if User.objects.filter(email=email).exists():
             raise forms.ValidationError("This email is already registered.")
         return email
-    
-    def save(self, commit=True):
 
-        user = super().save(commit=False)
-        if commit:
-            user.save()
-            
-            UserProfile.objects.get_or_create(user=user)
-        return user
 
 
+class BreedFieldMixin(forms.Form):
+    """Free-text breed field resolved to an existing breed through the prefix index.
+
+    "labrador  retriever" is saved as the existing "Labrador Retriever"; only a
+    breed the index has never seen is created. The match is confirmed with one
+    primary-key lookup on save, since the index can trail a breed renamed or
+    deleted a moment ago.
+    """
 
-class PetForm(forms.ModelForm):
-    
     breed = forms.CharField(
         max_length=100,
-        widget=forms.TextInput(attrs={'placeholder': 'Enter breed'}),
+        widget=forms.TextInput(attrs={
+            'placeholder': 'Enter breed',
+            'autocomplete': 'off',
+            'list': 'breed-suggestions',
+            'data-autocomplete-url': reverse_lazy('api_breed_autocomplete'),
+        }),
         help_text='Type the breed name'
     )
-    
-    class Meta:
-        model = Pet
-        fields = ['name', 'age', 'description', 'image', 'gender', 'health_status', 'status']
-        widgets = {
-            'name': forms.TextInput(attrs={'placeholder': 'Pet Name'}),
-            'age': forms.NumberInput(attrs={'placeholder': 'Age in years'}),
-            'description': forms.Textarea(attrs={'rows': 4, 'placeholder': 'Describe the pet'}),
-            'image': forms.FileInput(attrs={}),
-            'gender': forms.Select(attrs={}),
-            'health_status': forms.Textarea(attrs={'rows': 3, 'placeholder': 'Health information'}),
-            'status': forms.Select(attrs={}),
-        }
-    
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         if self.instance and self.instance.pk and hasattr(self.instance, 'breed') and self.instance.breed:
             self.fields['breed'].initial = self.instance.breed.name
-    
+
     def clean_breed(self):
         breed_name = self.cleaned_data.get('breed')
         if not breed_name or not breed_name.strip():
             raise forms.ValidationError("Please enter a breed name.")
-        return breed_name.strip()
-    
+        self.breed_match = breeds.get_index().canonical(breed_name)
+        if self.breed_match:
+            return self.breed_match[1]
+        return ' '.join(breed_name.split())
+
     def save(self, commit=True):
         instance = super().save(commit=False)
         breed_name = self.cleaned_data.get('breed')
-        if breed_name:
-
+        match = getattr(self, 'breed_match', None)
+        if match and Breed.objects.filter(pk=match[0], name=match[1]).exists():
+            instance.breed_id = match[0]
+        elif breed_name:
             breed, _ = Breed.objects.get_or_create(name=breed_name)
             instance.breed = breed
         if commit:
             instance.save()
         return instance
 
-class UserPetForm(forms.ModelForm):
-   
-    breed = forms.CharField(
-        max_length=100,
-        widget=forms.TextInput(attrs={'placeholder': 'Enter breed'}),
-        help_text='Type the breed name'
-    )
+
+class PetForm(BreedFieldMixin, forms.ModelForm):
     
+    class Meta:
+        model = Pet
+        fields = ['name', 'age', 'description', 'image', 'gender', 'health_status', 'status']
+        widgets = {
+            'name': forms.TextInput(attrs={'placeholder': 'Pet Name'}),
+            'age': forms.NumberInput(attrs={'placeholder': 'Age in years'}),
+            'description': forms.Textarea(attrs={'rows': 4, 'placeholder': 'Describe the pet'}),
+            'image': forms.FileInput(attrs={}),
+            'gender': forms.Select(attrs={}),
+            'health_status': forms.Textarea(attrs={'rows': 3, 'placeholder': 'Health information'}),
+            'status': forms.Select(attrs={}),
+        }
+
+
+class UserPetForm(BreedFieldMixin, forms.ModelForm):
+   
     class Meta:
         model = Pet
         fields = ['name', 'age', 'description', 'image', 'gender', 'health_status']
@@ -95,27 +103,6 @@ class UserPetForm(forms.ModelForm):
             'gender': forms.Select(attrs={}),
             'health_status': forms.Textarea(attrs={'rows': 3, 'placeholder': 'Health information'}),
         }
-    
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        if self.instance and self.instance.pk and hasattr(self.instance, 'breed') and self.instance.breed:
-            self.fields['breed'].initial = self.instance.breed.name
-    
-    def clean_breed(self):
-        breed_name = self.cleaned_data.get('breed')
-        if not breed_name or not breed_name.strip():
-            raise forms.ValidationError("Please enter a breed name.")
-        return breed_name.strip()
-    
-    def save(self, commit=True):
-        instance = super().save(commit=False)
-        breed_name = self.cleaned_data.get('breed')
-        if breed_name:
-            breed, _ = Breed.objects.get_or_create(name=breed_name)
-            instance.breed = breed
-        if commit:
-            instance.save()
-        return instance
 
 
 class UserProfileForm(forms.ModelForm):
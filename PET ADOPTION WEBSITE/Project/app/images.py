@@ -0,0 +1,157 @@
+"""Resized WebP/JPEG derivatives of uploaded images, exposed as ``srcset`` strings.
+
+Derivatives live next to their original, e.g. ``pet_images/Chow_Chow.jpg``
+gets ``pet_images/Chow_Chow.w400.webp`` and ``pet_images/Chow_Chow.w400.jpg``.
+Widths at or above the original width are skipped; the original itself is
+listed in the srcset at its own width.
+"""
+import hashlib
+import os
+import re
+from io import BytesIO
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from . import caching, jobs
+
+
+WIDTHS = (200, 400, 800, 1200)
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+DERIVATIVE_PATTERN = re.compile(r'\.w\d+\.(webp|jpg)$')
+# A record missing derivatives is re-read after this long, in case the
+# worker's refresh of it was lost; complete records are kept until replaced.
+INCOMPLETE_RECORD_SECONDS = 60
+# Part of the job key, so changing the widths or encoder settings queues
+# every image again instead of finding its old job under the same key.
+SPEC_VERSION = hashlib.md5(repr((WIDTHS, FORMATS)).encode()).hexdigest()[:8]
+
+
+def is_derivative(name):
+    return bool(DERIVATIVE_PATTERN.search(name))
+
+
+def derivative_name(name, width, fmt):
+    root, _ = os.path.splitext(name)
+    return f'{root}.w{width}.{EXTENSIONS[fmt]}'
+
+
+def _cache_key(name):
+    return f'image-variants:{name}'
+
+
+def describe(name, storage=default_storage):
+    """Read which derivatives of ``name`` exist on disk, plus the original width."""
+    try:
+        with storage.open(name) as source:
+            width = Image.open(source).size[0]
+    except (OSError, ValueError):
+        return {'width': None, 'webp': [], 'jpeg': []}
+    record = {'width': width}
+    for fmt in FORMATS:
+        record[fmt] = [
+            w for w in WIDTHS
+            if w < width and storage.exists(derivative_name(name, w, fmt))
+        ]
+    return record
+
+
+def is_complete(record):
+    if record['width'] is None:
+        return False
+    expected = [w for w in WIDTHS if w < record['width']]
+    return all(record[fmt] == expected for fmt in FORMATS)
+
+
+def _store(name, record):
+    cache.set(_cache_key(name), record, None if is_complete(record) else INCOMPLETE_RECORD_SECONDS)
+
+
+def get_variants(name, storage=default_storage):
+    record = cache.get(_cache_key(name))
+    if record is None:
+        record = describe(name, storage)
+        _store(name, record)
+    return record
+
+
+def generate_derivatives(name, storage=default_storage, force=False):
+    """Write every missing derivative of ``name`` and return the refreshed record."""
+    with storage.open(name) as source:
+        original = ImageOps.exif_transpose(Image.open(source))
+        original.load()
+    if original.mode not in ('RGB', 'L'):
+        original = original.convert('RGB')
+    written = False
+    for width in WIDTHS:
+        if width >= original.width:
+            continue
+        height = round(original.height * width / original.width)
+        resized = None
+        for fmt, (pil_format, options) in FORMATS.items():
+            target = derivative_name(name, width, fmt)
+            if storage.exists(target):
+                if not force:
+                    continue
+                storage.delete(target)
+            if resized is None:
+                resized = original.resize((width, height), Image.LANCZOS)
+            buffer = BytesIO()
+            resized.save(buffer, pil_format, **options)
+            storage.save(target, ContentFile(buffer.getvalue()))
+            written = True
+    record = describe(name, storage)
+    _store(name, record)
+    if written:
+        caching.bump(caching.IMAGES_STAMP_KEY)
+    return record
+
+
+@jobs.task('images.generate_derivatives', max_attempts=3)
+def generate_derivatives_job(name):
+    generate_derivatives(name)
+
+
+def _needs_derivatives(field_file):
+    if not field_file or is_derivative(field_file.name):
+        return False
+    record = cache.get(_cache_key(field_file.name))
+    return record is None or not is_complete(record)
+
+
+def _job_key(name):
+    return f'image-derivatives:{SPEC_VERSION}:{name}'
+
+
+def schedule_derivatives(field_file):
+    """Queue derivative generation for ``runworker``; the job commits with the row that holds the upload.
+
+    A finished job for the same image and spec is queued again, e.g. after
+    it failed or its files were deleted.
+    """
+    if _needs_derivatives(field_file):
+        name = field_file.name
+        jobs.enqueue('images.generate_derivatives', {'name': name}, key=_job_key(name), requeue=True)
+
+
+def schedule_many(field_files):
+    names = {field_file.name for field_file in field_files if _needs_derivatives(field_file)}
+    jobs.enqueue_many('images.generate_derivatives', [
+        ({'name': name}, _job_key(name)) for name in sorted(names)
+    ], requeue=True)
+
+
+def srcset(name, fmt='jpeg', storage=default_storage):
+    if not name:
+        return ''
+    record = get_variants(name, storage)
+    entries = [f'{storage.url(derivative_name(name, w, fmt))} {w}w' for w in record[fmt]]
+    if record['width']:
+        entries.append(f'{storage.url(name)} {record["width"]}w')
+    return ', '.join(entries)
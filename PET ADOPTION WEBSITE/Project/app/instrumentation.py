@@ -0,0 +1,119 @@
+"""Per-request query and template timing for ``RequestProfilingMiddleware``.
+
+Every database connection gets ``record_query`` as an execute wrapper when it
+is opened. Each request carries a profile in a context variable; unsampled
+requests get a light one that only counts queries and SQL time (for the
+``/metrics`` histograms). Sampled requests also group queries by their SQL
+text with parameters left as placeholders (and ``IN`` lists collapsed), so
+the same statement run once per row of a page shows up as one signature
+with a high count: the N+1 pattern.
+"""
+import json
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+
+_current = ContextVar('request_profile', default=None)
+
+# A signature repeated this often in one request is logged as a likely N+1.
+REPEATED_QUERY_THRESHOLD = 5
+SLOW_REQUEST_MS = 500
+MAX_REPORTED_SIGNATURES = 5
+
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def signature(sql):
+    return _WHITESPACE.sub(' ', _IN_LIST.sub('IN (...)', sql)).strip()
+
+
+class RequestProfile:
+
+    def __init__(self, detailed=True):
+        self.detailed = detailed
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.signatures = Counter()
+        # ``(start, duration, sql)`` per query while ``app.profiler`` records this request.
+        self.timeline = None
+        # Async views run their queries from several threads at once.
+        self.lock = threading.Lock()
+
+    def add_query(self, sql, duration):
+        with self.lock:
+            self.queries += 1
+            self.sql_time += duration
+            if self.detailed:
+                self.signatures[signature(sql)] += 1
+            if self.timeline is not None:
+                self.timeline.append((time.perf_counter() - duration, duration, sql))
+
+    def repeated(self):
+        """``(count, signature)`` for statements run more than once, most repeated first."""
+        return [(count, sql) for sql, count in self.signatures.most_common() if count > 1]
+
+    def summary(self, request, response):
+        repeated = self.repeated()
+        return {
+            'event': 'request',
+            'url_name': request.resolver_match.view_name if request.resolver_match else None,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(1000 * (time.perf_counter() - self.started), 2),
+            'queries': self.queries,
+            'sql_ms': round(1000 * self.sql_time, 2),
+            'template_ms': round(1000 * self.template_time, 2),
+            'repeated_queries': sum(count - 1 for count, _ in repeated),
+            'top_repeated': [
+                {'count': count, 'sql': sql[:300]} for count, sql in repeated[:MAX_REPORTED_SIGNATURES]
+            ],
+        }
+
+    def server_timing(self, summary):
+        return ', '.join([
+            f"total;dur={summary['duration_ms']}",
+            f"sql;dur={summary['sql_ms']};desc=\"{summary['queries']} queries, "
+            f"{summary['repeated_queries']} repeated\"",
+            f"tpl;dur={summary['template_ms']}",
+        ])
+
+
+def start(detailed=True):
+    profile = RequestProfile(detailed)
+    return profile, _current.set(profile)
+
+
+def stop(token):
+    _current.reset(token)
+
+
+def record_query(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.add_query(sql, time.perf_counter() - started)
+
+
+def install(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def log(logger, summary):
+    """One JSON line per profiled request; a warning when it was slow or looks like an N+1."""
+    suspicious = summary['duration_ms'] >= SLOW_REQUEST_MS or any(
+        entry['count'] >= REPEATED_QUERY_THRESHOLD for entry in summary['top_repeated']
+    )
+    logger.log(logging.WARNING if suspicious else logging.INFO, json.dumps(summary))
@@ -0,0 +1,202 @@
+"""Database-backed background jobs, run by ``manage.py runworker``.
+
+A job is an ``app.Job`` row naming a registered task and its JSON payload.
+It is inserted in the caller's transaction, so it is committed (or rolled
+back) together with the rows it refers to and needs no broker. Workers claim
+due jobs in small batches under a lease; a job whose worker died is picked up
+again once the lease expires. A failing job is retried with exponential
+backoff and jitter until ``max_attempts`` is used up, then left ``failed``
+with its traceback for the staff status page.
+"""
+import logging
+import os
+import random
+import socket
+import threading
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTEMPTS = 5
+# Retry n waits about BACKOFF_SECONDS * 2 ** (n - 1), capped at MAX_BACKOFF_SECONDS.
+BACKOFF_SECONDS = 10
+MAX_BACKOFF_SECONDS = 3600
+LEASE_SECONDS = 300
+FINISHED_STATUSES = ('succeeded', 'failed')
+
+_tasks = {}
+
+
+class Task:
+
+    def __init__(self, name, func, max_attempts=DEFAULT_MAX_ATTEMPTS, backoff=BACKOFF_SECONDS):
+        self.name = name
+        self.func = func
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+
+    def retry_delay(self, attempts):
+        delay = min(self.backoff * 2 ** (attempts - 1), MAX_BACKOFF_SECONDS)
+        return timedelta(seconds=delay * random.uniform(0.5, 1.5))
+
+
+def task(name, max_attempts=DEFAULT_MAX_ATTEMPTS, backoff=BACKOFF_SECONDS):
+    """Register the decorated function as the task ``name``; it is called with the payload as kwargs."""
+    def register(func):
+        _tasks[name] = Task(name, func, max_attempts, backoff)
+        return func
+    return register
+
+
+def task_names():
+    return sorted(_tasks)
+
+
+def _jobs():
+    # Workers and enqueuers must agree on the queue, so never read it from a replica.
+    return Job.objects.using(DEFAULT_DB_ALIAS)
+
+
+def _requeue_finished(jobs, run_after):
+    """Put finished jobs back in the queue as if they were new; return how many were requeued."""
+    return jobs.filter(status__in=FINISHED_STATUSES).update(
+        status='queued', attempts=0, run_after=run_after, last_error='',
+        finished_at=None, updated_at=timezone.now(),
+    )
+
+
+def enqueue(name, payload=None, key=None, delay=0, requeue=False):
+    """Queue task ``name``; with ``key``, a job already under that key is returned instead.
+
+    With ``requeue``, that job is queued again if it already succeeded or
+    failed, so the key only keeps one pending job at a time.
+    """
+    if name not in _tasks:
+        raise LookupError(f"No task registered as '{name}'.")
+    fields = {
+        'task': name,
+        'payload': payload or {},
+        'max_attempts': _tasks[name].max_attempts,
+        'run_after': timezone.now() + timedelta(seconds=delay),
+    }
+    if key is None:
+        return _jobs().create(**fields)
+    job, created = _jobs().get_or_create(idempotency_key=key, defaults=fields)
+    if not created and requeue and _requeue_finished(_jobs().filter(pk=job.pk), fields['run_after']):
+        job.refresh_from_db()
+    return job
+
+
+def enqueue_many(name, items, requeue=False):
+    """Queue task ``name`` once per ``(payload, key)`` pair with one insert, skipping keys already queued.
+
+    With ``requeue``, finished jobs under those keys are queued again, as in ``enqueue``.
+    """
+    if name not in _tasks:
+        raise LookupError(f"No task registered as '{name}'.")
+    items = list(items)
+    run_after = timezone.now()
+    _jobs().bulk_create([
+        Job(task=name, payload=payload, idempotency_key=key,
+            max_attempts=_tasks[name].max_attempts, run_after=run_after)
+        for payload, key in items
+    ], ignore_conflicts=True)
+    if requeue and items:
+        _requeue_finished(_jobs().filter(idempotency_key__in=[key for _, key in items]), run_after)
+
+
+class Worker:
+
+    def __init__(self, concurrency=2, poll_interval=1.0, lease=LEASE_SECONDS, name=None):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.lease = timedelta(seconds=lease)
+        self.name = name or f'{socket.gethostname()}:{os.getpid()}'
+        self.stopping = threading.Event()
+
+    def stop(self):
+        self.stopping.set()
+
+    def claim(self, limit):
+        now = timezone.now()
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            ids = list(
+                _jobs().select_for_update(skip_locked=True)
+                .filter(status='queued', run_after__lte=now)
+                .order_by('run_after', 'pk')
+                .values_list('pk', flat=True)[:limit]
+            )
+            if not ids:
+                return []
+            _jobs().filter(pk__in=ids, status='queued').update(
+                status='running', locked_by=self.name, locked_until=now + self.lease,
+                attempts=F('attempts') + 1, updated_at=now,
+            )
+        return list(_jobs().filter(pk__in=ids, status='running', locked_by=self.name).order_by('run_after', 'pk'))
+
+    def release_expired(self):
+        """Requeue (or fail, if out of attempts) running jobs whose lease ran out, e.g. after a worker crash."""
+        now = timezone.now()
+        expired = _jobs().filter(status='running', locked_until__lt=now)
+        error = 'Lease expired before the job finished.'
+        fields = {'locked_by': '', 'locked_until': None, 'last_error': error, 'updated_at': now}
+        expired.filter(attempts__gte=F('max_attempts')).update(status='failed', finished_at=now, **fields)
+        expired.update(status='queued', run_after=now, **fields)
+
+    def perform(self, job):
+        """Run one claimed job and record the outcome: ``succeeded``, ``retried`` or ``failed``."""
+        close_old_connections()
+        owned = _jobs().filter(pk=job.pk, status='running', locked_by=self.name)
+        handler = _tasks.get(job.task)
+        try:
+            if handler is None:
+                raise LookupError(f"No task registered as '{job.task}'.")
+            handler.func(**job.payload)
+        except Exception:
+            error = traceback.format_exc()
+            now = timezone.now()
+            fields = {'locked_by': '', 'locked_until': None, 'last_error': error, 'updated_at': now}
+            if handler is not None and job.attempts < job.max_attempts:
+                logger.warning('Job %s (%s) failed, attempt %s of %s', job.pk, job.task, job.attempts, job.max_attempts)
+                owned.update(status='queued', run_after=now + handler.retry_delay(job.attempts), **fields)
+                return 'retried'
+            logger.error('Job %s (%s) failed permanently:\n%s', job.pk, job.task, error)
+            owned.update(status='failed', finished_at=now, **fields)
+            return 'failed'
+        finally:
+            close_old_connections()
+        now = timezone.now()
+        owned.update(status='succeeded', finished_at=now, locked_by='', locked_until=None, last_error='', updated_at=now)
+        return 'succeeded'
+
+    def run(self, once=False):
+        """Process jobs until stopped; with ``once``, return when nothing due is left. Returns outcome counts."""
+        outcomes = {'succeeded': 0, 'retried': 0, 'failed': 0}
+        running = set()
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='jobs') as pool:
+            while not self.stopping.is_set():
+                self.release_expired()
+                free = self.concurrency - len(running)
+                claimed = self.claim(free) if free else []
+                for job in claimed:
+                    running.add(pool.submit(self.perform, job))
+                if once and not claimed and not running:
+                    break
+                if running:
+                    done, running = wait(running, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        outcomes[future.result()] += 1
+                else:
+                    self.stopping.wait(self.poll_interval)
+            for future in wait(running).done:
+                outcomes[future.result()] += 1
+        return outcomes
@@ -0,0 +1,453 @@
+"""In-process load harnesses.
+
+``LoadTest`` drives every named route in ``app/urls.py``; ``HandlerBenchmark``
+compares the WSGI and ASGI handlers on the async API views. Requests go
+through ``django.test.Client``/``AsyncClient``, so the full middleware, view
+and template stack runs without a network hop. ``TemplateRenderBenchmark``
+times template rendering alone on the pages that list pet cards, and
+``SessionStoreBenchmark`` runs signed-in traffic against each session store.
+``AuthBenchmark`` times the signup and login form posts.
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, connections
+from django.db.models import Count
+from django.test import AsyncClient, Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+
+from . import urls as app_urls
+from .models import Pet, UserProfile, AdoptionRequest, Review
+
+
+# Relative weight of each route in the traffic mix; unlisted routes get 1.
+ROUTE_WEIGHTS = {
+    'home': 15,
+    'pets': 20,
+    'pet_detail': 20,
+    'api_pet_list': 10,
+    'api_pet_detail': 8,
+    'pet_search': 5,
+    'reviews': 4,
+    'api_breed_list': 3,
+    'my_pets': 3,
+    'adoption_requests': 3,
+    'profiles': 2,
+    'profile_detail': 2,
+    'review_detail': 2,
+}
+# Logging out would end the session the rest of the run relies on.
+SKIPPED_ROUTES = {'logout'}
+SAMPLE_SIZE = 500
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class LoadTest:
+
+    def __init__(self, requests=1000, concurrency=4, anonymous_ratio=0.6, seed=0, weights=None):
+        self.total_requests = requests
+        self.concurrency = concurrency
+        self.anonymous_ratio = anonymous_ratio
+        self.seed = seed
+        self.weights = {**ROUTE_WEIGHTS, **(weights or {})}
+        self.routes = [
+            pattern for pattern in app_urls.urlpatterns
+            if pattern.name and pattern.name not in SKIPPED_ROUTES
+        ]
+        self.samples = {
+            Pet: list(Pet.objects.values_list('pk', flat=True)[:SAMPLE_SIZE]),
+            UserProfile: list(UserProfile.objects.values_list('pk', flat=True)[:SAMPLE_SIZE]),
+            AdoptionRequest: list(AdoptionRequest.objects.values_list('pk', flat=True)[:SAMPLE_SIZE]),
+            Review: list(Review.objects.values_list('pk', flat=True)[:SAMPLE_SIZE]),
+        }
+        self.users = list(User.objects.filter(is_active=True)[:SAMPLE_SIZE])
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.lock = threading.Lock()
+
+    def build_url(self, pattern, rng):
+        view_class = pattern.callback.view_class
+        kwargs = {}
+        for name in pattern.pattern.converters:
+            model = Pet if name == 'pet_id' else getattr(view_class, 'model', None)
+            if not self.samples.get(model):
+                return None
+            kwargs[name] = rng.choice(self.samples[model])
+        url = reverse(pattern.name, kwargs=kwargs)
+        if pattern.name in ('pets', 'pet_search') and rng.random() < 0.5:
+            url += '?q=' + rng.choice(['max', 'bella', 'lab', 'friendly', 'calm', 'pu'])
+        return url
+
+    def worker(self, count, worker_seed):
+        rng = random.Random(worker_seed)
+        client = Client()
+        if self.users and rng.random() >= self.anonymous_ratio:
+            client.force_login(rng.choice(self.users))
+        weights = [self.weights.get(pattern.name, 1) for pattern in self.routes]
+        try:
+            for _ in range(count):
+                pattern = rng.choices(self.routes, weights)[0]
+                url = self.build_url(pattern, rng)
+                if url is None:
+                    continue
+                started = time.perf_counter()
+                response = client.get(url)
+                if getattr(response, 'streaming', False):
+                    b''.join(response.streaming_content)
+                elapsed = time.perf_counter() - started
+                with self.lock:
+                    self.latencies[pattern.name].append(elapsed)
+                    self.statuses[pattern.name][response.status_code] += 1
+        finally:
+            connections.close_all()
+
+    def run(self):
+        """Run the configured traffic and return the report as a JSON-ready dict."""
+        # Each worker is one visitor: anonymous or signed in for its whole run.
+        workers = max(1, self.concurrency * 4)
+        per_worker, remainder = divmod(self.total_requests, workers)
+        # Expected 403/404s (editing someone else's review, ...) would flood the log.
+        request_logger = logging.getLogger('django.request')
+        previous_level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+        started = time.perf_counter()
+        try:
+            self.run_workers(workers, per_worker, remainder)
+        finally:
+            request_logger.setLevel(previous_level)
+        wall_time = time.perf_counter() - started
+        return self.report(wall_time)
+
+    def run_workers(self, workers, per_worker, remainder):
+        for wave in range(0, workers, self.concurrency):
+            threads = [
+                threading.Thread(
+                    target=self.worker,
+                    args=(per_worker + (1 if n < remainder else 0), self.seed * 10007 + n),
+                )
+                for n in range(wave, min(wave + self.concurrency, workers))
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+    def report(self, wall_time):
+        routes = {}
+        for name, latencies in sorted(self.latencies.items()):
+            latencies.sort()
+            routes[name] = {
+                'requests': len(latencies),
+                'throughput_rps': round(len(latencies) / wall_time, 2),
+                'mean_ms': round(1000 * sum(latencies) / len(latencies), 3),
+                'p50_ms': round(1000 * percentile(latencies, 0.50), 3),
+                'p95_ms': round(1000 * percentile(latencies, 0.95), 3),
+                'p99_ms': round(1000 * percentile(latencies, 0.99), 3),
+                'status_codes': {str(code): n for code, n in sorted(self.statuses[name].items())},
+            }
+        everything = sorted(l for latencies in self.latencies.values() for l in latencies)
+        return {
+            'config': {
+                'requests': self.total_requests,
+                'concurrency': self.concurrency,
+                'anonymous_ratio': self.anonymous_ratio,
+                'seed': self.seed,
+            },
+            'wall_time_s': round(wall_time, 3),
+            'total': {
+                'requests': len(everything),
+                'throughput_rps': round(len(everything) / wall_time, 2) if wall_time else None,
+                'p50_ms': round(1000 * percentile(everything, 0.50), 3) if everything else None,
+                'p95_ms': round(1000 * percentile(everything, 0.95), 3) if everything else None,
+                'p99_ms': round(1000 * percentile(everything, 0.99), 3) if everything else None,
+            },
+            'routes': routes,
+        }
+
+
+class HandlerBenchmark:
+    """Serve the same API traffic through the WSGI and the ASGI handler.
+
+    WSGI gets one thread per concurrent client, as a threaded WSGI server
+    would; ASGI gets the same number of concurrent tasks on one event loop.
+    """
+
+    route_names = ('api_pet_list', 'api_pet_detail', 'api_breed_list', 'pet_search')
+
+    def __init__(self, requests=400, concurrency=16, seed=0):
+        self.total_requests = requests
+        self.concurrency = concurrency
+        rng = random.Random(seed)
+        pet_ids = list(Pet.objects.values_list('pk', flat=True)[:SAMPLE_SIZE])
+        self.urls = []
+        for n in range(requests):
+            name = self.route_names[n % len(self.route_names)]
+            if name == 'api_pet_detail':
+                if not pet_ids:
+                    continue
+                url = reverse(name, kwargs={'pet_id': rng.choice(pet_ids)})
+            else:
+                url = reverse(name)
+            if name in ('api_pet_list', 'pet_search') and rng.random() < 0.5:
+                url += ('?search=' if name == 'api_pet_list' else '?q=') + rng.choice(['max', 'bella', 'calm'])
+            self.urls.append((name, url))
+
+    def run_wsgi(self):
+        latencies = defaultdict(list)
+        lock = threading.Lock()
+        pending = iter(self.urls)
+
+        def worker():
+            client = Client()
+            try:
+                while True:
+                    with lock:
+                        item = next(pending, None)
+                    if item is None:
+                        return
+                    started = time.perf_counter()
+                    client.get(item[1])
+                    elapsed = time.perf_counter() - started
+                    with lock:
+                        latencies[item[0]].append(elapsed)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.summarize(latencies, time.perf_counter() - started)
+
+    def run_asgi(self):
+        latencies = defaultdict(list)
+        pending = iter(self.urls)
+
+        async def worker():
+            client = AsyncClient()
+            for name, url in pending:
+                started = time.perf_counter()
+                await client.get(url)
+                latencies[name].append(time.perf_counter() - started)
+
+        async def main():
+            await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+
+        started = time.perf_counter()
+        asyncio.run(main())
+        return self.summarize(latencies, time.perf_counter() - started)
+
+    def summarize(self, latencies, wall_time):
+        everything = sorted(l for values in latencies.values() for l in values)
+        return {
+            'wall_time_s': round(wall_time, 3),
+            'requests': len(everything),
+            'throughput_rps': round(len(everything) / wall_time, 2),
+            'p50_ms': round(1000 * percentile(everything, 0.50), 3) if everything else None,
+            'p95_ms': round(1000 * percentile(everything, 0.95), 3) if everything else None,
+            'p99_ms': round(1000 * percentile(everything, 0.99), 3) if everything else None,
+            'routes': {
+                name: {
+                    'requests': len(values),
+                    'p50_ms': round(1000 * percentile(sorted(values), 0.50), 3),
+                }
+                for name, values in sorted(latencies.items())
+            },
+        }
+
+    def run(self):
+        request_logger = logging.getLogger('django.request')
+        previous_level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+        try:
+            wsgi = self.run_wsgi()
+            asgi = self.run_asgi()
+        finally:
+            request_logger.setLevel(previous_level)
+        return {
+            'config': {'requests': len(self.urls), 'concurrency': self.concurrency},
+            'wsgi': wsgi,
+            'asgi': asgi,
+        }
+
+
+class TemplateRenderBenchmark:
+    """Time ``response.render()`` for the pet card pages with and without fragment caching.
+
+    Each view runs through ``RequestFactory`` as ``username`` (by default the
+    user with the most posted pets), so only template rendering is timed, not
+    middleware or the queries behind the page. ``uncached`` swaps the
+    ``fragments`` cache for a dummy one; ``cached`` renders once to warm it.
+    """
+
+    route_names = ('home', 'pets', 'my_pets')
+
+    def __init__(self, iterations=50, username=None):
+        self.iterations = iterations
+        if username:
+            self.user = User.objects.get(username=username)
+        else:
+            self.user = User.objects.annotate(pets=Count('posted_pets')).order_by('-pets', 'pk').first()
+        self.factory = RequestFactory()
+
+    def render_once(self, url):
+        request = self.factory.get(url)
+        request.user = self.user
+        response = resolve(url).func(request)
+        started = time.perf_counter()
+        response.render()
+        return time.perf_counter() - started
+
+    def time_page(self, url, warm):
+        if warm:
+            self.render_once(url)
+        timings = sorted(self.render_once(url) for _ in range(self.iterations))
+        return {
+            'mean_ms': round(1000 * sum(timings) / len(timings), 3),
+            'p50_ms': round(1000 * percentile(timings, 0.50), 3),
+            'p95_ms': round(1000 * percentile(timings, 0.95), 3),
+        }
+
+    def run(self):
+        uncached_caches = dict(settings.CACHES, fragments={
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+        })
+        pages = {}
+        for name in self.route_names:
+            url = reverse(name)
+            with override_settings(CACHES=uncached_caches):
+                uncached = self.time_page(url, warm=False)
+            cached = self.time_page(url, warm=True)
+            pages[name] = {
+                'uncached': uncached,
+                'cached': cached,
+                'speedup': round(uncached['mean_ms'] / cached['mean_ms'], 2) if cached['mean_ms'] else None,
+            }
+        return {
+            'config': {'iterations': self.iterations, 'user': self.user.username if self.user else None},
+            'pages': pages,
+        }
+
+
+class SessionStoreBenchmark:
+    """Signed-in ``LoadTest`` traffic once per session store in ``settings.SESSION_ENGINES``.
+
+    Every visitor is logged in, so every request loads its session; ``db``
+    is the plain database store the others are compared against.
+    """
+
+    def __init__(self, requests=1000, concurrency=4, seed=0, stores=None):
+        self.requests = requests
+        self.concurrency = concurrency
+        self.seed = seed
+        self.stores = stores or list(settings.SESSION_ENGINES)
+
+    def run_store(self, store):
+        with override_settings(SESSION_STORE=store, SESSION_ENGINE=settings.SESSION_ENGINES[store]):
+            # A short warm-up so the first store measured does not pay for cold caches.
+            LoadTest(requests=max(1, self.requests // 10), concurrency=self.concurrency,
+                     anonymous_ratio=0, seed=self.seed + 1).run()
+            report = LoadTest(requests=self.requests, concurrency=self.concurrency,
+                              anonymous_ratio=0, seed=self.seed).run()
+        return report['total']
+
+    def run(self):
+        stores = {store: self.run_store(store) for store in self.stores}
+        baseline = stores.get('db', {}).get('throughput_rps')
+        for result in stores.values():
+            result['throughput_vs_db'] = (
+                round(result['throughput_rps'] / baseline, 2) if baseline and result['throughput_rps'] else None
+            )
+        return {
+            'config': {'requests': self.requests, 'concurrency': self.concurrency, 'seed': self.seed},
+            'stores': stores,
+        }
+
+
+class AuthBenchmark:
+    """Sign up ``users`` new accounts through the signup form, then log each in ``logins`` times.
+
+    Passwords are hashed with a fast hasher unless ``real_hasher`` is set,
+    since the default PBKDF2 cost would hide everything else on the path.
+    Queries per signup and per login are reported next to the timings: they
+    are what a regression on this path changes. The accounts are deleted
+    afterwards.
+    """
+
+    password = 'Benchmark-pass-123'
+
+    def __init__(self, users=50, logins=3, real_hasher=False, seed=0):
+        self.users = users
+        self.logins = logins
+        self.real_hasher = real_hasher
+        self.prefix = f'authbench{seed}_'
+
+    def timed_post(self, client, url, data, expected_status):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = client.post(url, data)
+            elapsed = time.perf_counter() - started
+        if response.status_code != expected_status:
+            raise RuntimeError(f'POST {url} returned {response.status_code}, expected {expected_status}')
+        return elapsed, len(queries)
+
+    def summarize(self, timings, query_counts):
+        timings = sorted(timings)
+        total = sum(timings)
+        return {
+            'requests': len(timings),
+            'throughput_rps': round(len(timings) / total, 2) if total else None,
+            'p50_ms': round(1000 * percentile(timings, 0.50), 3),
+            'p95_ms': round(1000 * percentile(timings, 0.95), 3),
+            'queries_per_request': round(sum(query_counts) / len(query_counts), 2),
+        }
+
+    def run_all(self):
+        signups, signup_queries, logins, login_queries = [], [], [], []
+        names = [f'{self.prefix}{n}' for n in range(self.users)]
+        for name in names:
+            elapsed, queries = self.timed_post(Client(), reverse('signup'), {
+                'username': name, 'email': f'{name}@example.com',
+                'password1': self.password, 'password2': self.password,
+            }, 302)
+            signups.append(elapsed)
+            signup_queries.append(queries)
+        for _ in range(self.logins):
+            for name in names:
+                elapsed, queries = self.timed_post(Client(), reverse('login'), {
+                    'username': name, 'password': self.password,
+                }, 302)
+                logins.append(elapsed)
+                login_queries.append(queries)
+        return {'signup': self.summarize(signups, signup_queries), 'login': self.summarize(logins, login_queries)}
+
+    def run(self):
+        User.objects.filter(username__startswith=self.prefix).delete()
+        hashers = settings.PASSWORD_HASHERS
+        if not self.real_hasher:
+            hashers = ['django.contrib.auth.hashers.MD5PasswordHasher']
+        try:
+            with override_settings(PASSWORD_HASHERS=hashers):
+                results = self.run_all()
+        finally:
+            User.objects.filter(username__startswith=self.prefix).delete()
+        return {
+            'config': {'users': self.users, 'logins': self.logins, 'real_hasher': self.real_hasher},
+            **results,
+        }
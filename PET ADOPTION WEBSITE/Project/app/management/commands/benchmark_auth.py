@@ -0,0 +1,23 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from app.loadtest import AuthBenchmark
+
+
+class Command(BaseCommand):
+    help = 'Time signups and logins through their forms, with queries per request, and report JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50, help='Accounts to sign up (deleted afterwards).')
+        parser.add_argument('--logins', type=int, default=3, help='Logins per account.')
+        parser.add_argument('--real-hasher', action='store_true',
+                            help='Hash with the configured PASSWORD_HASHERS instead of a fast one.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        report = AuthBenchmark(
+            users=options['users'], logins=options['logins'],
+            real_hasher=options['real_hasher'], seed=options['seed'],
+        ).run()
+        self.stdout.write(json.dumps(report, indent=2))
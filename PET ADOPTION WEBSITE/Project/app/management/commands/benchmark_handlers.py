@@ -0,0 +1,25 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from app.loadtest import HandlerBenchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Serve the same API traffic through the WSGI and ASGI handlers in-process and '
+        'report throughput and latency for each as JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=400)
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        report = HandlerBenchmark(
+            requests=options['requests'],
+            concurrency=options['concurrency'],
+            seed=options['seed'],
+        ).run()
+        self.stdout.write(json.dumps(report, indent=2))
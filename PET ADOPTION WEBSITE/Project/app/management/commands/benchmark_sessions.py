@@ -0,0 +1,24 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from app.loadtest import SessionStoreBenchmark
+
+
+class Command(BaseCommand):
+    help = 'Run signed-in traffic against each session store (db, cached_db, signed_cookies) and report JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--store', action='append', choices=list(settings.SESSION_ENGINES),
+                            help='Benchmark only this store; repeat for several.')
+
+    def handle(self, *args, **options):
+        report = SessionStoreBenchmark(
+            requests=options['requests'], concurrency=options['concurrency'],
+            seed=options['seed'], stores=options['store'],
+        ).run()
+        self.stdout.write(json.dumps(report, indent=2))
@@ -0,0 +1,142 @@
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+
+from app.loadtest import percentile
+from app.models import Pet, Review
+
+
+# "stock" is the configuration before the tuned profile: rollback journal,
+# deferred transactions and a fresh connection per request.
+PROFILES = {
+    'stock': {'journal_mode': 'DELETE', 'pragmas': {}, 'options': {}, 'persistent': False},
+    'tuned': {
+        'journal_mode': 'WAL',
+        'pragmas': None,
+        'options': {'transaction_mode': 'IMMEDIATE'},
+        'persistent': True,
+    },
+}
+
+
+def read_once(rng, pet_ids):
+    list(Pet.objects.filter(status='available').select_related('breed').order_by('-created_at')[:20])
+    Pet.objects.select_related('breed').get(pk=rng.choice(pet_ids))
+
+
+def write_once(rng, pet_ids, author_id):
+    # Read-then-write, like the create views: counters read the old row first.
+    with transaction.atomic():
+        review = Review.objects.create(
+            pet_id=rng.choice(pet_ids), author_id=author_id, rating=rng.randint(1, 5),
+            title='Benchmark', content='Benchmark review',
+        )
+    with transaction.atomic():
+        review.delete()
+
+
+def worker(role, path, profile_name, duration, seed, pet_ids, author_id, results):
+    profile = PROFILES[profile_name]
+    connection = connections[DEFAULT_DB_ALIAS]
+    connection.close()
+    connection.settings_dict.update(NAME=path, OPTIONS=dict(profile['options']))
+    if profile['pragmas'] is not None:
+        settings.SQLITE_PRAGMAS = profile['pragmas']
+    rng = random.Random(seed)
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            if role == 'reader':
+                read_once(rng, pet_ids)
+            else:
+                write_once(rng, pet_ids, author_id)
+            latencies.append(time.perf_counter() - started)
+        except OperationalError:
+            errors += 1
+        if not profile['persistent']:
+            connection.close()
+    connection.close()
+    results.put((role, latencies, errors))
+
+
+class Command(BaseCommand):
+    help = (
+        'Run concurrent reader and writer processes against copies of the database, once with '
+        'the stock SQLite settings and once with the tuned profile, and report the difference as JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=6)
+        parser.add_argument('--writers', type=int, default=3)
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds per profile.')
+        parser.add_argument('--profiles', nargs='+', choices=sorted(PROFILES), default=['stock', 'tuned'])
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        source = connections[DEFAULT_DB_ALIAS]
+        if source.vendor != 'sqlite':
+            raise CommandError('benchmark_sqlite only runs against SQLite.')
+        pet_ids = list(Pet.objects.values_list('pk', flat=True)[:1000])
+        author_id = User.objects.values_list('pk', flat=True).first()
+        if not pet_ids or author_id is None:
+            raise CommandError('Seed some data first, e.g. with `manage.py seed_data`.')
+
+        report = {'config': {k: options[k] for k in ('readers', 'writers', 'duration')}}
+        with tempfile.TemporaryDirectory() as workdir:
+            for profile_name in options['profiles']:
+                path = os.path.join(workdir, f'{profile_name}.sqlite3')
+                self.copy_database(source, path, PROFILES[profile_name]['journal_mode'])
+                report[profile_name] = self.run_profile(profile_name, path, pet_ids, author_id, options)
+                self.stderr.write(f'{profile_name}: done')
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def copy_database(self, source, path, journal_mode):
+        source.ensure_connection()
+        target = sqlite3.connect(path)
+        try:
+            source.connection.backup(target)
+            target.execute(f'PRAGMA journal_mode = {journal_mode}')
+        finally:
+            target.close()
+
+    def run_profile(self, profile_name, path, pet_ids, author_id, options):
+        # Children are forked; they must not inherit the parent's open connection.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        roles = ['reader'] * options['readers'] + ['writer'] * options['writers']
+        processes = [
+            context.Process(target=worker, args=(
+                role, path, profile_name, options['duration'], options['seed'] + n,
+                pet_ids, author_id, results,
+            ))
+            for n, role in enumerate(roles)
+        ]
+        for process in processes:
+            process.start()
+        collected = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+        summary = {}
+        for role in ('reader', 'writer'):
+            latencies = sorted(l for r, values, _ in collected if r == role for l in values)
+            summary[role] = {
+                'operations': len(latencies),
+                'ops_per_s': round(len(latencies) / options['duration'], 2),
+                'locked_errors': sum(errors for r, _, errors in collected if r == role),
+                'p50_ms': round(1000 * percentile(latencies, 0.50), 3) if latencies else None,
+                'p99_ms': round(1000 * percentile(latencies, 0.99), 3) if latencies else None,
+            }
+        return summary
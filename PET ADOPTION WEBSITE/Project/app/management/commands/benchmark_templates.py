@@ -0,0 +1,20 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from app.loadtest import TemplateRenderBenchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Time template rendering of the home, pet list and my-pets pages with the pet card '
+        'fragment cache disabled and warm, and report both as JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--user', help='Render as this user; defaults to the one with the most posted pets.')
+
+    def handle(self, *args, **options):
+        report = TemplateRenderBenchmark(iterations=options['iterations'], username=options['user']).run()
+        self.stdout.write(json.dumps(report, indent=2))
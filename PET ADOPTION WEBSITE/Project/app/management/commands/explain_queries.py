@@ -0,0 +1,87 @@
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from app.models import Pet, Breed, AdoptionRequest, Review
+
+
+class Rollback(Exception):
+    pass
+
+
+def hot_queries():
+    """The querysets behind each view's hot path, with representative parameters."""
+    user_id = User.objects.values_list('pk', flat=True).first() or 1
+    pet_id = Pet.objects.values_list('pk', flat=True).first() or 1
+    breed_id = Breed.objects.values_list('pk', flat=True).first() or 1
+    available = Pet.objects.filter(status='available')
+    return [
+        ('home: featured pets', available.select_related('breed')[:6]),
+        ('home: available count', available.values('pk')),
+        ('pets: browse page', available.select_related('breed').order_by('-created_at')[:12]),
+        ('pets: gender + breed filter',
+         available.filter(gender='female', breed_id=breed_id).order_by('-created_at')[:12]),
+        ('api/pets: keyset page', Pet.objects.filter(status='available').order_by('-created_at', '-id')[:21]),
+        ('my-pets: posted by user', Pet.objects.filter(posted_by_id=user_id).order_by('-created_at')[:12]),
+        ('my-pets: adopted by user',
+         AdoptionRequest.objects.filter(requester_id=user_id, status='approved').values('pet_id')),
+        ('adoption-requests: staff list', AdoptionRequest.objects.order_by('-requested_date')[:12]),
+        ('adoption-requests: pending for pet',
+         AdoptionRequest.objects.filter(pet_id=pet_id, status='pending')),
+        ('pet detail: user review', Review.objects.filter(pet_id=pet_id, author_id=user_id)[:1]),
+        ('reviews: list', Review.objects.order_by('-created_at')[:12]),
+        ('breeds: available per breed',
+         Pet.objects.filter(status='available').values('breed_id').order_by()),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Print the query plan for each view hot path, optionally before and after the app indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--compare', action='store_true',
+            help='Also show each plan with the indexes declared in app models dropped '
+                 '(inside a rolled-back transaction).',
+        )
+
+    def handle(self, *args, **options):
+        queries = hot_queries()
+        if options['compare']:
+            self.stdout.write(self.style.MIGRATE_HEADING('Without app indexes'))
+            try:
+                with transaction.atomic():
+                    self.drop_app_indexes()
+                    self.print_plans(queries)
+                    raise Rollback
+            except Rollback:
+                pass
+            self.stdout.write(self.style.MIGRATE_HEADING('With app indexes'))
+        full_scans = self.print_plans(queries)
+        if full_scans:
+            self.stdout.write(self.style.WARNING(f'{full_scans} hot path(s) still scan a whole table.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('No hot path does a full table scan.'))
+
+    def drop_app_indexes(self):
+        with connection.cursor() as cursor:
+            for model in apps.get_app_config('app').get_models():
+                for index in model._meta.indexes:
+                    cursor.execute(f'DROP INDEX {connection.ops.quote_name(index.name)}')
+
+    def print_plans(self, queries):
+        full_scans = 0
+        for label, queryset in queries:
+            plan = queryset.explain()
+            self.stdout.write(self.style.SQL_TABLE(label))
+            for line in plan.splitlines():
+                self.stdout.write(f'    {line}')
+            if any(self.is_full_scan(line) for line in plan.splitlines()):
+                full_scans += 1
+        return full_scans
+
+    @staticmethod
+    def is_full_scan(line):
+        line = line.upper()
+        return 'SCAN' in line and 'USING' not in line and 'CONSTANT ROW' not in line
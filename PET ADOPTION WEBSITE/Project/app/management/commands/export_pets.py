@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from app import bulk
+from app.models import Pet
+
+
+class Command(BaseCommand):
+    help = 'Stream pets to a CSV or JSONL file (or stdout) with constant memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='File to write; defaults to stdout.')
+        parser.add_argument('--format', choices=bulk.FORMATS, help='Defaults to the output extension, else csv.')
+        parser.add_argument('--status', help='Only export pets with this status.')
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        queryset = Pet.objects.all()
+        if options['status']:
+            queryset = queryset.filter(status=options['status'])
+        output = options['output']
+        fmt = options['format'] or (bulk.guess_format(output) if output else 'csv')
+        if output:
+            with open(output, 'w', newline='', encoding='utf-8') as stream:
+                count = bulk.export_rows(queryset, stream, fmt, options['batch_size'])
+            self.stderr.write(self.style.SUCCESS(f'{count} pet(s) written to {output}.'))
+        else:
+            bulk.export_rows(queryset, self.stdout, fmt, options['batch_size'])
@@ -0,0 +1,38 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from app import images
+from app.models import Pet, UserProfile
+
+
+class Command(BaseCommand):
+    help = 'Backfill resized WebP/JPEG derivatives for pet images and profile pictures'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate derivatives that already exist.')
+
+    def source_names(self):
+        names = set(Pet.objects.exclude(image='').exclude(image__isnull=True).values_list('image', flat=True))
+        names.update(
+            UserProfile.objects.exclude(profile_picture='').exclude(profile_picture__isnull=True)
+            .values_list('profile_picture', flat=True)
+        )
+        # Also pick up files under media/ that no row points at any more.
+        for directory in ('pet_images', 'profile_pictures'):
+            if default_storage.exists(directory):
+                _, files = default_storage.listdir(directory)
+                names.update(f'{directory}/{name}' for name in files)
+        return sorted(name for name in names if not images.is_derivative(name))
+
+    def handle(self, *args, **options):
+        failures = 0
+        for name in self.source_names():
+            try:
+                record = images.generate_derivatives(name, force=options['force'])
+            except (OSError, ValueError) as exc:
+                failures += 1
+                self.stderr.write(f'{name}: {exc}')
+                continue
+            self.stdout.write(f"{name}: {', '.join(str(w) for w in record['jpeg']) or 'no smaller widths'}")
+        style = self.style.WARNING if failures else self.style.SUCCESS
+        self.stdout.write(style(f'Done; {failures} file(s) failed.'))
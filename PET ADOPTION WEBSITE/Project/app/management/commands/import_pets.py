@@ -0,0 +1,50 @@
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from app import bulk
+
+
+class Command(BaseCommand):
+    help = 'Import pets from a CSV or JSONL file (or - for stdin), reporting invalid rows without stopping'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or '-' for stdin.")
+        parser.add_argument('--format', choices=bulk.FORMATS, help='Defaults to the file extension.')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--posted-by', help='Username recorded as the poster of every imported pet.')
+        parser.add_argument('--dry-run', action='store_true', help='Validate only; write nothing.')
+
+    def handle(self, *args, **options):
+        posted_by = None
+        if options['posted_by']:
+            try:
+                posted_by = User.objects.get(username=options['posted_by'])
+            except User.DoesNotExist:
+                raise CommandError(f"No user named '{options['posted_by']}'.")
+        path = options['path']
+        fmt = options['format'] or ('csv' if path == '-' else bulk.guess_format(path))
+        importer = bulk.PetImporter(
+            batch_size=options['batch_size'], posted_by=posted_by, dry_run=options['dry_run'],
+        )
+
+        def report(line_number, errors):
+            for field, messages in errors.items():
+                self.stderr.write(f"line {line_number}: {field}: {' '.join(messages)}")
+
+        if path == '-':
+            importer.run(bulk.read_rows(sys.stdin, fmt), report)
+        else:
+            try:
+                stream = open(path, newline='', encoding='utf-8')
+            except OSError as exc:
+                raise CommandError(f'Cannot read {path}: {exc.strerror}')
+            with stream:
+                importer.run(bulk.read_rows(stream, fmt), report)
+
+        verb = 'validated' if options['dry_run'] else 'imported'
+        self.stdout.write(self.style.SUCCESS(
+            f'{importer.created} pet(s) {verb}, {importer.breeds_created} new breed(s), '
+            f'{importer.errors} row(s) rejected.'
+        ))
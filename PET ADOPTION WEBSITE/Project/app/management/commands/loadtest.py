@@ -0,0 +1,32 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from app.loadtest import LoadTest
+
+
+class Command(BaseCommand):
+    help = 'Drive every named app route in-process and report throughput and p50/p95/p99 latency as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--anonymous-ratio', type=float, default=0.6,
+                            help='Share of simulated visitors that are not signed in.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout.')
+
+    def handle(self, *args, **options):
+        report = LoadTest(
+            requests=options['requests'],
+            concurrency=options['concurrency'],
+            anonymous_ratio=options['anonymous_ratio'],
+            seed=options['seed'],
+        ).run()
+        payload = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(payload + '\n')
+            self.stderr.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+        else:
+            self.stdout.write(payload)
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from app import counters
+from app.models import Pet, Breed
+
+
+class Command(BaseCommand):
+    help = 'Recompute denormalized review/adoption counters on Pet and Breed and report drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only report drift; exit with an error if any counter is wrong.',
+        )
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        # The scan reads without a transaction, so it never holds the write
+        # lock; each batch of fixes is recomputed and written in its own
+        # short transaction, which sees any counter update made meanwhile.
+        batch_size = options['batch_size']
+        drifted = 0
+        for model, recompute in (
+            (Pet, counters.expected_pet_counters),
+            (Breed, counters.expected_breed_counters),
+        ):
+            pending = []
+            for instance, diff in counters.find_drift(model, recompute(), batch_size):
+                drifted += 1
+                if options['check'] or options['verbosity'] > 1:
+                    details = ', '.join(
+                        f'{field} {stored} -> {wanted}' for field, (stored, wanted) in diff.items()
+                    )
+                    self.stdout.write(f'{model.__name__} {instance.pk}: {details}')
+                if options['check']:
+                    continue
+                pending.append(instance.pk)
+                if len(pending) >= batch_size:
+                    self.fix(model, recompute, pending)
+                    pending = []
+            if pending:
+                self.fix(model, recompute, pending)
+
+        if options['check'] and drifted:
+            raise CommandError(f'{drifted} row(s) have drifted counters.')
+        verb = 'found' if options['check'] else 'fixed'
+        self.stdout.write(self.style.SUCCESS(f'Counters checked; {drifted} drifted row(s) {verb}.'))
+
+    def fix(self, model, recompute, pks):
+        with transaction.atomic():
+            fixed = []
+            for instance, diff in counters.find_drift(model, recompute(pks), pks=pks):
+                for field, (_, wanted) in diff.items():
+                    setattr(instance, field, wanted)
+                fixed.append(instance)
+            model._base_manager.bulk_update(fixed, model.counter_fields)
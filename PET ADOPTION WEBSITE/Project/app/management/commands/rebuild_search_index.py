@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from app import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text pet search index from the pet and breed tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        using = options['database']
+        if not search.is_available(using):
+            raise CommandError(f"No FTS5 search index on database '{using}'; run migrate first.")
+        with transaction.atomic(using=using):
+            search.rebuild_index(using)
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt.'))
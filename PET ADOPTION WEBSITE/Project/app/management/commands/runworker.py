@@ -0,0 +1,32 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from app import jobs
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (image derivatives and other slow side effects) in a thread pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=2, help='Jobs run at the same time.')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds between polls of an empty queue.')
+        parser.add_argument('--once', action='store_true', help='Exit once no job is due instead of waiting for more.')
+
+    def handle(self, *args, **options):
+        worker = jobs.Worker(concurrency=options['concurrency'], poll_interval=options['poll_interval'])
+        # Finish the jobs in hand on SIGTERM/Ctrl-C rather than abandoning them to the lease timeout.
+        previous = {
+            signum: signal.signal(signum, lambda *_: worker.stop())
+            for signum in (signal.SIGINT, signal.SIGTERM)
+        }
+        if not options['once']:
+            self.stdout.write(f'Worker {worker.name} running {worker.concurrency} job(s) at a time.')
+        try:
+            outcomes = worker.run(once=options['once'])
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+        self.stdout.write(self.style.SUCCESS(
+            f"{outcomes['succeeded']} succeeded, {outcomes['retried']} retried, {outcomes['failed']} failed."
+        ))
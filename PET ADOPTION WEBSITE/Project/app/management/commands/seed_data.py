@@ -0,0 +1,140 @@
+import random
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from app import caching, search
+from app.models import Pet, Breed, UserProfile, AdoptionRequest, Review
+
+
+SIZES = ['small', 'medium', 'large', 'extra_large']
+TEMPERAMENTS = ['Friendly', 'Playful', 'Calm', 'Loyal', 'Curious', 'Gentle', 'Energetic']
+PET_NAMES = ['Max', 'Bella', 'Luna', 'Charlie', 'Rocky', 'Daisy', 'Milo', 'Coco', 'Buddy', 'Nala']
+CITIES = ['Manila', 'Quezon City', 'Cebu', 'Davao', 'Makati', 'Pasig', 'Taguig']
+WORDS = (
+    'loves walks playful gentle children cats trained vaccinated energetic calm '
+    'cuddly shy curious friendly apartment yard leash fetch quiet healthy'
+).split()
+# Roughly the production mix of listing states.
+PET_STATUSES = ['available'] * 7 + ['adopted'] * 2 + ['pending']
+REQUEST_STATUSES = ['pending'] * 6 + ['approved'] * 2 + ['rejected'] * 2
+SEED_PASSWORD = 'seedpass123'
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = 'Bulk-generate deterministic synthetic breeds, users, pets, adoption requests and reviews'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--breeds', type=int, default=50)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--pets', type=int, default=5000)
+        parser.add_argument('--requests', type=int, default=10000)
+        parser.add_argument('--reviews', type=int, default=10000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.tag = f"seed{options['seed']}"
+
+        breed_ids = self.create(Breed, self.breeds(options['breeds']))
+        user_ids = self.create(User, self.users(options['users']))
+        self.create(UserProfile, self.profiles(user_ids))
+        pet_ids = self.create(Pet, self.pets(options['pets'], breed_ids, user_ids))
+        self.create(AdoptionRequest, self.adoption_requests(options['requests'], pet_ids, user_ids))
+        self.create(Review, self.reviews(options['reviews'], pet_ids, user_ids))
+
+        # bulk_create skips signals, so rebuild what they would have maintained.
+        call_command('rebuild_counters', stdout=self.stdout)
+        if search.is_available():
+            call_command('rebuild_search_index', stdout=self.stdout)
+        caching.catalog_bulk_changed()
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded with tag '{self.tag}'; every seeded user's password is '{SEED_PASSWORD}'."
+        ))
+
+    def create(self, model, rows):
+        ids = []
+        for batch in batched(rows, self.batch_size):
+            with transaction.atomic():
+                ids.extend(obj.pk for obj in model.objects.bulk_create(batch))
+        self.stdout.write(f'{model.__name__}: {len(ids)} row(s)')
+        return ids
+
+    def breeds(self, count):
+        for i in range(count):
+            yield Breed(
+                name=f'{self.tag} Breed {i}',
+                size=self.rng.choice(SIZES),
+                temperament=', '.join(self.rng.sample(TEMPERAMENTS, 2)),
+                description=self.sentence(12),
+            )
+
+    def users(self, count):
+        password = make_password(SEED_PASSWORD)
+        for i in range(count):
+            yield User(
+                username=f'{self.tag}_user{i}',
+                email=f'{self.tag}_user{i}@example.com',
+                first_name=self.rng.choice(PET_NAMES),
+                password=password,
+            )
+
+    def profiles(self, user_ids):
+        for user_id in user_ids:
+            yield UserProfile(user_id=user_id, city=self.rng.choice(CITIES), bio=self.sentence(10))
+
+    def pets(self, count, breed_ids, user_ids):
+        for i in range(count):
+            yield Pet(
+                name=f'{self.rng.choice(PET_NAMES)} {i}',
+                breed_id=self.rng.choice(breed_ids),
+                age=self.rng.randint(0, 15),
+                description=self.sentence(25),
+                status=self.rng.choice(PET_STATUSES),
+                gender=self.rng.choice(['male', 'female', 'unknown']),
+                health_status=self.sentence(6),
+                posted_by_id=self.rng.choice(user_ids) if user_ids else None,
+            )
+
+    def pairs(self, count, pet_ids, user_ids):
+        """Distinct (pet, user) pairs: k -> (k mod P, (k div P + k mod P) mod U)."""
+        pets, users = len(pet_ids), len(user_ids)
+        for k in range(min(count, pets * users)):
+            p = k % pets
+            yield pet_ids[p], user_ids[(k // pets + p) % users]
+
+    def adoption_requests(self, count, pet_ids, user_ids):
+        for pet_id, user_id in self.pairs(count, pet_ids, user_ids):
+            yield AdoptionRequest(
+                pet_id=pet_id,
+                requester_id=user_id,
+                status=self.rng.choice(REQUEST_STATUSES),
+                motivation=self.sentence(20),
+                home_type=self.rng.choice(['House', 'Apartment', 'Condo']),
+                has_other_pets=self.rng.random() < 0.3,
+            )
+
+    def reviews(self, count, pet_ids, user_ids):
+        for pet_id, user_id in self.pairs(count, pet_ids, list(reversed(user_ids))):
+            yield Review(
+                pet_id=pet_id,
+                author_id=user_id,
+                rating=self.rng.randint(1, 5),
+                title=self.sentence(4),
+                content=self.sentence(30),
+            )
+
+    def sentence(self, words):
+        return ' '.join(self.rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
@@ -0,0 +1,41 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from app import caching, routers
+
+
+class Command(BaseCommand):
+    help = 'Copy the primary SQLite database onto every file-copy read replica'
+
+    def add_arguments(self, parser):
+        parser.add_argument('replicas', nargs='*', help='Replica aliases; defaults to all of REPLICA_DATABASES.')
+
+    def handle(self, *args, **options):
+        replicas = options['replicas'] or settings.REPLICA_DATABASES
+        if not replicas:
+            raise CommandError('No replicas configured; set SQLITE_REPLICAS to the number of replicas.')
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError('sync_replicas only copies SQLite databases.')
+        primary.ensure_connection()
+        started = time.time()
+        for alias in replicas:
+            if alias not in settings.REPLICA_DATABASES:
+                raise CommandError(f"'{alias}' is not a configured replica.")
+            connections[alias].close()
+            # The backup API copies a consistent snapshot while the primary stays writable.
+            target = sqlite3.connect(str(settings.DATABASES[alias]['NAME']))
+            try:
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(f'{alias}: synced')
+        # Every write committed before ``started`` is on the replicas now; visitors pinned
+        # by those writes go back to them. Pages built from the old data stop validating.
+        routers.record_sync(started)
+        caching.catalog_bulk_changed()
+        self.stdout.write(self.style.SUCCESS(f'{len(replicas)} replica(s) synced from the primary.'))
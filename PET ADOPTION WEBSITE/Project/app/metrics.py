@@ -0,0 +1,231 @@
+"""Prometheus metrics for ``/metrics``, aggregated across the worker processes on a host.
+
+Each process keeps its counters and histograms in memory and writes a
+snapshot to its own file in ``settings.METRICS_DIR`` at most every
+``FLUSH_INTERVAL`` seconds (and whenever it serves ``/metrics``). A scrape
+merges every snapshot in the directory, so it reports the host's totals
+whichever worker answers. Files of exited workers are kept so counters never
+go backwards; clear the directory when the service is (re)started, as with
+the multiprocess mode of ``prometheus_client``.
+
+Gauges are not stored: they are read at scrape time from the denormalized
+counters and a partial index, never from a full-table ``COUNT(*)``.
+"""
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Sum
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 20, 50, 100)
+METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+FLUSH_INTERVAL = 5
+GAUGE_CACHE_KEY = 'metrics:gauges'
+GAUGE_CACHE_SECONDS = 30
+
+# name -> (type, help)
+FAMILIES = {
+    'petadopt_requests_total': ('counter', 'Requests served, by URL name, method and status code.'),
+    'petadopt_request_duration_seconds': ('histogram', 'Time spent in the view and middleware below it.'),
+    'petadopt_request_queries': ('histogram', 'Database queries run per request.'),
+    'petadopt_cache_requests_total': ('counter', 'Cache lookups, by cache and hit or miss.'),
+    'petadopt_cache_hit_ratio': ('gauge', 'Share of cache lookups that were hits since the metrics directory was cleared.'),
+    'petadopt_available_pets': ('gauge', 'Pets currently available for adoption.'),
+    'petadopt_pending_adoption_requests': ('gauge', 'Adoption requests waiting for a decision.'),
+    'petadopt_jobs': ('gauge', 'Background jobs that are not finished successfully, by status.'),
+}
+
+
+class Registry:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.last_flush = 0.0
+        # Unique per process start, so a recycled pid never overwrites an exited worker's totals.
+        self.filename = f'{os.getpid()}-{uuid.uuid4().hex[:8]}.json'
+
+    def inc(self, name, labels, value=1):
+        key = (name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, labels, value, buckets):
+        key = (name, labels)
+        with self.lock:
+            state = self.histograms.get(key)
+            if state is None:
+                state = self.histograms[key] = {'buckets': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    state['buckets'][index] += 1
+            state['sum'] += value
+            state['count'] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'counters': [[name, list(labels), value] for (name, labels), value in self.counters.items()],
+                'histograms': [
+                    [name, list(labels), {**state, 'buckets': list(state['buckets'])}]
+                    for (name, labels), state in self.histograms.items()
+                ],
+            }
+
+
+_registry = None
+_registry_pid = None
+_registry_lock = threading.Lock()
+
+
+def registry():
+    """This process's registry; a forked worker starts a fresh one instead of sharing its parent's."""
+    global _registry, _registry_pid
+    if _registry_pid != os.getpid():
+        with _registry_lock:
+            if _registry_pid != os.getpid():
+                _registry = Registry()
+                _registry_pid = os.getpid()
+    return _registry
+
+
+def metrics_dir():
+    return getattr(settings, 'METRICS_DIR', None) or os.path.join(tempfile.gettempdir(), 'petadopt-metrics')
+
+
+def flush(force=False):
+    current = registry()
+    now = time.monotonic()
+    if not force and now - current.last_flush < FLUSH_INTERVAL:
+        return
+    current.last_flush = now
+    directory = metrics_dir()
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, current.filename)
+    temporary = f'{path}.{threading.get_ident()}.tmp'
+    with open(temporary, 'w') as stream:
+        json.dump(current.snapshot(), stream)
+    os.replace(temporary, path)
+
+
+def observe_request(route, method, status, duration, queries=None):
+    current = registry()
+    method = method if method in METHODS else 'other'
+    current.inc('petadopt_requests_total', (('route', route), ('method', method), ('status', str(status))))
+    current.observe('petadopt_request_duration_seconds', (('route', route),), duration, LATENCY_BUCKETS)
+    if queries is not None:
+        current.observe('petadopt_request_queries', (('route', route),), queries, QUERY_BUCKETS)
+    flush()
+
+
+def record_cache_lookup(cache_name, hits, misses):
+    current = registry()
+    if hits:
+        current.inc('petadopt_cache_requests_total', (('cache', cache_name), ('result', 'hit')), hits)
+    if misses:
+        current.inc('petadopt_cache_requests_total', (('cache', cache_name), ('result', 'miss')), misses)
+
+
+def collect():
+    """Merge every process's snapshot into ``(counters, histograms)`` keyed by (name, labels)."""
+    counters, histograms = {}, {}
+    for path in glob.glob(os.path.join(metrics_dir(), '*.json')):
+        try:
+            with open(path) as stream:
+                snapshot = json.load(stream)
+        except (OSError, ValueError):
+            continue
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(tuple(label) for label in labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, state in snapshot['histograms']:
+            key = (name, tuple(tuple(label) for label in labels))
+            merged = histograms.setdefault(key, {'buckets': [0] * len(state['buckets']), 'sum': 0.0, 'count': 0})
+            merged['buckets'] = [a + b for a, b in zip(merged['buckets'], state['buckets'])]
+            merged['sum'] += state['sum']
+            merged['count'] += state['count']
+    return counters, histograms
+
+
+def business_gauges():
+    """Available pets from the per-breed counters, pending requests and job backlog via indexes."""
+    # Imported here: the cache backends import this module before the app registry is ready.
+    from .models import Breed, AdoptionRequest, Job
+
+    gauges = cache.get(GAUGE_CACHE_KEY)
+    if gauges is None:
+        jobs = dict(
+            Job.objects.filter(status__in=['queued', 'running', 'failed'])
+            .order_by().values_list('status').annotate(Count('id'))
+        )
+        gauges = {
+            'available_pets': Breed.objects.aggregate(total=Sum('available_pets'))['total'] or 0,
+            # Answered from the partial index on pending requests alone.
+            'pending_requests': AdoptionRequest.objects.filter(status='pending').count(),
+            'jobs': {status: jobs.get(status, 0) for status in ('queued', 'running', 'failed')},
+        }
+        cache.set(GAUGE_CACHE_KEY, gauges, GAUGE_CACHE_SECONDS)
+    return gauges
+
+
+def _labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render():
+    """The Prometheus text exposition (format 0.0.4) of the host-wide metrics."""
+    flush(force=True)
+    counters, histograms = collect()
+    samples = {name: [] for name in FAMILIES}
+    for (name, labels), value in sorted(counters.items()):
+        samples[name].append(f'{name}{_labels(labels)} {_number(value)}')
+    for (name, labels), state in sorted(histograms.items()):
+        buckets = LATENCY_BUCKETS if name == 'petadopt_request_duration_seconds' else QUERY_BUCKETS
+        for bound, count in zip(buckets, state['buckets']):
+            samples[name].append(f'{name}_bucket{_labels(labels, le=bound)} {count}')
+        samples[name].append(f'{name}_bucket{_labels(labels, le="+Inf")} {state["count"]}')
+        samples[name].append(f'{name}_sum{_labels(labels)} {_number(state["sum"])}')
+        samples[name].append(f'{name}_count{_labels(labels)} {state["count"]}')
+
+    lookups = {}
+    for (name, labels), value in counters.items():
+        if name == 'petadopt_cache_requests_total':
+            labels = dict(labels)
+            hits, total = lookups.get(labels['cache'], (0, 0))
+            lookups[labels['cache']] = (hits + (value if labels['result'] == 'hit' else 0), total + value)
+    for cache_name, (hits, total) in sorted(lookups.items()):
+        samples['petadopt_cache_hit_ratio'].append(
+            f'petadopt_cache_hit_ratio{_labels((("cache", cache_name),))} {_number(hits / total)}'
+        )
+
+    gauges = business_gauges()
+    samples['petadopt_available_pets'].append(f'petadopt_available_pets {gauges["available_pets"]}')
+    samples['petadopt_pending_adoption_requests'].append(
+        f'petadopt_pending_adoption_requests {gauges["pending_requests"]}'
+    )
+    for status, count in gauges['jobs'].items():
+        samples['petadopt_jobs'].append(f'petadopt_jobs{_labels((("status", status),))} {count}')
+
+    lines = []
+    for name, (kind, help_text) in FAMILIES.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        lines.extend(samples[name])
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,194 @@
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+
+from . import instrumentation, metrics, profiler, routers
+
+
+PIN_COOKIE = 'primary_pin'
+
+request_logger = logging.getLogger('app.requests')
+
+
+class SyncAndAsyncMiddleware:
+    """Middleware that runs natively under both WSGI and ASGI.
+
+    Django adapts everything below a sync-only middleware to sync, which would
+    put every async view back on a thread. Subclasses implement ``handle`` and
+    ``ahandle``; the one matching the rest of the chain is called.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.ahandle(request)
+        return self.handle(request)
+
+
+class ReplicaPinningMiddleware(SyncAndAsyncMiddleware):
+    """Route this request's reads and pin visitors to the primary after they write."""
+
+    safe_methods = ('GET', 'HEAD', 'OPTIONS')
+
+    def is_pinned(self, request):
+        """Whether the visitor wrote since the replicas were last synced."""
+        try:
+            wrote_at = float(request.COOKIES[PIN_COOKIE])
+        except (KeyError, ValueError):
+            return False
+        synced_at = routers.replicas_synced_at()
+        return synced_at is None or synced_at <= wrote_at
+
+    def begin(self, request):
+        return routers.begin_request(request.method in self.safe_methods and not self.is_pinned(request))
+
+    def handle(self, request):
+        state, token = self.begin(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.end_request(token)
+        return self.pin(state, response)
+
+    async def ahandle(self, request):
+        state, token = self.begin(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            routers.end_request(token)
+        return self.pin(state, response)
+
+    def pin(self, state, response):
+        if state.wrote:
+            response.set_cookie(
+                PIN_COOKIE, str(time.time()),
+                max_age=settings.REPLICA_PIN_MAX_SECONDS, httponly=True, samesite='Lax',
+            )
+        return response
+
+
+class RequestProfilingMiddleware(SyncAndAsyncMiddleware):
+    """Profile a sample of requests: query count, SQL and template time, repeated queries.
+
+    Results go out as a ``Server-Timing`` header (visible in the browser's
+    network panel) and as a JSON log line on ``app.requests`` tagged with the
+    URL name. ``REQUEST_PROFILING_SAMPLE_RATE`` is the share of requests
+    profiled; the rest only count their queries for ``MetricsMiddleware``.
+    Template time includes any queries the template runs lazily.
+    """
+
+    def begin(self, request):
+        rate = settings.REQUEST_PROFILING_SAMPLE_RATE
+        profile, token = instrumentation.start(detailed=bool(rate) and random.random() < rate)
+        request.profile = profile
+        return profile, token
+
+    def handle(self, request):
+        profile, token = self.begin(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            instrumentation.stop(token)
+        return self.report(request, response, profile)
+
+    async def ahandle(self, request):
+        profile, token = self.begin(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            instrumentation.stop(token)
+        return self.report(request, response, profile)
+
+    def report(self, request, response, profile):
+        if profile.detailed:
+            summary = profile.summary(request, response)
+            response['Server-Timing'] = profile.server_timing(summary)
+            instrumentation.log(request_logger, summary)
+        return response
+
+    def process_template_response(self, request, response):
+        profile = getattr(request, 'profile', None)
+        if profile is not None and profile.detailed:
+            # Outermost middleware: this runs last, right before the response is rendered.
+            started = time.perf_counter()
+
+            def rendered(response):
+                profile.template_time += time.perf_counter() - started
+
+            response.add_post_render_callback(rendered)
+        return response
+
+
+class MetricsMiddleware(SyncAndAsyncMiddleware):
+    """Count every request and observe its latency and query count per URL name for ``/metrics``."""
+
+    def handle(self, request):
+        started = time.perf_counter()
+        return self.observe(request, self.get_response(request), started)
+
+    async def ahandle(self, request):
+        started = time.perf_counter()
+        return self.observe(request, await self.get_response(request), started)
+
+    def observe(self, request, response, started):
+        profile = getattr(request, 'profile', None)
+        metrics.observe_request(
+            request.resolver_match.view_name if request.resolver_match else 'unmatched',
+            request.method, response.status_code, time.perf_counter() - started,
+            profile.queries if profile is not None else None,
+        )
+        return response
+
+
+class ProfilerMiddleware(SyncAndAsyncMiddleware):
+    """Profile the view and its rendering when a staff user asks for it; see ``app.profiler``.
+
+    Under ASGI only the event loop thread is traced: sync code Django runs in
+    a thread shows up as waiting, and other requests on the loop at the same
+    time can appear in the tree.
+    """
+
+    def begin(self, request):
+        profile = getattr(request, 'profile', None)
+        if profile is not None:
+            profile.timeline = []
+        return profile
+
+    def finish(self, profile):
+        timeline = profile.timeline if profile is not None else []
+        if profile is not None:
+            profile.timeline = None
+        return timeline
+
+    def handle(self, request):
+        if not profiler.requested(request):
+            return self.get_response(request)
+        profile = self.begin(request)
+        with profiler.CallTree() as tree:
+            response = self.get_response(request)
+        timeline = self.finish(profile)
+        response['X-Profile-Id'] = profiler.save(request, response, tree.as_dict(), timeline, tree.started)
+        return response
+
+    async def ahandle(self, request):
+        if not await profiler.arequested(request):
+            return await self.get_response(request)
+        profile = self.begin(request)
+        with profiler.CallTree() as tree:
+            response = await self.get_response(request)
+        timeline = self.finish(profile)
+        response['X-Profile-Id'] = await sync_to_async(profiler.save)(
+            request, response, tree.as_dict(), timeline, tree.started,
+        )
+        return response
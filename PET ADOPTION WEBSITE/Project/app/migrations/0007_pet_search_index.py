@@ -0,0 +1,35 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    """Create and populate the FTS5 index used for pet search (SQLite only)"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS app_pet_search USING fts5("
+        "name, breed, description, health_status, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    schema_editor.execute(
+        "INSERT INTO app_pet_search (rowid, name, breed, description, health_status) "
+        "SELECT app_pet.id, app_pet.name, app_breed.name, app_pet.description, app_pet.health_status "
+        "FROM app_pet INNER JOIN app_breed ON app_breed.id = app_pet.breed_id"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    """Reverse the migration"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS app_pet_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_populate_breeds'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
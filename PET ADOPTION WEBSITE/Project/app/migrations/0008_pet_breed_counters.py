@@ -0,0 +1,70 @@
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def populate_counters(apps, schema_editor):
+    """Fill the new counter columns from the existing review and request rows"""
+    Pet = apps.get_model('app', 'Pet')
+    Breed = apps.get_model('app', 'Breed')
+    Review = apps.get_model('app', 'Review')
+    AdoptionRequest = apps.get_model('app', 'AdoptionRequest')
+
+    for row in Review.objects.values('pet_id').annotate(n=Count('id'), total=Sum('rating')).order_by():
+        Pet.objects.filter(pk=row['pet_id']).update(review_count=row['n'], rating_sum=row['total'])
+
+    requests = AdoptionRequest.objects.values('pet_id').annotate(
+        n=Count('id'),
+        pending=Count('id', filter=Q(status='pending')),
+        approved=Count('id', filter=Q(status='approved')),
+    ).order_by()
+    for row in requests:
+        Pet.objects.filter(pk=row['pet_id']).update(
+            adoption_request_count=row['n'],
+            pending_request_count=row['pending'],
+            approved_request_count=row['approved'],
+        )
+
+    available = Pet.objects.filter(status='available').values('breed_id').annotate(n=Count('id')).order_by()
+    for row in available:
+        Breed.objects.filter(pk=row['breed_id']).update(available_pets=row['n'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_pet_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='breed',
+            name='available_pets',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='pet',
+            name='adoption_request_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='pet',
+            name='approved_request_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='pet',
+            name='pending_request_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='pet',
+            name='rating_sum',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='pet',
+            name='review_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
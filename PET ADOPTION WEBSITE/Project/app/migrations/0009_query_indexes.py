@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_pet_breed_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='adoptionrequest',
+            index=models.Index(fields=['requester', 'status'], name='adoption_requester_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='adoptionrequest',
+            index=models.Index(fields=['pet', 'status'], name='adoption_pet_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='adoptionrequest',
+            index=models.Index(fields=['-requested_date'], name='adoption_requested_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pet',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='pet_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pet',
+            index=models.Index(fields=['status', 'gender', 'breed'], name='pet_status_gender_breed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pet',
+            index=models.Index(fields=['posted_by', '-created_at'], name='pet_posted_by_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['pet', 'author'], name='review_pet_author_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['-created_at'], name='review_created_idx'),
+        ),
+    ]
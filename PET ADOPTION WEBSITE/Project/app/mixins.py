@@ -0,0 +1,26 @@
+class QueryPlanMixin:
+    """Declare how a view's queryset is eager-loaded and how many queries a page may cost.
+
+    The plan is applied on top of ``super().get_queryset()``, so views that
+    filter further should start from ``super().get_queryset()`` as well.
+    ``query_budget`` is the maximum number of queries a full page render may
+    run (session, auth and template lookups included); it is enforced by the
+    route walk in ``app/tests.py``.
+    """
+
+    select_related = ()
+    prefetch_related = ()
+    only_fields = ()
+    query_budget = None
+
+    def apply_query_plan(self, queryset):
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        if self.only_fields:
+            queryset = queryset.only(*self.only_fields)
+        return queryset
+
+    def get_queryset(self):
+        return self.apply_query_plan(super().get_queryset())
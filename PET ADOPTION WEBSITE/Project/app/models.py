@@ -1,16 +1,76 @@
-from django.db import models
+from django.db import models, router, transaction
+from django.utils import timezone
 from django.urls import reverse
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 
 
-class Breed(models.Model):
+class CounterFieldsMixin:
+    """Keep ``save()`` from overwriting counters that are maintained with F() updates."""
+
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class AtomicSaveMixin:
+    """Run ``save()`` and its signals in one transaction.
+
+    The counter receivers in ``app.counters`` read the row's old values in
+    pre_save and apply the difference in post_save; inside one transaction,
+    holding the row's lock, a concurrent save of the same row cannot apply
+    the same difference twice.
+    """
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+
+
+class ImageFieldsMixin:
+    """Remember the stored names of ``image_fields``, so a save can tell whether an image changed."""
+
+    image_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_images = instance._image_names()
+        return instance
+
+    def _image_names(self):
+        # Deferred fields are left out rather than loaded.
+        return {name: str(self.__dict__[name] or '') for name in self.image_fields if name in self.__dict__}
+
+    def image_changed(self, field_name):
+        """Whether ``field_name`` holds another file than the one last loaded or saved; always, for a new row."""
+        if field_name not in self.__dict__:
+            return False
+        saved = getattr(self, '_saved_images', {})
+        return str(getattr(self, field_name) or '') != saved.get(field_name)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._saved_images = self._image_names()
+
+
+class Breed(CounterFieldsMixin, models.Model):
 
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True)
     size = models.CharField(max_length=20, choices=[('small', 'Small'), ('medium', 'Medium'), ('large', 'Large'), ('extra_large', 'Extra Large')], blank=True)
     temperament = models.CharField(max_length=200, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    available_pets = models.IntegerField(default=0, editable=False)
+    
+    counter_fields = ('available_pets',)
     
     class Meta:
         ordering = ['name']
@@ -23,7 +83,7 @@ class Breed(models.Model):
 
 
 
-class Pet(models.Model):
+class Pet(AtomicSaveMixin, CounterFieldsMixin, ImageFieldsMixin, models.Model):
 
     PET_STATUS_CHOICES = [
         ('available', 'Available'),
@@ -43,15 +103,40 @@ class Pet(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     posted_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posted_pets', null=True, blank=True)
+    review_count = models.IntegerField(default=0, editable=False)
+    rating_sum = models.IntegerField(default=0, editable=False)
+    adoption_request_count = models.IntegerField(default=0, editable=False)
+    pending_request_count = models.IntegerField(default=0, editable=False)
+    approved_request_count = models.IntegerField(default=0, editable=False)
+    
+    counter_fields = (
+        'review_count', 'rating_sum', 'adoption_request_count',
+        'pending_request_count', 'approved_request_count',
+    )
+    image_fields = ('image',)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', '-created_at', '-id'], name='pet_status_created_idx'),
+            models.Index(fields=['status', 'gender', 'breed'], name='pet_status_gender_breed_idx'),
+            models.Index(fields=['posted_by', '-created_at'], name='pet_posted_by_created_idx'),
+            models.Index(fields=['-created_at'], name='pet_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.breed.name})"
     
+    @property
+    def average_rating(self):
+        if not self.review_count:
+            return None
+        return self.rating_sum / self.review_count
+    
     def get_absolute_url(self):
         return reverse('pet_detail', kwargs={"pk": self.pk})
 
 
-class UserProfile(models.Model):
+class UserProfile(ImageFieldsMixin, models.Model):
 
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     phone = models.CharField(max_length=15, blank=True)
@@ -65,6 +150,14 @@ class UserProfile(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    image_fields = ('profile_picture',)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at'], name='profile_created_idx'),
+            models.Index(fields=['is_verified', '-created_at'], name='profile_verified_created_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.user.username}'s Profile"
     
@@ -72,7 +165,7 @@ class UserProfile(models.Model):
         return reverse('profile_detail', kwargs={"pk": self.pk})
 
 
-class AdoptionRequest(models.Model):
+class AdoptionRequest(AtomicSaveMixin, models.Model):
 
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -93,6 +186,14 @@ class AdoptionRequest(models.Model):
     
     class Meta:
         unique_together = ('pet', 'requester')
+        indexes = [
+            models.Index(fields=['requester', 'status'], name='adoption_requester_status_idx'),
+            models.Index(fields=['pet', 'status'], name='adoption_pet_status_idx'),
+            models.Index(fields=['-requested_date'], name='adoption_requested_idx'),
+            models.Index(fields=['status', '-requested_date'], name='adoption_status_requested_idx'),
+            # Only the pending rows: keeps the /metrics gauge and approval checks off the full table.
+            models.Index(fields=['pet'], condition=models.Q(status='pending'), name='adoption_pending_idx'),
+        ]
     
     def __str__(self):
         return f"{self.requester.username} - {self.pet.name}"
@@ -101,7 +202,7 @@ class AdoptionRequest(models.Model):
         return reverse('adoption_request_detail', kwargs={"pk": self.pk})
 
 
-class Review(models.Model):
+class Review(AtomicSaveMixin, models.Model):
 
     pet = models.ForeignKey(Pet, on_delete=models.CASCADE, related_name='reviews')
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='pet_reviews')
@@ -111,8 +212,56 @@ class Review(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['pet', 'author'], name='review_pet_author_idx'),
+            models.Index(fields=['-created_at'], name='review_created_idx'),
+            models.Index(fields=['rating', '-created_at'], name='review_rating_created_idx'),
+        ]
+    
     def __str__(self):
         return f"Review by {self.author.username} for {self.pet.name}"
     
     def get_absolute_url(self):
-        return reverse('review_detail', kwargs={"pk": self.pk})
\ No newline at end of file
+        return reverse('review_detail', kwargs={"pk": self.pk})
+
+
+class Job(models.Model):
+
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+    
+    task = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    # Enqueueing twice with the same key returns the existing job.
+    idempotency_key = models.CharField(max_length=200, unique=True, null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+            models.Index(fields=['-created_at'], name='job_created_idx'),
+            models.Index(fields=['task', '-created_at'], name='job_task_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.status})"
+    
+    @property
+    def error_summary(self):
+        lines = self.last_error.strip().splitlines()
+        return lines[-1] if lines else ''
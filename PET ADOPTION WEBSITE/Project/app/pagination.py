@@ -0,0 +1,192 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values, direction):
+    payload = {
+        'd': direction,
+        'v': [{'dt': v.isoformat()} if isinstance(v, datetime) else v for v in values],
+    }
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, key_count):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        direction = payload['d']
+        values = [
+            datetime.fromisoformat(v['dt']) if isinstance(v, dict) else v
+            for v in payload['v']
+        ]
+    except (binascii.Error, ValueError, KeyError, TypeError) as exc:
+        raise InvalidCursor('Malformed cursor') from exc
+    if direction not in ('next', 'prev') or len(values) != key_count:
+        raise InvalidCursor('Malformed cursor')
+    return values, direction
+
+
+class CursorPage:
+
+    def __init__(self, items, next_cursor, prev_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+
+class CursorPaginator:
+    """Keyset pagination over a fixed, unique ordering such as ``('-created_at', '-id')``.
+
+    Each page is a single indexed range scan of ``limit + 1`` rows, so the
+    cost does not grow with how deep a client pages. Rows may be model
+    instances or ``values()`` dicts; every ordering key must be readable
+    from them.
+    """
+
+    def __init__(self, queryset, ordering):
+        self.queryset = queryset
+        self.ordering = [
+            (key.lstrip('-'), key.startswith('-')) for key in ordering
+        ]
+
+    def _order_by(self, reverse):
+        return [
+            f"{'-' if descending != reverse else ''}{name}"
+            for name, descending in self.ordering
+        ]
+
+    def _after(self, values, reverse):
+        """Rows strictly after ``values`` in the (possibly reversed) ordering."""
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(self.ordering, values):
+            lookup = 'lt' if descending != reverse else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def _clean(self, values):
+        """Convert decoded values with the ordering's fields, so a forged cursor cannot reach the query."""
+        query = self.queryset.query
+        fields = [
+            query.annotations[name].output_field if name in query.annotations
+            else self.queryset.model._meta.get_field(name)
+            for name, _ in self.ordering
+        ]
+        try:
+            cleaned = [field.to_python(value) for field, value in zip(fields, values)]
+        except (ValidationError, TypeError, ValueError) as exc:
+            raise InvalidCursor('Malformed cursor') from exc
+        if any(value is None for value in cleaned):
+            raise InvalidCursor('Malformed cursor')
+        return cleaned
+
+    def _key(self, row):
+        if isinstance(row, dict):
+            return [row[name] for name, _ in self.ordering]
+        return [getattr(row, name) for name, _ in self.ordering]
+
+    def _window(self, cursor, limit):
+        """Return the query for one page and whether it walks backwards."""
+        reverse = False
+        queryset = self.queryset
+        if cursor:
+            values, direction = decode_cursor(cursor, len(self.ordering))
+            values = self._clean(values)
+            reverse = direction == 'prev'
+            queryset = queryset.filter(self._after(values, reverse))
+        return queryset.order_by(*self._order_by(reverse))[:limit + 1], reverse
+
+    def _build_page(self, rows, cursor, limit, reverse):
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if reverse:
+            rows.reverse()
+
+        next_cursor = prev_cursor = None
+        if rows:
+            if has_more or reverse:
+                next_cursor = encode_cursor(self._key(rows[-1]), 'next')
+            if cursor and (has_more or not reverse):
+                prev_cursor = encode_cursor(self._key(rows[0]), 'prev')
+        return CursorPage(rows, next_cursor, prev_cursor)
+
+    def page(self, cursor, limit):
+        queryset, reverse = self._window(cursor, limit)
+        return self._build_page(list(queryset), cursor, limit, reverse)
+
+    async def apage(self, cursor, limit):
+        queryset, reverse = self._window(cursor, limit)
+        return self._build_page([row async for row in queryset], cursor, limit, reverse)
+
+
+def estimated_row_count(model, using):
+    """The table size from database statistics, without counting; ``None`` if unavailable."""
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+        elif connection.vendor == 'mysql':
+            cursor.execute(
+                'SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s',
+                [table],
+            )
+        elif connection.vendor == 'sqlite':
+            # The highest rowid is one seek; deleted rows make it an overestimate.
+            cursor.execute(f'SELECT MAX(rowid) FROM {connection.ops.quote_name(table)}')
+        else:
+            return None
+        row = cursor.fetchone()
+    # PostgreSQL reports -1 for a table that was never analyzed.
+    return row[0] if row and row[0] is not None and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator for admin changelists over tables too large to ``COUNT(*)`` on every page view.
+
+    An unfiltered list of more than ``estimate_above`` rows uses the table
+    estimate above. A filtered list is counted exactly up to
+    ``max_exact_count`` rows (``COUNT`` over a ``LIMIT`` subquery) and
+    reported as that many beyond it, so filters never scan millions of rows
+    just to print a total.
+    """
+
+    estimate_above = 100000
+    max_exact_count = 100000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return super().count
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > self.estimate_above:
+                return estimate
+        return queryset[:self.max_exact_count].count()
+
+
+class CountedPaginator(Paginator):
+    """Paginator given a row count fetched beforehand, e.g. concurrently with the page by an async view."""
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.known_count = count
+
+    @cached_property
+    def count(self):
+        return self.known_count
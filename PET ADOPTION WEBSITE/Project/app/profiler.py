@@ -0,0 +1,308 @@
+"""On-demand call-tree profiles of single requests, for staff.
+
+A staff user adds ``?_profile=1`` to a URL (or sends ``X-Profile: 1``) and
+``ProfilerMiddleware`` runs the view and template rendering under a
+``sys.setprofile`` hook that builds the full call tree with wall time per
+node, alongside the timeline of SQL queries from ``app.instrumentation``.
+The result is written to ``settings.PROFILES_DIR`` as one file per request:
+a summary line (read by the list page without loading the trees) followed by
+the full profile. The oldest files beyond ``MAX_STORED_PROFILES`` are removed.
+
+Tracing slows the profiled request down several times; compare profiles with
+each other, not with normal response times. Only the request thread is
+traced, so work an async view hands to other threads appears as the time
+spent waiting for it.
+"""
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+from .instrumentation import signature
+
+
+PROFILE_PARAM = '_profile'
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+MAX_STORED_PROFILES = 500
+# Nodes smaller than this are folded into their parent's self time when saved.
+MIN_NODE_MS = 0.05
+MAX_SQL_LENGTH = 1000
+
+_ID = re.compile(r'^[0-9]{8}-[0-9]{6}-[0-9a-f]{8}$')
+_prune_lock = threading.Lock()
+
+
+def _flag(request):
+    return request.GET.get(PROFILE_PARAM) or request.META.get(PROFILE_HEADER)
+
+
+def requested(request):
+    return _flag(request) not in (None, '', '0') and request.user.is_staff
+
+
+async def arequested(request):
+    return _flag(request) not in (None, '', '0') and (await request.auser()).is_staff
+
+
+def _label(frame, event, arg):
+    if event == 'c_call':
+        module = getattr(arg, '__module__', None) or 'builtins'
+        return f'{module}.{getattr(arg, "__qualname__", repr(arg))}'
+    code = frame.f_code
+    path = code.co_filename.replace(os.sep, '/').split('/')
+    return f'{code.co_qualname} ({"/".join(path[-2:])}:{code.co_firstlineno})'
+
+
+class CallTree:
+    """Wall time per call path, collected with ``sys.setprofile`` on the current thread."""
+
+    def __init__(self):
+        self.root = {'name': 'request', 'total': 0.0, 'calls': 1, 'children': {}}
+        self.stack = []
+        self.started = None
+
+    def hook(self, frame, event, arg):
+        if event == 'call' or event == 'c_call':
+            children = self.stack[-1][0]['children']
+            label = _label(frame, event, arg)
+            node = children.get(label)
+            if node is None:
+                node = children[label] = {'name': label, 'total': 0.0, 'calls': 0, 'children': {}}
+            self.stack.append((node, time.perf_counter()))
+        elif len(self.stack) > 1:
+            # return, c_return or c_exception. The hook's own frames are never pushed.
+            node, started = self.stack.pop()
+            node['total'] += time.perf_counter() - started
+            node['calls'] += 1
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        self.stack = [(self.root, self.started)]
+        sys.setprofile(self.hook)
+        return self
+
+    def __exit__(self, *exc_info):
+        sys.setprofile(None)
+        finished = time.perf_counter()
+        # Frames still open when tracing stopped (the middleware's own) end now.
+        while len(self.stack) > 1:
+            node, started = self.stack.pop()
+            node['total'] += finished - started
+            node['calls'] += 1
+        self.root['total'] = finished - self.started
+
+    def as_dict(self):
+        return _export(self.root)
+
+
+def _export(node):
+    total_ms = 1000 * node['total']
+    children = [
+        _export(child) for child in sorted(node['children'].values(), key=lambda child: -child['total'])
+        if 1000 * child['total'] >= MIN_NODE_MS
+    ]
+    return {
+        'name': node['name'],
+        'total_ms': round(total_ms, 3),
+        'self_ms': round(max(total_ms - sum(child['total_ms'] for child in children), 0), 3),
+        'calls': node['calls'],
+        'children': children,
+    }
+
+
+def profiles_dir():
+    return getattr(settings, 'PROFILES_DIR', None) or os.path.join(tempfile.gettempdir(), 'petadopt-profiles')
+
+
+def save(request, response, tree, timeline, started):
+    """Write one profile and return its id; ``timeline`` holds ``(start, duration, sql)`` perf_counter tuples."""
+    now = datetime.now(timezone.utc)
+    profile_id = f'{now:%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}'
+    queries = [
+        {
+            'start_ms': round(1000 * (query_start - started), 3),
+            'duration_ms': round(1000 * duration, 3),
+            'sql': sql[:MAX_SQL_LENGTH],
+        }
+        for query_start, duration, sql in timeline
+    ]
+    summary = {
+        'id': profile_id,
+        'created': now.isoformat(),
+        'url_name': request.resolver_match.view_name if request.resolver_match else 'unmatched',
+        'method': request.method,
+        'path': request.get_full_path(),
+        'status': response.status_code,
+        'user': request.user.get_username(),
+        'duration_ms': tree['total_ms'],
+        'query_count': len(queries),
+        'sql_ms': round(sum(query['duration_ms'] for query in queries), 3),
+    }
+    directory = profiles_dir()
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{profile_id}.jsonl')
+    with open(f'{path}.tmp', 'w') as stream:
+        stream.write(json.dumps(summary) + '\n')
+        stream.write(json.dumps({'tree': tree, 'queries': queries}) + '\n')
+    os.replace(f'{path}.tmp', path)
+    prune()
+    return profile_id
+
+
+def prune(keep=MAX_STORED_PROFILES):
+    with _prune_lock:
+        names = sorted(name for name in os.listdir(profiles_dir()) if name.endswith('.jsonl'))
+        for name in names[:-keep]:
+            try:
+                os.remove(os.path.join(profiles_dir(), name))
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles(url_name=None):
+    """Summaries of the stored profiles, newest first."""
+    directory = profiles_dir()
+    if not os.path.isdir(directory):
+        return []
+    summaries = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        if not name.endswith('.jsonl'):
+            continue
+        try:
+            with open(os.path.join(directory, name)) as stream:
+                summary = json.loads(stream.readline())
+        except (OSError, ValueError):
+            continue
+        if url_name is None or summary['url_name'] == url_name:
+            summaries.append(summary)
+    return summaries
+
+
+def load(profile_id):
+    """The full profile (summary plus ``tree`` and ``queries``), or ``None``."""
+    if not _ID.match(profile_id or ''):
+        return None
+    try:
+        with open(os.path.join(profiles_dir(), f'{profile_id}.jsonl')) as stream:
+            summary = json.loads(stream.readline())
+            summary.update(json.loads(stream.readline()))
+    except (OSError, ValueError):
+        return None
+    return summary
+
+
+def folded(tree, prefix=()):
+    """``{call path: self ms}``, the "folded stacks" a flame graph is drawn from."""
+    path = prefix + (tree['name'],)
+    stacks = {path: tree['self_ms']} if tree['self_ms'] else {}
+    for child in tree['children']:
+        for stack, self_ms in folded(child, path).items():
+            stacks[stack] = stacks.get(stack, 0) + self_ms
+    return stacks
+
+
+def merge(trees):
+    """Average several call trees into one, e.g. every stored profile of a route."""
+    totals = {}
+    for tree in trees:
+        for stack, self_ms in folded(tree).items():
+            totals[stack] = totals.get(stack, 0) + self_ms / len(trees)
+    root = {'name': 'request', 'self_ms': 0.0, 'children': {}}
+    for stack, self_ms in totals.items():
+        node = root
+        for name in stack[1:]:
+            node = node['children'].setdefault(name, {'name': name, 'self_ms': 0.0, 'children': {}})
+        node['self_ms'] += self_ms
+    return _close(root)
+
+
+def _close(node):
+    children = sorted((_close(child) for child in node['children'].values()), key=lambda child: -child['total_ms'])
+    return {
+        'name': node['name'],
+        'self_ms': round(node['self_ms'], 3),
+        'total_ms': round(node['self_ms'] + sum(child['total_ms'] for child in children), 3),
+        'calls': None,
+        'children': children,
+    }
+
+
+def flame_rows(tree, min_width=0.2):
+    """Boxes per depth for an icicle-style flame graph; positions and widths in % of the root."""
+    rows = []
+    scale = 100 / tree['total_ms'] if tree['total_ms'] else 0
+
+    def place(node, depth, left):
+        width = node['total_ms'] * scale
+        if width < min_width:
+            return
+        if len(rows) <= depth:
+            rows.append([])
+        rows[depth].append({'name': node['name'], 'left': round(left, 3), 'width': round(width, 3),
+                            'total_ms': node['total_ms'], 'self_ms': node['self_ms']})
+        offset = left
+        for child in node['children']:
+            place(child, depth + 1, offset)
+            offset += child['total_ms'] * scale
+
+    place(tree, 0, 0)
+    return rows
+
+
+def tree_rows(tree, min_share=0.005):
+    """The call tree as indented rows, skipping nodes under ``min_share`` of the request."""
+    rows = []
+    threshold = tree['total_ms'] * min_share
+
+    def walk(node, depth):
+        if node['total_ms'] < threshold:
+            return
+        rows.append({**node, 'depth': depth, 'indent': depth * 12, 'children': None})
+        for child in node['children']:
+            walk(child, depth + 1)
+
+    walk(tree, 0)
+    return rows
+
+
+def self_times(tree):
+    """Self time per function across the whole tree."""
+    times = {}
+    for stack, self_ms in folded(tree).items():
+        times[stack[-1]] = times.get(stack[-1], 0) + self_ms
+    return times
+
+
+def compare(first, second, limit=30):
+    """Functions and query signatures whose cost differs most between two profiles."""
+    functions = []
+    before, after = self_times(first['tree']), self_times(second['tree'])
+    for name in before.keys() | after.keys():
+        a, b = before.get(name, 0), after.get(name, 0)
+        functions.append({'name': name, 'first': round(a, 3), 'second': round(b, 3), 'delta': round(b - a, 3)})
+    functions.sort(key=lambda row: -abs(row['delta']))
+
+    def by_signature(profile):
+        counts = {}
+        for query in profile['queries']:
+            key = signature(query['sql'])
+            count, duration = counts.get(key, (0, 0))
+            counts[key] = (count + 1, duration + query['duration_ms'])
+        return counts
+
+    queries = []
+    before, after = by_signature(first), by_signature(second)
+    for sql in before.keys() | after.keys():
+        (a_count, a_ms), (b_count, b_ms) = before.get(sql, (0, 0)), after.get(sql, (0, 0))
+        if (a_count, round(a_ms)) != (b_count, round(b_ms)):
+            queries.append({'sql': sql[:300], 'first': a_count, 'second': b_count,
+                            'first_ms': round(a_ms, 3), 'second_ms': round(b_ms, 3)})
+    queries.sort(key=lambda row: -abs(row['second_ms'] - row['first_ms']))
+    return functions[:limit], queries[:limit]
@@ -0,0 +1,77 @@
+"""Primary/replica database routing.
+
+Writes always go to ``default``. Reads go to one of ``settings.REPLICA_DATABASES``
+only while a safe (GET/HEAD) request is being served and the visitor is not
+pinned to the primary; management commands, background threads and tests
+without a request read the primary. ``ReplicaPinningMiddleware`` pins a
+visitor to the primary from a request of theirs that wrote until the next
+``sync_replicas`` run after it, so they read their own changes however long
+the replicas lag. The time of the last sync is kept in the shared default
+cache.
+"""
+import contextvars
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+# Sessions must be read back right after login/logout, whatever the replica lag.
+PRIMARY_ONLY_APPS = {'sessions'}
+
+_request_state = contextvars.ContextVar('replica_routing', default=None)
+
+REPLICAS_SYNCED_KEY = 'replicas:synced_at'
+
+
+class RoutingState:
+    """Per-request routing decision, shared by reference across sync/async hops."""
+
+    def __init__(self, replica=None):
+        self.replica = replica
+        self.wrote = False
+
+
+def begin_request(use_replica):
+    replicas = getattr(settings, 'REPLICA_DATABASES', [])
+    state = RoutingState(random.choice(replicas) if use_replica and replicas else None)
+    return state, _request_state.set(state)
+
+
+def end_request(token):
+    _request_state.reset(token)
+
+
+def replicas_synced_at():
+    """When the last completed ``sync_replicas`` started copying, as a Unix timestamp; ``None`` if unknown."""
+    return cache.get(REPLICAS_SYNCED_KEY)
+
+
+def record_sync(started):
+    cache.set(REPLICAS_SYNCED_KEY, started, None)
+
+
+class PrimaryReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        state = _request_state.get()
+        if (state is None or state.replica is None or state.wrote
+                or model._meta.app_label in PRIMARY_ONLY_APPS
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            # Later reads in this request see the write, and the middleware pins the visitor.
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas are copies of the primary made by ``sync_replicas``.
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,144 @@
+import re
+
+from django.db import connections, router
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from .models import Pet
+
+
+SEARCH_TABLE = 'app_pet_search'
+
+# bm25() column weights, in the order the columns are declared below.
+COLUMN_WEIGHTS = (10.0, 5.0, 1.0, 0.5)
+
+CREATE_TABLE_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+    "name, breed, description, health_status, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+
+POPULATE_SQL = (
+    f"INSERT INTO {SEARCH_TABLE} (rowid, name, breed, description, health_status) "
+    "SELECT app_pet.id, app_pet.name, app_breed.name, app_pet.description, app_pet.health_status "
+    "FROM app_pet INNER JOIN app_breed ON app_breed.id = app_pet.breed_id"
+)
+
+# The ranked matches are materialized once per statement; a plain correlated
+# MATCH would re-run the full-text query for every candidate row.
+RANK_SQL = (
+    "WITH ranked (id, score) AS MATERIALIZED ("
+    f"SELECT rowid, bm25({SEARCH_TABLE}, {', '.join(str(w) for w in COLUMN_WEIGHTS)}) "
+    f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s"
+    ") SELECT score FROM ranked WHERE ranked.id = app_pet.id"
+)
+
+MATCH_SQL = f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s"
+
+_available = {}
+
+
+def is_available(using='default'):
+    """Return whether the FTS5 index exists on the given database."""
+    if using not in _available:
+        connection = connections[using]
+        _available[using] = (
+            connection.vendor == 'sqlite'
+            and SEARCH_TABLE in connection.introspection.table_names()
+        )
+    return _available[using]
+
+
+def build_match_query(query):
+    """Turn free text into an FTS5 expression that prefix-matches every word."""
+    terms = re.findall(r'\w+', query or '')
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def filter_matches(queryset, query):
+    """Filter ``queryset`` to pets matching ``query``, without ranking or ordering."""
+    match = build_match_query(query)
+    if not match:
+        return queryset
+    if not is_available(queryset.db):
+        return queryset.filter(
+            Q(name__icontains=query) |
+            Q(breed__name__icontains=query) |
+            Q(description__icontains=query)
+        )
+    return queryset.filter(pk__in=RawSQL(MATCH_SQL, (match,)))
+
+
+def search_pets(queryset, query):
+    """Filter ``queryset`` to pets matching ``query``, best matches first.
+
+    Falls back to ``icontains`` lookups on databases without the FTS5 index.
+    An empty query leaves the queryset untouched.
+    """
+    match = build_match_query(query)
+    if not match:
+        return queryset
+    queryset = filter_matches(queryset, query)
+    if not is_available(queryset.db):
+        return queryset.order_by('-created_at')
+    return queryset.annotate(
+        search_rank=RawSQL(RANK_SQL, (match,), output_field=FloatField())
+    ).order_by('search_rank', '-created_at')
+
+
+def index_pet(pet):
+    using = router.db_for_write(Pet, instance=pet)
+    if not is_available(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [pet.pk])
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, name, breed, description, health_status) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            [pet.pk, pet.name, pet.breed.name, pet.description, pet.health_status],
+        )
+
+
+def index_pets(pets, breed_names, using='default'):
+    """Index freshly inserted pets in one statement; ``breed_names`` maps breed id to name."""
+    if not is_available(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, name, breed, description, health_status) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            [
+                (pet.pk, pet.name, breed_names[pet.breed_id], pet.description, pet.health_status)
+                for pet in pets
+            ],
+        )
+
+
+def unindex_pet(pet):
+    using = router.db_for_write(Pet, instance=pet)
+    if not is_available(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [pet.pk])
+
+
+def reindex_breed(breed):
+    """Propagate a breed rename to every indexed pet of that breed."""
+    using = router.db_for_write(Pet)
+    if not is_available(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {SEARCH_TABLE} SET breed = %s "
+            "WHERE rowid IN (SELECT id FROM app_pet WHERE breed_id = %s)",
+            [breed.name, breed.pk],
+        )
+
+
+def rebuild_index(using='default'):
+    """Recreate the index from the pet table, e.g. after ``bulk_create`` or ``update()``."""
+    if not is_available(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        cursor.execute(POPULATE_SQL)
@@ -0,0 +1,59 @@
+"""Session store for ``SESSION_STORE = 'cached_db'`` and batched cleanup of expired sessions.
+
+``SessionStore`` is Django's cached_db store: a request loads its session
+from the ``sessions`` cache and only falls back to ``django_session`` on a
+miss, while every save still writes through to the table, so a lost cache
+never logs anyone out. The ``sessions`` cache must be shared by every worker
+process (the default file-based cache is, on one host): with a per-process
+cache, a logout in one worker would leave the session alive in the others.
+
+Expired rows are deleted in batches, one short transaction each, instead of
+Django's single ``DELETE`` that holds SQLite's write lock for the whole
+table. ``clearsessions`` uses it, and logins queue it as a background job
+at most once per ``CLEANUP_INTERVAL``.
+"""
+from django.contrib.sessions.backends import cached_db
+from django.contrib.sessions.models import Session
+from django.db import router, transaction
+from django.utils import timezone
+
+from . import jobs
+
+
+CLEANUP_BATCH_SIZE = 1000
+CLEANUP_INTERVAL = 3600
+
+
+def clear_expired(batch_size=CLEANUP_BATCH_SIZE):
+    """Delete expired sessions ``batch_size`` rows per transaction; return how many were deleted."""
+    using = router.db_for_write(Session)
+    now = timezone.now()
+    deleted = 0
+    while True:
+        with transaction.atomic(using=using):
+            keys = list(
+                Session.objects.using(using).filter(expire_date__lt=now)
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if keys:
+                deleted += Session.objects.using(using).filter(pk__in=keys).delete()[0]
+        if len(keys) < batch_size:
+            return deleted
+
+
+@jobs.task('sessions.clear_expired', max_attempts=3)
+def clear_expired_task():
+    clear_expired()
+
+
+def schedule_cleanup():
+    """Queue one cleanup per ``CLEANUP_INTERVAL``; later calls in the same interval find it queued."""
+    slot = int(timezone.now().timestamp()) // CLEANUP_INTERVAL
+    jobs.enqueue('sessions.clear_expired', key=f'session-cleanup:{slot}')
+
+
+class SessionStore(cached_db.SessionStore):
+
+    @classmethod
+    def clear_expired(cls):
+        clear_expired()
@@ -1,19 +1,91 @@
-from django.db.models.signals import post_save
+from django.conf import settings
+from django.contrib.auth.signals import user_logged_in
+from django.db.backends.signals import connection_created
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import UserProfile
+from .models import UserProfile, Pet, Breed, AdoptionRequest, Review
+from . import caching, counters, db, images, instrumentation, search, sessions
 
 @receiver(post_save, sender=User)
-def create_user_profile(sender, instance, created, **kwargs):
+def create_user_profile(sender, instance, created, raw=False, **kwargs):
 
-    if created:
-        UserProfile.objects.get_or_create(user=instance)
+    # The only place a profile is created; later User saves (last_login on
+    # every login, password changes) leave it alone. Fixtures bring their own.
+    if created and not raw:
+        UserProfile.objects.create(user=instance)
 
-@receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
+@receiver(post_save, sender=Pet)
+def index_pet(sender, instance, raw=False, **kwargs):
 
-    try:
-        instance.profile.save()
-    except UserProfile.DoesNotExist:
+    if not raw:
+        search.index_pet(instance)
+        if instance.image_changed('image'):
+            images.schedule_derivatives(instance.image)
+    caching.pet_changed(instance)
 
-        UserProfile.objects.create(user=instance)
+@receiver(post_delete, sender=Pet)
+def unindex_pet(sender, instance, **kwargs):
+
+    search.unindex_pet(instance)
+    caching.pet_changed(instance)
+
+@receiver(post_save, sender=UserProfile)
+def schedule_profile_picture_derivatives(sender, instance, raw=False, **kwargs):
+
+    if not raw and instance.image_changed('profile_picture'):
+        images.schedule_derivatives(instance.profile_picture)
+
+@receiver(post_save, sender=Breed)
+def reindex_breed(sender, instance, created, raw=False, **kwargs):
+
+    if not created and not raw:
+        search.reindex_breed(instance)
+    caching.breed_changed()
+
+@receiver(post_delete, sender=Breed)
+def breed_deleted(sender, instance, **kwargs):
+
+    caching.breed_changed()
+
+@receiver([post_save, post_delete], sender=AdoptionRequest)
+def adoption_request_changed(sender, instance, **kwargs):
+
+    caching.adoption_request_changed(instance)
+
+@receiver([post_save, post_delete], sender=Review)
+def review_changed(sender, instance, **kwargs):
+
+    caching.review_changed(instance)
+
+def remember_counted_values(sender, instance, raw=False, update_fields=None, using=None, **kwargs):
+
+    if not raw:
+        counters.remember_previous(instance, update_fields, using)
+
+def update_counters_on_save(sender, instance, raw=False, **kwargs):
+
+    if not raw:
+        counters.record_save(instance)
+
+def update_counters_on_delete(sender, instance, **kwargs):
+
+    counters.record_delete(instance)
+
+for counted_model in (Pet, AdoptionRequest, Review):
+    pre_save.connect(remember_counted_values, sender=counted_model)
+    post_save.connect(update_counters_on_save, sender=counted_model)
+    post_delete.connect(update_counters_on_delete, sender=counted_model)
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+
+    db.configure_connection(connection)
+    instrumentation.install(connection)
+
+@receiver(user_logged_in)
+def schedule_session_cleanup(sender, request, user, **kwargs):
+
+    # Logins create the sessions that later expire; signed cookies leave nothing to clean up.
+    if settings.SESSION_STORE != 'signed_cookies':
+        sessions.schedule_cleanup()
@@ -0,0 +1,16 @@
+from django import template
+
+from app import caching
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def pet_card_version():
+    """Part of every cached pet card key that is not on the pet row: breed names and image derivatives.
+
+    Cards are otherwise keyed on ``pet.pk`` and ``pet.updated_at``, so an
+    edited pet gets a fresh card and the stale one simply expires.
+    """
+    return f'{caching.get_stamp(caching.BREEDS_STAMP_KEY)}:{caching.get_stamp(caching.IMAGES_STAMP_KEY)}'
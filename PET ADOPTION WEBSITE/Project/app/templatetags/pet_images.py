@@ -0,0 +1,14 @@
+from django import template
+
+from app import images
+
+
+register = template.Library()
+
+
+@register.filter
+def srcset(field_file, fmt='jpeg'):
+    """``{{ pet.image|srcset:"webp" }}`` -> "…/x.w200.webp 200w, …" for the derivatives that exist."""
+    if not field_file:
+        return ''
+    return images.srcset(field_file.name, fmt, field_file.storage)
@@ -1,2 +1,1507 @@
-# Write tests here
+import base64
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+from io import BytesIO, StringIO
+import unittest
+from unittest import mock
 
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, connections, transaction
+from django.db.models.signals import pre_save
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+from PIL import Image
+
+from . import urls as app_urls
+from .models import Pet, Breed, UserProfile, AdoptionRequest, Review, Job
+from .search import search_pets
+from . import adoptions, breeds, caching, checks, counters, db, facets, images, instrumentation, jobs, metrics, profiler, routers, sessions
+from .forms import PetForm
+from .pagination import EstimatedCountPaginator
+from .loadtest import AuthBenchmark, LoadTest, SessionStoreBenchmark, TemplateRenderBenchmark
+from .middleware import PIN_COOKIE, ReplicaPinningMiddleware
+from .views import PetSearchAPIView
+
+
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+def setUpModule():
+    # The shared file caches would otherwise carry entries between runs (and a dev server's).
+    directory = tempfile.mkdtemp()
+    caches_override = override_settings(CACHES={
+        **settings.CACHES,
+        'default': {**settings.CACHES['default'], 'LOCATION': os.path.join(directory, 'default')},
+        'sessions': {**settings.CACHES['sessions'], 'LOCATION': os.path.join(directory, 'sessions')},
+    })
+    caches_override.enable()
+    unittest.addModuleCleanup(shutil.rmtree, directory)
+    unittest.addModuleCleanup(caches_override.disable)
+
+# Routes without a declared ``query_budget`` (forms, auth pages) must stay under this.
+DEFAULT_QUERY_BUDGET = 10
+
+
+def seed_catalog(pets=15):
+    """Create enough related rows that a per-row query would blow any page budget."""
+    staff = User.objects.create_user('staff', 'staff@example.com', 'pass12345', is_staff=True)
+    breeds = [Breed.objects.create(name=f'Breed {i}', size='medium') for i in range(4)]
+    users = [
+        User.objects.create_user(f'user{i}', f'user{i}@example.com', 'pass12345')
+        for i in range(pets)
+    ]
+    for i, user in enumerate(users):
+        pet = Pet.objects.create(
+            name=f'Pet {i}', breed=breeds[i % len(breeds)], age=i % 10,
+            description='A friendly pet', gender='male' if i % 2 else 'female',
+            posted_by=staff,
+        )
+        AdoptionRequest.objects.create(pet=pet, requester=user, motivation='Loves pets')
+        Review.objects.create(pet=pet, author=user, rating=1 + i % 5, title='Great', content='Lovely')
+    return staff
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class QueryBudgetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = seed_catalog()
+        # An ordinary user with several pets and requests of their own, so that
+        # my-pets/ and adoption-requests/ take their non-staff paths over many rows.
+        cls.member = User.objects.get(username='user0')
+        pets = list(Pet.objects.order_by('pk'))
+        Pet.objects.filter(pk__in=[pet.pk for pet in pets[:5]]).update(posted_by=cls.member)
+        for pet in pets[1:6]:
+            AdoptionRequest.objects.create(pet=pet, requester=cls.member, motivation='Loves pets')
+        cls.objects = {
+            Pet: Pet.objects.first(),
+            UserProfile: UserProfile.objects.first(),
+            AdoptionRequest: AdoptionRequest.objects.first(),
+            Review: Review.objects.first(),
+        }
+
+    def setUp(self):
+        cache.clear()
+
+    def resolve_route(self, pattern):
+        view_class = pattern.callback.view_class
+        kwargs = {}
+        for name in pattern.pattern.converters:
+            model = Pet if name == 'pet_id' else getattr(view_class, 'model', None)
+            # Routes keyed by something other than a row (stored profiles) get a missing key: a 404.
+            kwargs[name] = self.objects[model].pk if model in self.objects else 'missing'
+        return reverse(pattern.name, kwargs=kwargs), view_class
+
+    def assert_routes_within_budget(self):
+        for pattern in app_urls.urlpatterns:
+            if pattern.name == 'logout':
+                continue
+            url, view_class = self.resolve_route(pattern)
+            budget = getattr(view_class, 'query_budget', None) or DEFAULT_QUERY_BUDGET
+            with self.subTest(route=pattern.name):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                self.assertLess(response.status_code, 500)
+                self.assertLessEqual(
+                    len(queries), budget,
+                    f"{pattern.name} ran {len(queries)} queries (budget {budget})",
+                )
+
+    def test_anonymous_routes_within_budget(self):
+        self.assert_routes_within_budget()
+
+    def test_staff_routes_within_budget(self):
+        self.client.force_login(self.staff)
+        self.assert_routes_within_budget()
+
+    def test_member_routes_within_budget(self):
+        self.client.force_login(self.member)
+        self.assert_routes_within_budget()
+
+
+class PetSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.labrador = Breed.objects.create(name='Labrador Retriever')
+        cls.poodle = Breed.objects.create(name='Poodle')
+        cls.max = Pet.objects.create(name='Max', breed=cls.labrador, age=3, description='Loves to fetch')
+        cls.bella = Pet.objects.create(name='Bella', breed=cls.poodle, age=2, description='Calm lap dog, plays with Max')
+
+    def search(self, query):
+        return list(search_pets(Pet.objects.all(), query))
+
+    def test_prefix_match_across_fields(self):
+        self.assertEqual(self.search('labra'), [self.max])
+        self.assertEqual(self.search('lap'), [self.bella])
+
+    def test_name_match_ranks_above_description_match(self):
+        self.assertEqual(self.search('max'), [self.max, self.bella])
+
+    def test_index_follows_pet_and_breed_changes(self):
+        self.max.name = 'Rex'
+        self.max.save()
+        self.assertEqual(self.search('rex'), [self.max])
+        self.poodle.name = 'Toy Poodle'
+        self.poodle.save()
+        self.assertEqual(self.search('toy'), [self.bella])
+        self.bella.delete()
+        self.assertEqual(self.search('toy'), [])
+
+    def test_search_entry_points(self):
+        response = self.client.get(reverse('api_pet_list'), {'search': 'retr'})
+        self.assertEqual([p['id'] for p in response.json()['results']], [self.max.pk])
+        response = self.client.get(
+            reverse('pet_search'), {'q': 'poo'}, HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+        )
+        self.assertEqual([p['id'] for p in response.json()['pets']], [self.bella.pk])
+        response = self.client.get(reverse('pets'), {'q': 'fetch'})
+        self.assertEqual(list(response.context['pets']), [self.max])
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class CounterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.breed = Breed.objects.create(name='Beagle')
+        cls.other_breed = Breed.objects.create(name='Pug')
+        cls.pet = Pet.objects.create(name='Auuuw', breed=cls.breed, age=1, description='Puppy')
+        cls.users = [User.objects.create_user(f'fan{i}', password='pass12345') for i in range(3)]
+
+    def assert_counters(self, pet, **expected):
+        pet.refresh_from_db()
+        self.assertEqual({field: getattr(pet, field) for field in expected}, expected)
+
+    def test_review_counters(self):
+        review = Review.objects.create(pet=self.pet, author=self.users[0], rating=4, title='A', content='B')
+        Review.objects.create(pet=self.pet, author=self.users[1], rating=2, title='A', content='B')
+        self.assert_counters(self.pet, review_count=2, rating_sum=6)
+        self.assertEqual(self.pet.average_rating, 3)
+        review.rating = 5
+        review.save()
+        self.assert_counters(self.pet, review_count=2, rating_sum=7)
+        review.delete()
+        self.assert_counters(self.pet, review_count=1, rating_sum=2)
+
+    def test_adoption_request_counters(self):
+        first = AdoptionRequest.objects.create(pet=self.pet, requester=self.users[0], motivation='x')
+        AdoptionRequest.objects.create(pet=self.pet, requester=self.users[1], motivation='x')
+        self.assert_counters(self.pet, adoption_request_count=2, pending_request_count=2, approved_request_count=0)
+        first.status = 'approved'
+        first.save()
+        self.assert_counters(self.pet, adoption_request_count=2, pending_request_count=1, approved_request_count=1)
+        first.delete()
+        self.assert_counters(self.pet, adoption_request_count=1, pending_request_count=1, approved_request_count=0)
+
+    def test_breed_available_pets(self):
+        self.breed.refresh_from_db()
+        self.assertEqual(self.breed.available_pets, 1)
+        self.pet.breed = self.other_breed
+        self.pet.save()
+        self.other_breed.refresh_from_db()
+        self.breed.refresh_from_db()
+        self.assertEqual((self.breed.available_pets, self.other_breed.available_pets), (0, 1))
+        self.pet.status = 'adopted'
+        self.pet.save()
+        self.other_breed.refresh_from_db()
+        self.assertEqual(self.other_breed.available_pets, 0)
+
+    def test_stale_instance_save_keeps_counters(self):
+        stale = Pet.objects.get(pk=self.pet.pk)
+        Review.objects.create(pet=self.pet, author=self.users[0], rating=5, title='A', content='B')
+        stale.name = 'Renamed'
+        stale.save()
+        self.assert_counters(self.pet, review_count=1, rating_sum=5)
+
+    def test_rebuild_counters_fixes_drift(self):
+        Review.objects.create(pet=self.pet, author=self.users[0], rating=5, title='A', content='B')
+        Pet.objects.filter(pk=self.pet.pk).update(review_count=7)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_counters', '--check', stdout=StringIO())
+        call_command('rebuild_counters', stdout=StringIO())
+        self.assert_counters(self.pet, review_count=1, rating_sum=5)
+        call_command('rebuild_counters', '--check', stdout=StringIO())
+
+    def test_check_reports_without_fixing(self):
+        Breed.objects.filter(pk=self.breed.pk).update(available_pets=5)
+        stdout = StringIO()
+        with self.assertRaises(CommandError):
+            call_command('rebuild_counters', '--check', stdout=stdout)
+        self.assertIn(f'Breed {self.breed.pk}: available_pets 5 -> 1', stdout.getvalue())
+        self.breed.refresh_from_db()
+        self.assertEqual(self.breed.available_pets, 5)
+
+    def test_rebuild_counters_recomputes_each_batch_when_fixing(self):
+        other = Pet.objects.create(name='Bolt', breed=self.breed, age=3, description='Fast')
+        Review.objects.create(pet=self.pet, author=self.users[0], rating=5, title='A', content='B')
+        Pet.objects.filter(pk__in=[self.pet.pk, other.pk]).update(review_count=7)
+        scan_only = counters.expected_pet_counters
+
+        def recompute(pks=None):
+            # A review written after the scan, before the batch is fixed.
+            if pks is not None and self.pet.pk in pks:
+                Review.objects.create(pet=self.pet, author=self.users[1], rating=3, title='A', content='B')
+            return scan_only(pks)
+
+        with mock.patch.object(counters, 'expected_pet_counters', recompute):
+            call_command('rebuild_counters', '--batch-size', '1', stdout=StringIO())
+        self.assert_counters(self.pet, review_count=2, rating_sum=8)
+        self.assert_counters(other, review_count=0)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class AdoptionApprovalTests(TransactionTestCase):
+    # Approvals race in threads, which need committed rows.
+
+    def setUp(self):
+        cache.clear()
+        self.staff = User.objects.create_user('staff', password='pass12345', is_staff=True)
+        self.breed = Breed.objects.create(name='Beagle')
+        self.pet = Pet.objects.create(name='Snoopy', breed=self.breed, age=2, description='Dreamer')
+        self.requests = [
+            AdoptionRequest.objects.create(
+                pet=self.pet, requester=User.objects.create_user(f'fan{i}', password='pass12345'),
+                motivation='Loves beagles',
+            )
+            for i in range(4)
+        ]
+
+    def test_approval_rejects_competing_requests(self):
+        self.client.force_login(self.staff)
+        first, *others = self.requests
+        response = self.client.post(reverse('adoption_request_approve', args=[first.pk]), follow=True)
+        self.assertContains(response, '3 other pending request(s) were declined')
+        self.assertEqual(
+            dict(AdoptionRequest.objects.values_list('pk', 'status')),
+            {first.pk: 'approved', **{other.pk: 'rejected' for other in others}},
+        )
+        self.pet.refresh_from_db()
+        self.breed.refresh_from_db()
+        self.assertEqual(self.pet.status, 'adopted')
+        self.assertEqual((self.pet.pending_request_count, self.pet.approved_request_count), (0, 1))
+        self.assertEqual(self.breed.available_pets, 0)
+        call_command('rebuild_counters', '--check', stdout=StringIO())
+
+        response = self.client.post(reverse('adoption_request_approve', args=[others[0].pk]), follow=True)
+        self.assertContains(response, 'Snoopy has already been adopted.')
+        self.assertEqual(AdoptionRequest.objects.filter(status='approved').count(), 1)
+
+    def test_parallel_approvals_have_one_winner(self):
+        barrier = threading.Barrier(len(self.requests))
+        outcomes = []
+
+        def approve(adoption_request):
+            barrier.wait()
+            try:
+                adoptions.approve(adoption_request.pk)
+                outcomes.append('approved')
+            except adoptions.ApprovalConflict:
+                outcomes.append('conflict')
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=approve, args=[request]) for request in self.requests]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(outcomes), ['approved', 'conflict', 'conflict', 'conflict'])
+        self.assertEqual(
+            sorted(AdoptionRequest.objects.values_list('status', flat=True)),
+            ['approved', 'rejected', 'rejected', 'rejected'],
+        )
+        call_command('rebuild_counters', '--check', stdout=StringIO())
+
+    def test_parallel_saves_of_one_pet_count_once(self):
+        # Each save waits here after reading the old status, if the other save lets it.
+        barrier = threading.Barrier(2, timeout=0.5)
+
+        def wait_for_other_save(sender, instance, **kwargs):
+            try:
+                barrier.wait()
+            except threading.BrokenBarrierError:
+                pass
+
+        pre_save.connect(wait_for_other_save, sender=Pet)
+        self.addCleanup(pre_save.disconnect, wait_for_other_save, sender=Pet)
+
+        def adopt():
+            try:
+                pet = Pet.objects.get(pk=self.pet.pk)
+                pet.status = 'adopted'
+                pet.save()
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=adopt) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.breed.refresh_from_db()
+        self.assertEqual(self.breed.available_pets, 0)
+
+
+class PetListAPIPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        breed = Breed.objects.create(name='Shiba Inu')
+        cls.pets = [
+            Pet.objects.create(name=f'Shiba {i}', breed=breed, age=1, description='Fox-like')
+            for i in range(5)
+        ]
+        # Share one timestamp so the id tiebreaker is exercised.
+        Pet.objects.filter(pk__in=[p.pk for p in cls.pets[1:3]]).update(created_at=cls.pets[1].created_at)
+
+    def fetch(self, **params):
+        response = self.client.get(reverse('api_pet_list'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_walks_forward_and_back(self):
+        expected = [p['id'] for p in Pet.objects.order_by('-created_at', '-id').values('id')]
+        seen, cursor, pages = [], None, []
+        while True:
+            data = self.fetch(limit=2, **({'cursor': cursor} if cursor else {}))
+            pages.append(data)
+            seen += [p['id'] for p in data['results']]
+            cursor = data['next']
+            if not cursor:
+                break
+        self.assertEqual(seen, expected)
+        self.assertIsNone(pages[0]['prev'])
+        back = self.fetch(limit=2, cursor=pages[-1]['prev'])
+        self.assertEqual(back['results'], pages[-2]['results'])
+        self.assertIsNotNone(back['next'])
+
+    def test_limit_is_capped_and_total_is_estimated(self):
+        data = self.fetch(limit=1000, include_total=1)
+        self.assertEqual(data['count'], 5)
+        self.assertEqual(data['estimated_total'], 5)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('api_pet_list'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_forged_cursor_values_are_rejected(self):
+        for values in (['abc', 1], [{'dt': '2024-01-01T00:00:00+00:00'}, 'x'], [None, 1], [[1], 1]):
+            with self.subTest(values=values):
+                raw = json.dumps({'d': 'next', 'v': values}).encode()
+                cursor = base64.urlsafe_b64encode(raw).decode().rstrip('=')
+                response = self.client.get(reverse('api_pet_list'), {'cursor': cursor})
+                self.assertEqual(response.status_code, 400)
+        # Search results are ordered by rank first.
+        raw = json.dumps({'d': 'next', 'v': ['high', {'dt': '2024-01-01T00:00:00+00:00'}, 1]}).encode()
+        cursor = base64.urlsafe_b64encode(raw).decode().rstrip('=')
+        response = self.client.get(reverse('api_pet_list'), {'search': 'shiba', 'cursor': cursor})
+        self.assertEqual(response.status_code, 400)
+
+    def test_streaming_exports(self):
+        expected = [p['id'] for p in Pet.objects.order_by('-created_at', '-id').values('id')]
+        response = self.client.get(reverse('api_pet_list'), HTTP_ACCEPT='application/x-ndjson')
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], expected)
+        response = self.client.get(reverse('api_pet_list'), {'format': 'json-stream'})
+        document = json.loads(b''.join(response.streaming_content))
+        self.assertEqual([p['id'] for p in document['results']], expected)
+
+    def test_search_results_page_in_rank_order(self):
+        first = self.fetch(search='shiba', limit=3)
+        second = self.fetch(search='shiba', limit=3, cursor=first['next'])
+        ids = [p['id'] for p in first['results'] + second['results']]
+        self.assertEqual(sorted(ids), sorted(p.pk for p in self.pets))
+        self.assertIsNone(second['next'])
+
+
+class AsyncAPIViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        breed = Breed.objects.create(name='Akita')
+        cls.pets = [
+            Pet.objects.create(name=f'Hachi {i}', breed=breed, age=2, description='Loyal')
+            for i in range(15)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    async def test_list_and_detail_under_asgi(self):
+        response = await self.async_client.get(reverse('api_pet_list'), {'limit': 4, 'include_total': 1})
+        data = response.json()
+        self.assertEqual((data['count'], data['estimated_total']), (4, 15))
+        response = await self.async_client.get(reverse('api_pet_detail', args=[self.pets[0].pk]))
+        self.assertEqual(response.json()['data']['breed'], 'Akita')
+        response = await self.async_client.get(reverse('api_pet_detail', args=[0]))
+        self.assertEqual(response.status_code, 404)
+        response = await self.async_client.get(reverse('api_breed_list'))
+        self.assertEqual(response.json()['results'][0]['available_pets'], 15)
+
+    async def test_asgi_export_streams_asynchronously(self):
+        response = await self.async_client.get(reverse('api_pet_list'), {'format': 'ndjson'})
+        self.assertTrue(response.is_async)
+        lines = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(len(b''.join(lines).decode().splitlines()), 15)
+
+    @override_settings(DEBUG=True)
+    def test_middleware_chain_is_not_adapted_to_sync(self):
+        # Django logs every adaptation when DEBUG is on.
+        with self.assertLogs('django.request', 'DEBUG') as logs:
+            logging.getLogger('django.request').debug('Loading the ASGI middleware chain.')
+            ASGIHandler()
+        self.assertEqual([line for line in logs.output if 'adapted' in line], [])
+
+    async def test_middleware_runs_on_the_event_loop_thread(self):
+        # An adapted middleware would be run in a worker thread by sync_to_async.
+        loop_thread = threading.get_ident()
+        threads = []
+        start = instrumentation.start
+
+        def record_thread(*args, **kwargs):
+            threads.append(threading.get_ident())
+            return start(*args, **kwargs)
+
+        with mock.patch.object(instrumentation, 'start', record_thread):
+            response = await self.async_client.get(reverse('api_breed_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(threads, [loop_thread])
+
+    async def test_search_page_is_paginated(self):
+        response = await self.async_client.get(reverse('pet_search'), {'q': 'hachi', 'page': 2})
+        self.assertEqual(len(response.context['pets']), 3)
+        self.assertTrue(response.context['is_paginated'])
+        response = await self.async_client.get(reverse('pet_search'), {'q': 'hachi', 'page': 'last'})
+        self.assertEqual(response.context['page_obj'].number, 2)
+        self.assertEqual(len(response.context['pets']), 3)
+        for page in (3, 0, 'two'):
+            response = await self.async_client.get(reverse('pet_search'), {'q': 'hachi', 'page': page})
+            self.assertEqual(response.status_code, 404)
+        response = await self.async_client.get(
+            reverse('pet_search'), {'q': 'hachi'}, headers={'X-Requested-With': 'XMLHttpRequest'},
+        )
+        self.assertEqual((len(response.json()['pets']), response.json()['truncated']), (15, False))
+
+    async def test_search_suggestions_report_truncation(self):
+        with mock.patch.object(PetSearchAPIView, 'max_results', 10):
+            response = await self.async_client.get(
+                reverse('pet_search'), {'q': 'hachi'}, headers={'X-Requested-With': 'XMLHttpRequest'},
+            )
+        self.assertEqual((len(response.json()['pets']), response.json()['truncated']), (10, True))
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, REPLICA_DATABASES=['replica1'])
+class ReplicaRoutingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader', password='pass12345')
+        cls.pet = Pet.objects.create(name='Ollie', breed=Breed.objects.create(name='Pug'), age=2, description='x')
+
+    def setUp(self):
+        cache.clear()
+
+    def route(self, model=Pet):
+        return routers.PrimaryReplicaRouter().db_for_read(model)
+
+    def test_reads_use_replica_only_inside_safe_requests(self):
+        self.assertEqual(self.route(), 'default')
+        state, token = routers.begin_request(use_replica=True)
+        # Outside the test case's own transaction, as a request would be.
+        try:
+            with mock.patch.object(connection, 'in_atomic_block', False):
+                self.assertEqual(self.route(), 'replica1')
+                self.assertEqual(self.route(Session), 'default')
+                routers.PrimaryReplicaRouter().db_for_write(Review)
+                self.assertEqual(self.route(), 'default')
+        finally:
+            routers.end_request(token)
+        state, token = routers.begin_request(use_replica=False)
+        routers.end_request(token)
+        self.assertIsNone(state.replica)
+
+    def test_own_write_pins_visitor_to_primary(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('pets'))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        response = self.client.post(reverse('review_create', args=[self.pet.pk]), {
+            'rating': 5, 'title': 'Great', 'content': 'Lovely dog',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], settings.REPLICA_PIN_MAX_SECONDS)
+
+    def test_pin_lasts_until_the_next_sync(self):
+        middleware = ReplicaPinningMiddleware(lambda request: HttpResponse())
+        request = RequestFactory().get('/')
+        self.assertFalse(middleware.is_pinned(request))
+        request.COOKIES[PIN_COOKIE] = '1000.0'
+        # Nothing known about the replicas: they may predate the write.
+        self.assertTrue(middleware.is_pinned(request))
+        routers.record_sync(999.0)
+        self.assertTrue(middleware.is_pinned(request))
+        routers.record_sync(1001.0)
+        self.assertFalse(middleware.is_pinned(request))
+
+
+class RequestProfilingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        breed = Breed.objects.create(name='Beagle')
+        cls.pets = [
+            Pet.objects.create(name=f'Dog {i}', breed=breed, age=i, description='Good dog') for i in range(6)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(REQUEST_PROFILING_SAMPLE_RATE=1)
+    def test_header_and_log_line_tagged_with_url_name(self):
+        with self.assertLogs('app.requests', 'INFO') as logs:
+            response = self.client.get(reverse('pets'))
+        summary = json.loads(logs.records[0].getMessage())
+        self.assertEqual((summary['url_name'], summary['status']), ('pets', 200))
+        self.assertGreater(summary['queries'], 0)
+        self.assertGreater(summary['template_ms'], 0)
+        self.assertIn(f"{summary['queries']} queries", response['Server-Timing'])
+        self.assertIn('tpl;dur=', response['Server-Timing'])
+
+    @override_settings(REQUEST_PROFILING_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_untouched(self):
+        self.assertNotIn('Server-Timing', self.client.get(reverse('pets')))
+
+    def test_repeated_queries_are_flagged(self):
+        profile, token = instrumentation.start()
+        try:
+            for pet in Pet.objects.all():
+                pet.breed.name
+            list(Pet.objects.filter(pk__in=[1, 2]))
+            list(Pet.objects.filter(pk__in=[3, 4, 5]))
+        finally:
+            instrumentation.stop(token)
+        (count, sql), (in_count, in_sql) = profile.repeated()
+        self.assertEqual(count, 6)
+        self.assertIn('FROM "app_breed"', sql)
+        self.assertEqual(in_count, 2)
+        self.assertIn('IN (...)', in_sql)
+
+        request = RequestFactory().get('/pets/')
+        request.resolver_match = resolve('/pets/')
+        with self.assertLogs('app.requests', 'WARNING'):
+            instrumentation.log(logging.getLogger('app.requests'), profile.summary(request, HttpResponse()))
+
+
+class MetricsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        breed = Breed.objects.create(name='Beagle')
+        cls.requester = User.objects.create_user('requester', password='pass12345')
+        cls.pets = [
+            Pet.objects.create(name=f'Dog {i}', breed=breed, age=i, description='Good dog') for i in range(3)
+        ]
+        AdoptionRequest.objects.create(pet=cls.pets[0], requester=cls.requester, motivation='Love dogs')
+        Pet.objects.filter(pk=cls.pets[2].pk).update(status='adopted')
+        Breed.objects.filter(pk=breed.pk).update(available_pets=2)
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings_override = override_settings(METRICS_DIR=directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.directory = directory
+        # Start from an empty registry, as a freshly started worker would.
+        metrics._registry_pid = None
+
+    def scrape(self, **extra):
+        response = self.client.get(reverse('metrics'), **extra)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return response.content.decode()
+
+    def test_requests_counted_per_url_name(self):
+        self.client.get(reverse('pets'))
+        self.client.get(reverse('pets'))
+        self.client.get('/no-such-page/')
+        body = self.scrape()
+        self.assertIn('petadopt_requests_total{route="pets",method="GET",status="200"} 2', body)
+        self.assertIn('petadopt_requests_total{route="unmatched",method="GET",status="404"} 1', body)
+        self.assertIn('petadopt_request_duration_seconds_bucket{route="pets",le="+Inf"} 2', body)
+        self.assertIn('petadopt_request_duration_seconds_count{route="pets"} 2', body)
+        self.assertIn('# TYPE petadopt_request_queries histogram', body)
+        self.assertIn('petadopt_request_queries_count{route="pets"} 2', body)
+
+    def test_cache_hit_ratio(self):
+        fragments = caches['fragments']
+        fragments.get('metrics-test')
+        fragments.set('metrics-test', 1)
+        fragments.get('metrics-test')
+        fragments.get_many(['metrics-test', 'metrics-missing'])
+        body = self.scrape()
+        self.assertIn('petadopt_cache_requests_total{cache="petadopt-fragments",result="hit"} 2', body)
+        self.assertIn('petadopt_cache_requests_total{cache="petadopt-fragments",result="miss"} 2', body)
+        self.assertIn('petadopt_cache_hit_ratio{cache="petadopt-fragments"} 0.5', body)
+
+    def test_business_gauges(self):
+        Job.objects.create(task='images.generate_derivatives', run_after=timezone.now())
+        body = self.scrape()
+        self.assertIn('petadopt_available_pets 2\n', body)
+        self.assertIn('petadopt_pending_adoption_requests 1\n', body)
+        self.assertIn('petadopt_jobs{status="queued"} 1\n', body)
+
+    def test_other_processes_are_merged(self):
+        self.client.get(reverse('pets'))
+        other = {
+            'counters': [['petadopt_requests_total', [['route', 'pets'], ['method', 'GET'], ['status', '200']], 4]],
+            'histograms': [['petadopt_request_duration_seconds', [['route', 'pets']],
+                            {'buckets': [1] * len(metrics.LATENCY_BUCKETS), 'sum': 0.004, 'count': 4}]],
+        }
+        with open(os.path.join(self.directory, '99999-0.json'), 'w') as stream:
+            json.dump(other, stream)
+        body = self.scrape()
+        self.assertIn('petadopt_requests_total{route="pets",method="GET",status="200"} 5', body)
+        self.assertIn('petadopt_request_duration_seconds_count{route="pets"} 5', body)
+
+    def test_restricted_to_allowed_ips_and_staff(self):
+        self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='203.0.113.5').status_code, 403)
+        User.objects.create_user('ops', password='pass12345', is_staff=True)
+        self.client.login(username='ops', password='pass12345')
+        self.scrape(REMOTE_ADDR='203.0.113.5')
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class RequestProfilerTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = seed_catalog(pets=4)
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings_override = override_settings(PROFILES_DIR=directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def take_profile(self, url):
+        response = self.client.get(url, {'_profile': '1'})
+        self.assertEqual(response.status_code, 200)
+        return response['X-Profile-Id']
+
+    def test_staff_profile_stores_call_tree_and_sql_timeline(self):
+        self.client.force_login(self.staff)
+        profile_id = self.take_profile(reverse('pets'))
+        profile = profiler.load(profile_id)
+        self.assertEqual(profile['url_name'], 'pets')
+        self.assertGreater(profile['query_count'], 0)
+        self.assertEqual(len(profile['queries']), profile['query_count'])
+        starts = [query['start_ms'] for query in profile['queries']]
+        self.assertEqual(starts, sorted(starts))
+        names = {row['name'] for row in profiler.tree_rows(profile['tree'], min_share=0)}
+        self.assertTrue(any(name.startswith('PetListView.get_queryset') for name in names))
+
+        response = self.client.get(reverse('request_profile_detail', kwargs={'profile_id': profile_id}))
+        self.assertContains(response, 'SQL timeline')
+        self.assertContains(response, 'flame-box')
+        self.assertContains(self.client.get(reverse('request_profiles')), profile_id)
+
+    async def test_staff_can_profile_async_views(self):
+        await self.async_client.aforce_login(self.staff)
+        response = await self.async_client.get(reverse('api_breed_list'), {'_profile': '1'})
+        profile = profiler.load(response['X-Profile-Id'])
+        self.assertEqual((profile['url_name'], profile['user']), ('api_breed_list', 'staff'))
+
+    def test_only_staff_can_profile(self):
+        self.assertNotIn('X-Profile-Id', self.client.get(reverse('pets'), {'_profile': '1'}))
+        self.client.login(username='user0', password='pass12345')
+        self.assertNotIn('X-Profile-Id', self.client.get(reverse('pets'), {'_profile': '1'}))
+        self.assertEqual(profiler.list_profiles(), [])
+        self.assertEqual(self.client.get(reverse('request_profiles')).status_code, 403)
+
+    def test_compare_and_route_flame_graph(self):
+        self.client.force_login(self.staff)
+        first = self.take_profile(reverse('pets'))
+        second = self.take_profile(reverse('pets') + '?q=Pet')
+        self.take_profile(reverse('home'))
+        self.assertEqual(len(profiler.list_profiles('pets')), 2)
+
+        response = self.client.get(reverse('request_profile_compare'), {'a': first, 'b': second})
+        self.assertContains(response, 'Self time by function')
+        self.assertEqual(self.client.get(reverse('request_profile_compare'), {'a': first}).status_code, 404)
+
+        response = self.client.get(reverse('request_profile_flame'), {'route': 'pets'})
+        self.assertEqual(response.context['profile_count'], 2)
+        trees = [profiler.load(first)['tree'], profiler.load(second)['tree']]
+        expected = (trees[0]['total_ms'] + trees[1]['total_ms']) / 2
+        self.assertAlmostEqual(response.context['tree']['total_ms'], expected, delta=0.01 * expected)
+
+    def test_unknown_or_malformed_ids_are_not_found(self):
+        self.client.force_login(self.staff)
+        for profile_id in ['20260101-000000-deadbeef', '..%2F..%2Fetc%2Fpasswd']:
+            with self.subTest(profile_id=profile_id):
+                url = reverse('request_profile_detail', kwargs={'profile_id': profile_id})
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class SQLiteProfileTests(TestCase):
+
+    def test_profile_applied_to_new_connections(self):
+        values = db.read_pragmas(connection, ['busy_timeout', 'synchronous', 'temp_store', 'cache_size'])
+        # synchronous NORMAL = 1, temp_store MEMORY = 2
+        self.assertEqual(values, {'busy_timeout': 5000, 'synchronous': 1, 'temp_store': 2, 'cache_size': -64000})
+
+    def test_file_database_switches_to_wal(self):
+        path = os.path.join(tempfile.mkdtemp(), 'wal.sqlite3')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        wal_connection = connection.copy()
+        wal_connection.settings_dict = {**connection.settings_dict, 'NAME': path}
+        self.addCleanup(wal_connection.close)
+        self.assertEqual(db.read_pragmas(wal_connection, ['journal_mode']), {'journal_mode': 'wal'})
+
+
+class FacetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        lab = Breed.objects.create(name='Labrador', size='large')
+        pug = Breed.objects.create(name='Pug', size='small')
+        for name, breed, age, gender in [
+            ('Max', lab, 0, 'male'), ('Rex', lab, 2, 'male'), ('Ivy', lab, 9, 'female'),
+            ('Bo', pug, 5, 'male'), ('Zoe', pug, 2, 'female'),
+        ]:
+            Pet.objects.create(name=name, breed=breed, age=age, gender=gender, description='Friendly')
+        Pet.objects.create(name='Old', breed=lab, age=3, gender='male', description='x', status='adopted')
+
+    def setUp(self):
+        cache.clear()
+
+    def counts(self, facet):
+        return {entry['value']: entry['count'] for entry in facet}
+
+    def test_each_facet_ignores_its_own_filter(self):
+        result = facets.get_facets(facets.normalize_filters({'breed': 'Labrador', 'gender': 'male'}))
+        self.assertEqual(result['total'], 2)
+        # Breeds are counted among males, genders among Labradors.
+        self.assertEqual({e['label']: e['count'] for e in result['breed']}, {'Labrador': 2, 'Pug': 1})
+        self.assertEqual(self.counts(result['gender']), {'male': 2, 'female': 1, 'unknown': 0})
+        self.assertEqual(self.counts(result['age']), {'baby': 1, 'young': 1, 'adult': 0, 'senior': 0})
+        self.assertEqual(self.counts(result['size'])['large'], 2)
+        self.assertTrue(result['breed'][0]['selected'])
+
+    def test_one_query_then_cached_until_catalog_changes(self):
+        filters = facets.normalize_filters({'q': ' FRIENDLY ', 'age': 'young'})
+        self.assertEqual(filters, {'status': 'available', 'q': 'friendly', 'age': 'young'})
+        with self.assertNumQueries(1):
+            self.assertEqual(facets.get_facets(filters)['total'], 2)
+        with self.assertNumQueries(0):
+            facets.get_facets(facets.normalize_filters({'q': 'friendly', 'gender': 'male'}))
+        Pet.objects.filter(name='Bo').get().save()
+        with self.assertNumQueries(1):
+            facets.get_facets(filters)
+
+    def test_browse_page_and_api_show_counts(self):
+        response = self.client.get(reverse('pets'), {'gender': 'female'})
+        self.assertContains(response, 'Labrador (1)')
+        self.assertContains(response, '<option value="female" selected>Female (2)</option>', html=True)
+        self.assertEqual(len(response.context['pets']), 2)
+        data = self.client.get(reverse('api_pet_list'), {'facets': 1, 'size': 'small'}).json()
+        self.assertEqual(data['facets']['total'], 2)
+        self.assertEqual([pet['name'] for pet in data['results']], ['Zoe', 'Bo'])
+
+    def test_api_estimated_total_honours_every_filter(self):
+        lab = Breed.objects.get(name='Labrador')
+        for params, total in [
+            ({}, 5), ({'breed_id': lab.pk}, 3), ({'size': 'large'}, 3), ({'age': 'young'}, 2),
+            ({'q': 'ivy'}, 1), ({'breed': 'pug'}, 2), ({'gender': 'female'}, 2), ({'status': 'adopted'}, 1),
+        ]:
+            with self.subTest(params=params):
+                data = self.client.get(reverse('api_pet_list'), {**params, 'include_total': 1}).json()
+                self.assertEqual(data['estimated_total'], total)
+
+
+class BulkImportExportTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        Breed.objects.create(name='Beagle')
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', newline='') as stream:
+            stream.write(content)
+        return path
+
+    def test_csv_import_reports_bad_rows_and_batches_breeds(self):
+        path = self.write('pets.csv', (
+            'name,breed,age,gender,description\n'
+            'Snoopy,beagle,3,male,Dreamer\n'
+            'Nobody,,2,male,No breed\n'
+            'Minus,Beagle,-1,female,Too young\n'
+            'Kiba,Shiba Inu,4,,Fox-like\n'
+            'Momo,shiba inu,1,female,Tiny fox\n'
+        ))
+        stdout, stderr = StringIO(), StringIO()
+        call_command('import_pets', path, batch_size=2, stdout=stdout, stderr=stderr)
+        self.assertIn('3 pet(s) imported, 1 new breed(s), 2 row(s) rejected', stdout.getvalue())
+        self.assertIn('line 3: breed: This field is required.', stderr.getvalue())
+        self.assertIn('line 4: age:', stderr.getvalue())
+        self.assertEqual(
+            dict(Breed.objects.values_list('name', 'available_pets')), {'Beagle': 1, 'Shiba Inu': 2},
+        )
+        self.assertEqual(Pet.objects.get(name='Kiba').gender, 'unknown')
+        self.assertEqual(list(search_pets(Pet.objects.all(), 'fox').values_list('name', flat=True).order_by('name')),
+                         ['Kiba', 'Momo'])
+        call_command('rebuild_counters', '--check', stdout=StringIO())
+
+    def test_jsonl_export_round_trips(self):
+        breed = Breed.objects.get()
+        for i in range(5):
+            Pet.objects.create(name=f'Dog {i}', breed=breed, age=i, description='Good dog')
+        path = os.path.join(self.directory, 'pets.jsonl')
+        call_command('export_pets', output=path, stderr=StringIO())
+        with open(path) as stream:
+            rows = [json.loads(line) for line in stream]
+        self.assertEqual([row['name'] for row in rows], [f'Dog {i}' for i in range(5)])
+        self.assertEqual(rows[0]['breed'], 'Beagle')
+        Pet.objects.all().delete()
+        call_command('import_pets', path, stdout=StringIO())
+        self.assertEqual(Pet.objects.count(), 5)
+
+        stdout = StringIO()
+        call_command('export_pets', format='csv', stdout=stdout)
+        self.assertTrue(stdout.getvalue().startswith('id,name,breed,age,gender,status,'))
+
+
+class BreedAutocompleteTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.labrador = Breed.objects.create(name='Labrador Retriever')
+        cls.golden = Breed.objects.create(name='Golden Retriever')
+        Breed.objects.create(name='Poodle')
+
+    def setUp(self):
+        cache.clear()
+
+    def names(self, query):
+        return [result['name'] for result in breeds.get_index().search(query)]
+
+    def test_prefix_and_word_prefix_matches(self):
+        self.assertEqual(self.names('LAB'), ['Labrador Retriever'])
+        # Whole-name matches rank above matches on a later word.
+        Breed.objects.create(name='Retriever Mix')
+        self.assertEqual(self.names('retr'), ['Retriever Mix', 'Golden Retriever', 'Labrador Retriever'])
+        self.assertEqual(self.names('golden-ret'), ['Golden Retriever'])
+        self.assertEqual(self.names(''), [])
+
+    def test_index_rebuilt_on_breed_changes(self):
+        self.assertEqual(self.names('toy'), [])
+        poodle = Breed.objects.get(name='Poodle')
+        poodle.name = 'Toy Poodle'
+        poodle.save()
+        self.assertEqual(self.names('toy'), ['Toy Poodle'])
+        poodle.delete()
+        self.assertEqual(self.names('poo'), [])
+
+    def test_form_reuses_existing_breed(self):
+        breeds.get_index()
+        form = PetForm(data={
+            'name': 'Max', 'age': 2, 'description': 'Good dog', 'gender': 'male',
+            'health_status': '', 'status': 'available', 'breed': '  labrador   RETRIEVER ',
+        })
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.cleaned_data['breed'], 'Labrador Retriever')
+        with self.assertNumQueries(1):
+            pet = form.save(commit=False)
+        self.assertEqual(pet.breed_id, self.labrador.pk)
+        self.assertEqual(Breed.objects.count(), 3)
+
+    def test_form_does_not_save_a_breed_missing_from_the_database(self):
+        stale = breeds.BreedIndex([(self.labrador.pk, 'Labrador Retriever'), (0, 'Akita')])
+        with mock.patch.object(breeds, 'get_index', return_value=stale):
+            form = PetForm(data={
+                'name': 'Kuma', 'age': 3, 'description': 'Calm', 'gender': 'male',
+                'health_status': '', 'status': 'available', 'breed': 'akita',
+            })
+            self.assertTrue(form.is_valid(), form.errors)
+            pet = form.save()
+        self.assertEqual(pet.breed, Breed.objects.get(name='Akita'))
+
+    def test_endpoint_served_from_index(self):
+        url = reverse('api_breed_autocomplete')
+        self.client.get(url, {'q': 'x'})
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {'q': 'retriever', 'limit': 1})
+        self.assertEqual(response.json()['results'], [{'id': self.golden.pk, 'name': 'Golden Retriever'}])
+        cached = self.client.get(url, {'q': 'retriever', 'limit': 1}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+
+
+class HomePageCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.breed = Breed.objects.create(name='Chow Chow')
+        cls.pet = Pet.objects.create(name='Macy', breed=cls.breed, age=2, description='Fluffy')
+        cls.user = User.objects.create_user('adopter', password='pass12345')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_steady_state_is_served_from_cache(self):
+        self.client.get(reverse('home'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('home'))
+        self.assertEqual(response.context['total_pets'], 1)
+        self.assertEqual(list(response.context['featured_pets']), [self.pet])
+
+    def test_signals_invalidate_cached_values(self):
+        self.client.get(reverse('home'))
+        request = AdoptionRequest.objects.create(pet=self.pet, requester=self.user, motivation='x')
+        request.status = 'approved'
+        request.save()
+        self.pet.status = 'adopted'
+        self.pet.save()
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response.context['total_pets'], 0)
+        self.assertEqual(response.context['total_adoptions'], 1)
+        self.assertEqual(list(response.context['featured_pets']), [])
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class PetCardCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', password='pass12345', is_staff=True)
+        cls.breed = Breed.objects.create(name='Beagle')
+        cls.pet = Pet.objects.create(
+            name='Snoopy', breed=cls.breed, age=2, description='Dreamer', posted_by=cls.staff,
+        )
+
+    def setUp(self):
+        cache.clear()
+        caches['fragments'].clear()
+
+    def test_cards_follow_pet_and_breed_changes(self):
+        self.assertContains(self.client.get(reverse('pets')), 'Snoopy')
+        self.pet.name = 'Woodstock'
+        self.pet.save()
+        self.assertContains(self.client.get(reverse('pets')), 'Woodstock')
+        self.breed.name = 'Basset'
+        self.breed.save()
+        self.assertContains(self.client.get(reverse('home')), 'Basset')
+        self.assertContains(self.client.get(reverse('pets')), 'Basset')
+
+    def test_staff_and_anonymous_cards_are_separate(self):
+        edit_url = reverse('pet_update', args=[self.pet.pk])
+        self.assertNotContains(self.client.get(reverse('pets')), edit_url)
+        self.client.force_login(self.staff)
+        self.assertContains(self.client.get(reverse('pets')), edit_url)
+        self.client.logout()
+        self.assertNotContains(self.client.get(reverse('pets')), edit_url)
+
+    def test_render_benchmark(self):
+        report = TemplateRenderBenchmark(iterations=2).run()
+        self.assertEqual(report['config']['user'], 'staff')
+        self.assertEqual(set(report['pages']), {'home', 'pets', 'my_pets'})
+        for timings in report['pages'].values():
+            self.assertGreater(timings['uncached']['mean_ms'], 0)
+            self.assertIn('p95_ms', timings['cached'])
+
+
+class ConditionalGetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.breed = Breed.objects.create(name='American Bully')
+        cls.pet = Pet.objects.create(name='Puffers', breed=cls.breed, age=4, description='Strong')
+        cls.user = User.objects.create_user('reviewer', password='pass12345')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_unchanged_resources_return_304_without_queries(self):
+        for url in (
+            reverse('api_pet_list'),
+            reverse('api_breed_list'),
+            reverse('api_pet_detail', args=[self.pet.pk]),
+        ):
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                with self.assertNumQueries(0):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+    def test_html_pet_page_is_not_conditional(self):
+        # A 304 would replay a stale CSRF token and swallow pending flash messages.
+        self.client.force_login(self.user)
+        url = reverse('pet_detail', args=[self.pet.pk])
+        response = self.client.get(url)
+        self.assertFalse(response.has_header('ETag'))
+        self.assertFalse(response.has_header('Last-Modified'))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='*').status_code, 200)
+
+    def test_related_changes_produce_a_new_validator(self):
+        url = reverse('api_pet_detail', args=[self.pet.pk])
+        etag = self.client.get(url)['ETag']
+        Review.objects.create(pet=self.pet, author=self.user, rating=5, title='A', content='B')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['reviews']['count'], 1)
+
+        list_url = reverse('api_pet_list')
+        etag = self.client.get(list_url)['ETag']
+        self.breed.name = 'Pocket Bully'
+        self.breed.save()
+        self.assertEqual(self.client.get(list_url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_new_image_derivatives_produce_a_new_validator(self):
+        # runworker bumps only the images stamp, but every srcset changes.
+        for url in (reverse('api_pet_list'), reverse('api_pet_detail', args=[self.pet.pk])):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                etag, last_modified = response['ETag'], response['Last-Modified']
+                # Last-Modified has one-second resolution.
+                cache.set(caching.IMAGES_STAMP_KEY, caching.get_stamp(caching.IMAGES_STAMP_KEY) + 2, None)
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+                self.assertNotEqual(self.client.get(url)['Last-Modified'], last_modified)
+
+    def test_stamps_bumped_by_another_process_invalidate_validators(self):
+        url = reverse('api_pet_detail', args=[self.pet.pk])
+        etag = self.client.get(url)['ETag']
+        # A separate backend instance stands in for a worker or management command process.
+        other_process = caches.create_connection('default')
+        stamp_key = caching.pet_stamp_key(self.pet.pk)
+        other_process.set(stamp_key, caching.get_stamp(stamp_key) + 1, None)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_process_local_default_cache_is_reported(self):
+        self.assertEqual(checks.check_default_cache_is_shared(None), [])
+        with override_settings(CACHES={**settings.CACHES, 'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }}):
+            self.assertEqual([warning.id for warning in checks.check_default_cache_is_shared(None)], ['app.W001'])
+
+
+class ImageDerivativeTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def upload(self, width=1000, height=500):
+        buffer = BytesIO()
+        Image.new('RGB', (width, height), 'orange').save(buffer, 'JPEG')
+        return SimpleUploadedFile('dog.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+    def test_generates_smaller_widths_and_srcset(self):
+        breed = Breed.objects.create(name='Pug')
+        pet = Pet.objects.create(name='Maya', breed=breed, age=1, description='Snorts', image=self.upload())
+        record = images.generate_derivatives(pet.image.name)
+        self.assertEqual(record, {'width': 1000, 'webp': [200, 400, 800], 'jpeg': [200, 400, 800]})
+        srcset = images.srcset(pet.image.name, 'webp')
+        self.assertIn('/media/pet_images/dog.w400.webp 400w', srcset)
+        self.assertTrue(srcset.endswith('/media/pet_images/dog.jpg 1000w'))
+
+        data = self.client.get(reverse('api_pet_detail', args=[pet.pk])).json()['data']
+        self.assertEqual(data['image_srcset']['webp'], srcset)
+        response = self.client.get(reverse('pets'))
+        self.assertContains(response, 'dog.w200.jpg 200w')
+
+    def test_backfill_command_skips_existing_derivatives(self):
+        breed = Breed.objects.create(name='Pug')
+        pet = Pet.objects.create(name='Maya', breed=breed, age=1, description='Snorts', image=self.upload(300, 300))
+        call_command('generate_image_derivatives', stdout=StringIO())
+        self.assertEqual(images.get_variants(pet.image.name)['jpeg'], [200])
+        call_command('generate_image_derivatives', stdout=StringIO())
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(self.media_root, 'pet_images'))),
+            ['dog.jpg', 'dog.w200.jpg', 'dog.w200.webp'],
+        )
+
+
+    def test_only_changed_images_are_scheduled(self):
+        breed = Breed.objects.create(name='Pug')
+        pet = Pet.objects.create(name='Maya', breed=breed, age=1, description='Snorts', image=self.upload())
+        job = Job.objects.get()
+        self.assertEqual(job.payload, {'name': pet.image.name})
+        for instance in (pet, Pet.objects.get(pk=pet.pk)):
+            instance.age = 2
+            with CaptureQueriesContext(connection) as queries:
+                instance.save()
+            self.assertFalse([query for query in queries if 'app_job' in query['sql']])
+
+        pet.image = self.upload()
+        pet.save()
+        self.assertEqual(Job.objects.count(), 2)
+        self.assertEqual(Job.objects.latest('pk').payload, {'name': pet.image.name})
+
+    def test_finished_jobs_and_new_specs_are_queued_again(self):
+        breed = Breed.objects.create(name='Pug')
+        pet = Pet.objects.create(name='Maya', breed=breed, age=1, description='Snorts', image=self.upload())
+        Job.objects.update(status='failed', attempts=3, last_error='Broken')
+        images.schedule_derivatives(pet.image)
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts, job.last_error), ('queued', 0, ''))
+
+        with mock.patch.object(images, 'SPEC_VERSION', 'next'):
+            images.schedule_many([pet.image])
+        self.assertEqual(Job.objects.count(), 2)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class JobQueueTests(TransactionTestCase):
+    # The worker runs jobs in a thread pool, which needs committed rows.
+
+    def setUp(self):
+        cache.clear()
+        self.calls = []
+
+        @jobs.task('tests.flaky', max_attempts=4, backoff=0)
+        def flaky(failures):
+            self.calls.append('flaky')
+            if self.calls.count('flaky') <= failures:
+                raise RuntimeError('Not yet')
+
+        @jobs.task('tests.broken', max_attempts=2, backoff=0)
+        def broken():
+            raise ValueError('Always broken')
+
+    def test_retries_then_succeeds_or_fails(self):
+        flaky = jobs.enqueue('tests.flaky', {'failures': 2})
+        broken = jobs.enqueue('tests.broken')
+        with self.assertLogs('app.jobs', 'WARNING') as logs:
+            outcomes = jobs.Worker(concurrency=2, poll_interval=0.01).run(once=True)
+        self.assertEqual(len(logs.records), 4)
+        self.assertEqual(outcomes, {'succeeded': 1, 'retried': 3, 'failed': 1})
+        flaky.refresh_from_db()
+        broken.refresh_from_db()
+        self.assertEqual((flaky.status, flaky.attempts, flaky.last_error), ('succeeded', 3, ''))
+        self.assertEqual((broken.status, broken.attempts), ('failed', 2))
+        self.assertEqual(broken.error_summary, 'ValueError: Always broken')
+
+    def test_backoff_grows_and_is_capped(self):
+        task = jobs.Task('tests.delay', None, backoff=10)
+        self.assertTrue(5 <= task.retry_delay(1).total_seconds() <= 15)
+        self.assertTrue(20 <= task.retry_delay(3).total_seconds() <= 60)
+        self.assertLessEqual(task.retry_delay(30).total_seconds(), jobs.MAX_BACKOFF_SECONDS * 1.5)
+
+    def test_idempotency_key_and_transactional_enqueue(self):
+        first = jobs.enqueue('tests.flaky', {'failures': 0}, key='once')
+        self.assertEqual(jobs.enqueue('tests.flaky', {'failures': 0}, key='once'), first)
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                jobs.enqueue('tests.flaky', {'failures': 0})
+                raise RuntimeError('Rolled back')
+        self.assertEqual(Job.objects.count(), 1)
+        with self.assertRaises(LookupError):
+            jobs.enqueue('tests.missing')
+
+    def test_expired_lease_is_requeued(self):
+        job = jobs.enqueue('tests.flaky', {'failures': 0})
+        worker = jobs.Worker(lease=-1)
+        self.assertEqual(worker.claim(5), [job])
+        worker.release_expired()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by), ('queued', ''))
+        call_command('runworker', once=True, stdout=StringIO())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('succeeded', 2))
+
+    def test_image_upload_is_processed_by_worker(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        buffer = BytesIO()
+        Image.new('RGB', (500, 300), 'orange').save(buffer, 'JPEG')
+        with override_settings(MEDIA_ROOT=media_root):
+            breed = Breed.objects.create(name='Pug')
+            pet = Pet.objects.create(
+                name='Maya', breed=breed, age=1, description='Snorts',
+                image=SimpleUploadedFile('dog.jpg', buffer.getvalue(), content_type='image/jpeg'),
+            )
+            job = Job.objects.get()
+            self.assertEqual((job.task, job.payload), ('images.generate_derivatives', {'name': pet.image.name}))
+            # The web process caches the record before any derivative exists.
+            self.assertEqual(images.srcset(pet.image.name), f'{pet.image.url} 500w')
+            images_stamp = caching.get_stamp(caching.IMAGES_STAMP_KEY)
+
+            # runworker is its own process, with its own cache backend instance.
+            worker_cache = caches.create_connection('default')
+            stdout = StringIO()
+            with mock.patch.object(images, 'cache', worker_cache), mock.patch.object(caching, 'cache', worker_cache):
+                call_command('runworker', once=True, stdout=stdout)
+            self.assertIn('1 succeeded, 0 retried, 0 failed', stdout.getvalue())
+            self.assertEqual(images.get_variants(pet.image.name)['jpeg'], [200, 400])
+            self.assertIn('.w200.jpg 200w', images.srcset(pet.image.name))
+            self.assertNotEqual(caching.get_stamp(caching.IMAGES_STAMP_KEY), images_stamp)
+
+        staff = User.objects.create_user('staff', password='pass12345', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(reverse('job_status'), {'status': 'succeeded'})
+        self.assertContains(response, 'Succeeded (1)')
+        self.assertContains(response, 'images.generate_derivatives #')
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class LoadTestHarnessTests(TransactionTestCase):
+    # The harness runs its visitors in threads, which need committed rows.
+
+    def setUp(self):
+        cache.clear()
+
+    def seed(self, seed=7):
+        call_command(
+            'seed_data', breeds=3, users=8, pets=20, requests=30, reviews=25, seed=seed,
+            stdout=StringIO(),
+        )
+
+    def test_seed_data_is_consistent(self):
+        self.seed()
+        self.assertEqual(
+            (Breed.objects.count(), User.objects.count(), UserProfile.objects.count(), Pet.objects.count()),
+            (3, 8, 8, 20),
+        )
+        self.assertEqual((AdoptionRequest.objects.count(), Review.objects.count()), (30, 25))
+        call_command('rebuild_counters', '--check', stdout=StringIO())
+        self.assertTrue(self.client.login(username='seed7_user0', password='seedpass123'))
+        pet = Pet.objects.first()
+        self.assertEqual(list(search_pets(Pet.objects.all(), pet.name).values_list('pk', flat=True))[:1], [pet.pk])
+
+    def test_seed_data_is_deterministic(self):
+        self.seed()
+        first = list(Pet.objects.order_by('pk').values_list('name', 'age', 'status'))
+        Pet.objects.all().delete()
+        User.objects.all().delete()
+        Breed.objects.all().delete()
+        self.seed()
+        self.assertEqual(list(Pet.objects.order_by('pk').values_list('name', 'age', 'status')), first)
+
+    def test_report_covers_routes(self):
+        self.seed()
+        report = LoadTest(requests=60, concurrency=1, seed=3).run()
+        self.assertEqual(report['total']['requests'], sum(r['requests'] for r in report['routes'].values()))
+        self.assertIn('pet_detail', report['routes'])
+        route = report['routes']['pet_detail']
+        self.assertLessEqual(route['p50_ms'], route['p99_ms'])
+        self.assertNotIn('500', route['status_codes'])
+
+    def test_session_store_benchmark(self):
+        self.seed()
+        report = SessionStoreBenchmark(requests=20, concurrency=1, seed=3).run()
+        self.assertEqual(set(report['stores']), {'db', 'cached_db', 'signed_cookies'})
+        self.assertEqual(report['stores']['db']['throughput_vs_db'], 1.0)
+        for result in report['stores'].values():
+            self.assertGreater(result['requests'], 0)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class SessionStoreTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('visitor', password='pass12345')
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        caches_override = override_settings(CACHES={**settings.CACHES, 'sessions': {
+            'BACKEND': 'app.cache_backends.InstrumentedFileBasedCache', 'LOCATION': directory,
+        }})
+        caches_override.enable()
+        self.addCleanup(caches_override.disable)
+
+    def session_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        return [query['sql'] for query in queries if 'django_session' in query['sql']]
+
+    def test_cached_db_reads_sessions_from_the_cache(self):
+        self.client.login(username='visitor', password='pass12345')
+        self.assertEqual(self.session_queries(reverse('my_pets')), [])
+        session_key = self.client.session.session_key
+        self.assertTrue(Session.objects.filter(pk=session_key).exists())
+
+        self.client.post(reverse('logout'))
+        self.assertFalse(Session.objects.filter(pk=session_key).exists())
+        self.assertFalse(sessions.SessionStore(session_key).exists(session_key))
+        self.assertIsNone(caches['sessions'].get(sessions.SessionStore.cache_key_prefix + session_key))
+
+    @override_settings(SESSION_STORE='db', SESSION_ENGINE='django.contrib.sessions.backends.db')
+    def test_db_store_queries_the_table(self):
+        self.client.login(username='visitor', password='pass12345')
+        self.assertEqual(len(self.session_queries(reverse('my_pets'))), 1)
+
+    def test_expired_sessions_cleared_in_batches(self):
+        past, future = timezone.now() - timedelta(days=1), timezone.now() + timedelta(days=1)
+        Session.objects.bulk_create(
+            [Session(session_key=f'expired{n}', session_data='', expire_date=past) for n in range(5)]
+            + [Session(session_key=f'live{n}', session_data='', expire_date=future) for n in range(2)]
+        )
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(sessions.clear_expired(batch_size=2), 5)
+        self.assertEqual(len([query for query in queries if query['sql'].startswith('DELETE')]), 3)
+        self.assertEqual(set(Session.objects.values_list('pk', flat=True)), {'live0', 'live1'})
+
+    def test_logins_queue_one_cleanup_per_interval(self):
+        self.client.login(username='visitor', password='pass12345')
+        self.client.logout()
+        self.client.login(username='visitor', password='pass12345')
+        self.assertEqual(Job.objects.filter(task='sessions.clear_expired').count(), 1)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class AuthPathTests(TestCase):
+
+    def profile_queries(self, queries):
+        return [query['sql'] for query in queries if 'app_userprofile' in query['sql']]
+
+    def test_signup_creates_the_profile_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('signup'), {
+                'username': 'newcomer', 'email': 'newcomer@example.com',
+                'password1': 'Sturdy-pass-123', 'password2': 'Sturdy-pass-123',
+            })
+        self.assertRedirects(response, reverse('login'), fetch_redirect_response=False)
+        self.assertEqual(len(self.profile_queries(queries)), 1)
+        self.assertTrue(UserProfile.objects.filter(user__username='newcomer').exists())
+
+    def test_login_and_user_saves_leave_the_profile_alone(self):
+        user = User.objects.create_user('regular', password='pass12345')
+        updated_at = user.profile.updated_at
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('login'), {'username': 'regular', 'password': 'pass12345'})
+            user.first_name = 'Reggie'
+            user.save()
+        self.assertEqual(self.profile_queries(queries), [])
+        self.assertEqual(UserProfile.objects.get(user=user).updated_at, updated_at)
+
+    def test_auth_benchmark(self):
+        report = AuthBenchmark(users=3, logins=2).run()
+        self.assertEqual((report['signup']['requests'], report['login']['requests']), (3, 6))
+        self.assertGreater(report['login']['queries_per_request'], 0)
+        self.assertFalse(User.objects.filter(username__startswith='authbench').exists())
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class AdminScaleTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = seed_catalog(pets=6)
+        cls.admin = User.objects.create_superuser('root', 'root@example.com', 'pass12345')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def changelist_queries(self, model):
+        url = reverse(f'admin:app_{model._meta.model_name}_changelist')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        models = [Pet, UserProfile, AdoptionRequest, Review, Job]
+        before = {model: self.changelist_queries(model) for model in models}
+        extra_users = [User.objects.create_user(f'extra{i}', password='pass12345') for i in range(6)]
+        breed = Breed.objects.first()
+        for i, user in enumerate(extra_users):
+            pet = Pet.objects.create(name=f'Extra {i}', breed=breed, age=1, description='More', posted_by=self.staff)
+            AdoptionRequest.objects.create(pet=pet, requester=user, motivation='More')
+            Review.objects.create(pet=pet, author=user, rating=3, title='More', content='More')
+            Job.objects.create(task='images.generate_derivatives', run_after=timezone.now())
+        self.assertEqual({model: self.changelist_queries(model) for model in models}, before)
+
+    def test_paginator_estimates_large_tables_and_caps_filtered_counts(self):
+        with mock.patch.object(EstimatedCountPaginator, 'estimate_above', 0):
+            with CaptureQueriesContext(connection) as queries:
+                count = EstimatedCountPaginator(Pet.objects.order_by('pk'), 10).count
+        self.assertGreaterEqual(count, Pet.objects.count())
+        self.assertNotIn('COUNT(', queries[0]['sql'])
+        with mock.patch.object(EstimatedCountPaginator, 'max_exact_count', 3):
+            self.assertEqual(EstimatedCountPaginator(Pet.objects.filter(age__gte=0).order_by('pk'), 10).count, 3)
+        self.assertEqual(EstimatedCountPaginator(Pet.objects.filter(age=1).order_by('pk'), 10).count, 1)
+
+    def test_foreign_keys_use_autocomplete(self):
+        response = self.client.get(reverse('admin:app_review_change', args=[Review.objects.first().pk]))
+        self.assertContains(response, 'class="admin-autocomplete"', count=2)
+        self.assertNotContains(response, f'>{Pet.objects.last()}</option>')
+
+    def bulk_action(self, action, requests):
+        return self.client.post(reverse('admin:app_adoptionrequest_changelist'), {
+            'action': action, '_selected_action': [request.pk for request in requests],
+        }, follow=True)
+
+    def test_bulk_approve_adopts_each_pet_once(self):
+        first_pet, second_pet = Pet.objects.order_by('pk')[:2]
+        users = [User.objects.create_user(f'fan{i}', password='pass12345') for i in range(3)]
+        extra = [AdoptionRequest.objects.create(pet=first_pet, requester=user, motivation='Me too') for user in users]
+        original = AdoptionRequest.objects.get(pet=first_pet, requester__username='user0')
+        selected = [original, extra[0], AdoptionRequest.objects.get(pet=second_pet)]
+
+        response = self.bulk_action('approve_selected', selected)
+        self.assertContains(response, '2 request(s) approved, 3 competing request(s) rejected.')
+        statuses = dict(AdoptionRequest.objects.filter(pet__in=[first_pet, second_pet]).values_list('pk', 'status'))
+        self.assertEqual(statuses.pop(original.pk), 'approved')
+        self.assertEqual(statuses.pop(selected[2].pk), 'approved')
+        self.assertEqual(set(statuses.values()), {'rejected'})
+        self.assertEqual(set(Pet.objects.filter(pk__in=[first_pet.pk, second_pet.pk]).values_list('status', flat=True)),
+                         {'adopted'})
+        call_command('rebuild_counters', '--check', stdout=StringIO())
+
+        # Pets that are already adopted are left alone.
+        late = AdoptionRequest.objects.create(pet=first_pet, requester=self.staff, motivation='Late')
+        self.assertContains(self.bulk_action('approve_selected', [late]), '0 request(s) approved')
+        late.refresh_from_db()
+        self.assertEqual(late.status, 'pending')
+
+    def test_bulk_reject_only_touches_pending(self):
+        pending, approved = AdoptionRequest.objects.order_by('pk')[:2]
+        AdoptionRequest.objects.filter(pk=approved.pk).update(status='approved')
+        call_command('rebuild_counters', stdout=StringIO())
+        with CaptureQueriesContext(connection) as queries:
+            response = self.bulk_action('reject_selected', [pending, approved])
+        self.assertContains(response, '1 request(s) rejected.')
+        self.assertEqual(len([query for query in queries if query['sql'].startswith('UPDATE "app_adoptionrequest"')]), 1)
+        self.assertEqual(AdoptionRequest.objects.get(pk=approved.pk).status, 'approved')
+        call_command('rebuild_counters', '--check', stdout=StringIO())
+
+    def test_bulk_actions_invalidate_pet_validators(self):
+        requests = list(AdoptionRequest.objects.order_by('pk')[:2])
+        for action, adoption_request in zip(('reject_selected', 'approve_selected'), requests):
+            with self.subTest(action=action):
+                url = reverse('api_pet_detail', args=[adoption_request.pet_id])
+                etag = self.client.get(url)['ETag']
+                self.bulk_action(action, [adoption_request])
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json()['data']['adoption_stats']['pending_count'], 0)
@@ -5,11 +5,12 @@ from .views import (
     PetListView, PetDetailView, PetCreateView, PetUpdateView, PetDeleteView, PetSearchAPIView,
     UserPostPetView, UserEditPetView, UserDeletePetView, MyPetsView,
     AdoptionRequestListView, AdoptionRequestDetailView, AdoptionRequestCreateView, 
-    AdoptionRequestUpdateView, AdoptionRequestDeleteView, AdoptionRequestApproveView,
+    AdoptionRequestUpdateView, AdoptionRequestDeleteView, AdoptionRequestApproveView, JobStatusView, MetricsView,
+    RequestProfileListView, RequestProfileDetailView, RequestProfileCompareView, RequestProfileFlameView,
     ReviewListView, ReviewDetailView, ReviewCreateView, ReviewUpdateView, ReviewDeleteView,
     ProfileDetailView, ProfileUpdateView, UserProfileListView,
     SignUpView, CustomLoginView, CustomLogoutView,
-    PetListAPIView, PetDetailAPIView, BreedListAPIView
+    PetListAPIView, PetDetailAPIView, BreedListAPIView, BreedAutocompleteAPIView
 )
 
 urlpatterns = [
@@ -76,6 +77,18 @@ urlpatterns = [
     path('adoption-requests/<int:pk>/approve/', AdoptionRequestApproveView.as_view(), name='adoption_request_approve'),
     
     
+    path('jobs/', JobStatusView.as_view(), name='job_status'),
+    
+    
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+    
+    
+    path('profiler/', RequestProfileListView.as_view(), name='request_profiles'),
+    path('profiler/compare/', RequestProfileCompareView.as_view(), name='request_profile_compare'),
+    path('profiler/flame/', RequestProfileFlameView.as_view(), name='request_profile_flame'),
+    path('profiler/<str:profile_id>/', RequestProfileDetailView.as_view(), name='request_profile_detail'),
+    
+    
     path('reviews/', ReviewListView.as_view(), name='reviews'),
     
     
@@ -107,4 +120,7 @@ urlpatterns = [
     
    
     path('api/breeds/', BreedListAPIView.as_view(), name='api_breed_list'),
+    
+   
+    path('api/breeds/autocomplete/', BreedAutocompleteAPIView.as_view(), name='api_breed_autocomplete'),
 ]
\ No newline at end of file
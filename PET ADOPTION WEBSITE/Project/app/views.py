@@ -1,20 +1,45 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib import messages
 from django.shortcuts import render, redirect, get_object_or_404
-from django.views.generic import TemplateView, ListView, DetailView
+from django.views.generic import View, TemplateView, ListView, DetailView
 from django.views.generic.edit import CreateView, UpdateView, DeleteView
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.auth.views import LoginView, LogoutView
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 from django.contrib.auth import logout
+from django.core.handlers.asgi import ASGIRequest
+from django.core.paginator import InvalidPage, Page
 from django.urls import reverse_lazy
-from django.db.models import Q, Avg
-from django.http import JsonResponse
-from .models import Pet, Breed, UserProfile, AdoptionRequest, Review
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.db.models import Count, Min, Sum
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from .models import Pet, Breed, UserProfile, AdoptionRequest, Review, Job
+from .mixins import QueryPlanMixin
+from .search import search_pets
+from .pagination import CountedPaginator, CursorPaginator, InvalidCursor
+from . import adoptions, breeds, caching, facets, images, metrics, profiler
+from .conditional import breeds_condition, catalog_condition, pet_condition
 from .forms import (PetForm, UserProfileForm, AdoptionRequestForm, 
                     ReviewForm, CustomUserCreationForm, UserPetForm)
 
 
+async def alist(queryset):
+    return [row async for row in queryset]
+
+
+def filter_query(request):
+    """The current query string minus ``page``, for pagination links that keep the filters."""
+    params = request.GET.copy()
+    params.pop('page', None)
+    return params.urlencode()
+
+
 class SignUpView(CreateView):
 
     form_class = CustomUserCreationForm
@@ -46,15 +71,14 @@ class CustomLogoutView(TemplateView):
 class HomePageView(TemplateView):
 
     template_name = 'app/home.html'
+    query_budget = 6
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
        
-        context['featured_pets'] = Pet.objects.filter(status='available')[:6]
-        
-        context['total_pets'] = Pet.objects.filter(status='available').count()
+        context['featured_pets'] = caching.get_featured_pets()
         
-        context['total_adoptions'] = AdoptionRequest.objects.filter(status='approved').count()
+        context.update(caching.get_home_stats())
         return context
 
 class AboutPageView(TemplateView):
@@ -63,59 +87,46 @@ class AboutPageView(TemplateView):
 
 
 
-class PetListView(ListView):
+class PetListView(QueryPlanMixin, ListView):
   
     model = Pet
     template_name = 'app/pet_list.html'
     context_object_name = 'pets'
     paginate_by = 12
+    select_related = ('breed',)
+    only_fields = ('id', 'name', 'age', 'gender', 'status', 'description', 'image',
+                   'created_at', 'updated_at', 'breed__name')
+    query_budget = 6
+    
+    def get_filters(self):
+        return facets.normalize_filters(self.request.GET, status='available')
     
     def get_queryset(self):
-       
-        queryset = Pet.objects.filter(status='available')
-        
-        
-        search_query = self.request.GET.get('q')
-        if search_query:
-            queryset = queryset.filter(
-                Q(name__icontains=search_query) | 
-                Q(breed__name__icontains=search_query) |
-                Q(description__icontains=search_query)
-            )
-        
-      
-        breed = self.request.GET.get('breed')
-        if breed:
-            queryset = queryset.filter(breed__name__icontains=breed)
-        
-      
-        gender = self.request.GET.get('gender')
-        if gender:
-            queryset = queryset.filter(gender=gender)
-        
-       
-        return queryset.order_by('-created_at')
+        return facets.apply_filters(super().get_queryset(), self.get_filters())
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-       
-        context['breeds'] = Pet.objects.filter(status='available').values_list('breed__name', flat=True).distinct().order_by('breed__name')
-        
+        filters = self.get_filters()
+        context['facets'] = facets.get_facets(filters)
+        context['filters'] = filters
         context['search_query'] = self.request.GET.get('q', '')
+        context['filter_query'] = filter_query(self.request)
         return context
 
-class PetDetailView(DetailView):
+class PetDetailView(QueryPlanMixin, DetailView):
    
     model = Pet
     template_name = 'app/pet_detail.html'
     context_object_name = 'pet'
+    select_related = ('breed',)
+    query_budget = 8
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
        
-        context['reviews'] = self.object.reviews.all()
+        context['reviews'] = self.object.reviews.select_related('author')
       
-        context['average_rating'] = self.object.reviews.aggregate(Avg('rating'))['rating__avg']
+        context['average_rating'] = self.object.average_rating
         
        
         if self.request.user.is_authenticated:
@@ -157,7 +168,6 @@ class UserPostPetView(LoginRequiredMixin, CreateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['is_user_post'] = True
-        context['breeds'] = Breed.objects.all()
         return context
 
 class PetUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
@@ -222,18 +232,20 @@ class MyPetsView(LoginRequiredMixin, ListView):
 
 
 
-class ProfileDetailView(DetailView):
+class ProfileDetailView(QueryPlanMixin, DetailView):
     
     model = UserProfile
     template_name = 'app/profile_detail.html'
     context_object_name = 'profile'
+    select_related = ('user',)
+    query_budget = 6
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['adoption_requests'] = AdoptionRequest.objects.filter(
             requester=self.object.user
-        )
-        context['reviews'] = Review.objects.filter(author=self.object.user)
+        ).select_related('pet__breed')
+        context['reviews'] = Review.objects.filter(author=self.object.user).select_related('pet')
         return context
 
 class ProfileUpdateView(LoginRequiredMixin, UpdateView):
@@ -248,37 +260,48 @@ class ProfileUpdateView(LoginRequiredMixin, UpdateView):
     def get_success_url(self):
         return reverse_lazy('profile_detail', kwargs={'pk': self.object.pk})
 
-class UserProfileListView(ListView):
+class UserProfileListView(QueryPlanMixin, ListView):
    
     model = UserProfile
     template_name = 'app/profile_list.html'
     context_object_name = 'profiles'
     paginate_by = 12
+    select_related = ('user',)
+    query_budget = 5
+    
+    def get_queryset(self):
+        return super().get_queryset().order_by('-created_at')
 
 
 
-class AdoptionRequestListView(LoginRequiredMixin, ListView):
+class AdoptionRequestListView(LoginRequiredMixin, QueryPlanMixin, ListView):
     
     model = AdoptionRequest
     template_name = 'app/adoption_request_list.html'
     context_object_name = 'requests'
     paginate_by = 12
+    select_related = ('pet', 'requester')
+    query_budget = 6
     
     def get_queryset(self):
+        queryset = super().get_queryset().order_by('-requested_date')
         if self.request.user.is_staff:
-            return AdoptionRequest.objects.all()
-        return AdoptionRequest.objects.filter(requester=self.request.user)
+            return queryset
+        return queryset.filter(requester=self.request.user)
 
-class AdoptionRequestDetailView(LoginRequiredMixin, DetailView):
+class AdoptionRequestDetailView(LoginRequiredMixin, QueryPlanMixin, DetailView):
     
     model = AdoptionRequest
     template_name = 'app/adoption_request_detail.html'
     context_object_name = 'adoption_request'
+    select_related = ('pet__breed', 'requester__profile')
+    query_budget = 5
     
     def get_queryset(self):
+        queryset = super().get_queryset()
         if self.request.user.is_staff:
-            return AdoptionRequest.objects.all()
-        return AdoptionRequest.objects.filter(requester=self.request.user)
+            return queryset
+        return queryset.filter(requester=self.request.user)
 
 class AdoptionRequestCreateView(LoginRequiredMixin, CreateView):
     
@@ -339,13 +362,15 @@ class AdoptionRequestApproveView(LoginRequiredMixin, UserPassesTestMixin, Update
     
     def post(self, request, *args, **kwargs):
         self.object = self.get_object()
-        if self.object.status == 'pending':
-            self.object.status = 'approved'
-            pet = self.object.pet
-            pet.status = 'adopted'
-            pet.save()
-            self.object.save()
-            messages.success(request, f"Adoption request for {pet.name} has been approved!")
+        try:
+            self.object, rejected = adoptions.approve(self.object.pk)
+        except adoptions.ApprovalConflict as exc:
+            messages.error(request, str(exc))
+        else:
+            message = f"Adoption request for {self.object.pet.name} has been approved!"
+            if rejected:
+                message += f" {rejected} other pending request(s) were declined."
+            messages.success(request, message)
         return redirect('adoption_request_detail', pk=self.object.pk)
     
     def get_context_data(self, **kwargs):
@@ -354,20 +379,153 @@ class AdoptionRequestApproveView(LoginRequiredMixin, UserPassesTestMixin, Update
         return context
 
 
+class JobStatusView(LoginRequiredMixin, UserPassesTestMixin, ListView):
+    model = Job
+    template_name = 'app/job_status.html'
+    context_object_name = 'jobs'
+    paginate_by = 25
+    query_budget = 6
+    
+    def test_func(self):
+        return self.request.user.is_staff
+    
+    def get_status(self):
+        status = self.request.GET.get('status', '')
+        return status if status in dict(Job.STATUS_CHOICES) else ''
+    
+    def get_queryset(self):
+        queryset = Job.objects.order_by('-created_at', '-pk')
+        if self.get_status():
+            queryset = queryset.filter(status=self.get_status())
+        return queryset
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        counts = dict(Job.objects.order_by().values_list('status').annotate(Count('id')))
+        context['status_counts'] = [
+            {'value': value, 'label': label, 'count': counts.get(value, 0)}
+            for value, label in Job.STATUS_CHOICES
+        ]
+        context['selected_status'] = self.get_status()
+        context['oldest_due'] = Job.objects.filter(status='queued', run_after__lte=timezone.now()).aggregate(
+            oldest=Min('run_after'),
+        )['oldest']
+        return context
+
+
+class MetricsView(View):
+    """Prometheus scrape target; open to ``METRICS_ALLOWED_IPS`` (the local scraper) and to staff."""
+    query_budget = 5
+    
+    def get(self, request):
+        allowed = request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+        if not allowed and not request.user.is_staff:
+            return HttpResponseForbidden()
+        return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+class RequestProfileListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
+    """Profiles stored by ``ProfilerMiddleware``, newest first, optionally for one URL name."""
+    template_name = 'app/request_profile_list.html'
+    context_object_name = 'profiles'
+    paginate_by = 50
+    query_budget = 3
+    
+    def test_func(self):
+        return self.request.user.is_staff
+    
+    def get_queryset(self):
+        return profiler.list_profiles(self.request.GET.get('route') or None)
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['selected_route'] = self.request.GET.get('route', '')
+        context['routes'] = sorted({summary['url_name'] for summary in profiler.list_profiles()})
+        return context
+
+
+class RequestProfileDetailView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
+    template_name = 'app/request_profile_detail.html'
+    query_budget = 3
+    
+    def test_func(self):
+        return self.request.user.is_staff
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        profile = profiler.load(kwargs['profile_id'])
+        if profile is None:
+            raise Http404('No such profile.')
+        scale = 100 / profile['duration_ms'] if profile['duration_ms'] else 0
+        for query in profile['queries']:
+            query['left'] = round(query['start_ms'] * scale, 3)
+            query['width'] = max(round(query['duration_ms'] * scale, 3), 0.2)
+        context['profile'] = profile
+        context['tree_rows'] = profiler.tree_rows(profile['tree'])
+        context['flame_rows'] = profiler.flame_rows(profile['tree'])
+        return context
+
+
+class RequestProfileCompareView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
+    """Two profiles side by side (``?a=<id>&b=<id>``): where the time and the queries moved."""
+    template_name = 'app/request_profile_compare.html'
+    query_budget = 3
+    
+    def test_func(self):
+        return self.request.user.is_staff
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        first = profiler.load(self.request.GET.get('a'))
+        second = profiler.load(self.request.GET.get('b'))
+        if first is None or second is None:
+            raise Http404('Pick two stored profiles to compare.')
+        context['first'], context['second'] = first, second
+        context['functions'], context['queries'] = profiler.compare(first, second)
+        return context
 
-class ReviewListView(ListView):
+
+class RequestProfileFlameView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
+    """Flame graph of the average call tree over the stored profiles of one URL name."""
+    template_name = 'app/request_profile_flame.html'
+    max_profiles = 50
+    query_budget = 3
+    
+    def test_func(self):
+        return self.request.user.is_staff
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        route = self.request.GET.get('route', '')
+        summaries = profiler.list_profiles(route)[:self.max_profiles] if route else []
+        profiles = [profile for profile in map(profiler.load, (summary['id'] for summary in summaries)) if profile]
+        context['route'] = route
+        context['profile_count'] = len(profiles)
+        if profiles:
+            tree = profiler.merge([profile['tree'] for profile in profiles])
+            context['tree'] = tree
+            context['flame_rows'] = profiler.flame_rows(tree)
+        return context
+
+
+
+class ReviewListView(QueryPlanMixin, ListView):
     model = Review
     template_name = 'app/review_list.html'
     context_object_name = 'reviews'
     paginate_by = 12
+    select_related = ('pet', 'author')
+    query_budget = 5
     
     def get_queryset(self):
-        return Review.objects.all().order_by('-created_at')
+        return super().get_queryset().order_by('-created_at')
 
-class ReviewDetailView(DetailView):
+class ReviewDetailView(QueryPlanMixin, DetailView):
     model = Review
     template_name = 'app/review_detail.html'
     context_object_name = 'review'
+    select_related = ('pet', 'author')
+    query_budget = 4
 
 class ReviewCreateView(LoginRequiredMixin, CreateView):
     model = Review
@@ -418,34 +576,89 @@ class ReviewDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
         return reverse_lazy('pet_detail', kwargs={'pk': self.object.pet.pk})
 
 
-class PetSearchAPIView(ListView):
+class PetSearchAPIView(QueryPlanMixin, ListView):
     model = Pet
     template_name = 'app/pet_list.html'
     context_object_name = 'pets'
+    paginate_by = 12
+    ordering = ('-created_at',)
+    select_related = ('breed',)
+    query_budget = 5
+    max_results = 20
+    paginator_class = CountedPaginator
     
     def get_queryset(self):
         query = self.request.GET.get('q', '')
-        return Pet.objects.filter(
-            Q(name__icontains=query) | 
-            Q(breed__name__icontains=query) |
-            Q(description__icontains=query)
+        return search_pets(super().get_queryset(), query)
+    
+    async def get(self, request, *args, **kwargs):
+        # The first search on a connection introspects it for the FTS table.
+        queryset = await sync_to_async(self.get_queryset)()
+        if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            # One extra row tells the client whether to link to the full results.
+            rows = await alist(queryset.values('id', 'name', 'breed__name', 'image')[:self.max_results + 1])
+            return JsonResponse({'pets': rows[:self.max_results], 'truncated': len(rows) > self.max_results})
+        self.object_list = queryset
+        self.page_result = await self.apaginate_queryset(queryset, self.paginate_by)
+        return self.render_to_response(self.get_context_data())
+    
+    async def apaginate_queryset(self, queryset, page_size):
+        """``paginate_queryset`` with the count and the page fetched concurrently.
+
+        Only ``page=last`` has to wait for the count to know which rows to fetch.
+        """
+        orphans = self.get_paginate_orphans()
+        page_number = self.kwargs.get(self.page_kwarg) or self.request.GET.get(self.page_kwarg) or 1
+        if page_number == 'last':
+            count = await queryset.acount()
+            number = CountedPaginator(queryset, page_size, count, orphans=orphans).num_pages
+            bottom = (number - 1) * page_size
+            items = await alist(queryset[bottom:bottom + page_size + orphans])
+        else:
+            try:
+                number = int(page_number)
+            except ValueError:
+                raise Http404('Page is not "last", nor can it be converted to an int.')
+            bottom = (max(number, 1) - 1) * page_size
+            count, items = await asyncio.gather(
+                queryset.acount(),
+                alist(queryset[bottom:bottom + page_size + orphans]),
+            )
+        paginator = self.get_paginator(
+            queryset, page_size, orphans=orphans,
+            allow_empty_first_page=self.get_allow_empty(), count=count,
         )
+        try:
+            number = paginator.validate_number(number)
+        except InvalidPage as exc:
+            raise Http404(f'Invalid page ({page_number}): {exc}')
+        # The same bounds as Paginator.page(), over the rows already fetched.
+        top = bottom + page_size
+        if top + orphans >= count:
+            top = count
+        page = Page(items[:top - bottom], number, paginator)
+        return paginator, page, page.object_list, page.has_other_pages()
+    
+    def paginate_queryset(self, queryset, page_size):
+        return self.page_result
     
-    def render_to_response(self, context, **response_kwargs):
-        if self.request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-            pets = list(self.get_queryset().values('id', 'name', 'breed__name', 'image'))
-            return JsonResponse({'pets': pets})
-        return super().render_to_response(context, **response_kwargs)
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['search_query'] = self.request.GET.get('q', '')
+        context['filter_query'] = filter_query(self.request)
+        return context
 
-class MyPetsView(LoginRequiredMixin, ListView):
+class MyPetsView(LoginRequiredMixin, QueryPlanMixin, ListView):
     """Show all pets posted by the current user"""
     model = Pet
     template_name = 'app/my_pets.html'
     context_object_name = 'pets'
     paginate_by = 12
+    select_related = ('breed',)
+    query_budget = 9
     
     def get_queryset(self):
-        return Pet.objects.filter(posted_by=self.request.user).order_by('-created_at')
+        return super().get_queryset().filter(posted_by=self.request.user).order_by('-created_at')
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -458,7 +671,9 @@ class MyPetsView(LoginRequiredMixin, ListView):
             requester=self.request.user, 
             status='approved'
         ).values_list('pet_id', flat=True)
-        context['adopted_pets'] = Pet.objects.filter(pk__in=adopted_pets_ids).order_by('-updated_at')
+        context['adopted_pets'] = self.apply_query_plan(
+            Pet.objects.filter(pk__in=adopted_pets_ids)
+        ).order_by('-updated_at')
         context['total_my_adoptions'] = context['adopted_pets'].count()
         
         return context
@@ -466,77 +681,168 @@ class MyPetsView(LoginRequiredMixin, ListView):
 
 
 
+@method_decorator(catalog_condition, name='get')
 class PetListAPIView(ListView):
     model = Pet
+    query_budget = 3
+    default_limit = 20
+    max_limit = 100
+    export_chunk_size = 2000
+    fields = [
+        'id', 'name', 'breed__name', 'breed__id', 'age', 'gender',
+        'status', 'image', 'description', 'health_status', 'created_at'
+    ]
+    
+    def get_filters(self):
+        return facets.normalize_filters(self.request.GET)
     
     def get_queryset(self):
-        status = self.request.GET.get('status', 'available')
-        gender = self.request.GET.get('gender')
-        breed_id = self.request.GET.get('breed_id')
-        search = self.request.GET.get('search')
-        
-        pets = Pet.objects.select_related('breed').filter(status=status)
-        
-        if gender:
-            pets = pets.filter(gender=gender)
+        return facets.apply_filters(Pet.objects.select_related('breed'), self.get_filters())
+    
+    def get_limit(self):
+        try:
+            limit = int(self.request.GET.get('limit', self.default_limit))
+        except (ValueError, TypeError):
+            limit = self.default_limit
+        return max(1, min(limit, self.max_limit))
+    
+    async def get_estimated_total(self, queryset):
+        """Read the total from the per-breed counters when only status and breed_id filter."""
+        filters = self.get_filters()
+        if filters['status'] == 'available' and filters.keys() <= {'status', 'breed_id'}:
+            breeds = Breed.objects.all()
+            if 'breed_id' in filters:
+                breeds = breeds.filter(pk=filters['breed_id'])
+            return (await breeds.aaggregate(total=Sum('available_pets')))['total'] or 0
+        return await queryset.acount()
+    
+    def get_export_format(self):
+        """Return 'ndjson' or 'json-stream' when the client asked for a full streamed export."""
+        export_format = self.request.GET.get('format')
+        if export_format in ('ndjson', 'json-stream'):
+            return export_format
+        if 'application/x-ndjson' in self.request.headers.get('Accept', ''):
+            return 'ndjson'
+        return None
+    
+    def serialize_pet(self, pet):
+        return {
+            'id': pet['id'],
+            'name': pet['name'],
+            'breed': pet['breed__name'],
+            'breed_id': pet['breed__id'],
+            'age': pet['age'],
+            'gender': pet['gender'],
+            'status': pet['status'],
+            'image': pet['image'],
+            'image_srcset': {
+                'webp': images.srcset(pet['image'], 'webp'),
+                'jpeg': images.srcset(pet['image']),
+            },
+            'description': pet['description'],
+            'health_status': pet['health_status'],
+            'created_at': str(pet['created_at']),
+        }
+    
+    def iter_ndjson(self, rows):
+        for pet in rows:
+            yield json.dumps(self.serialize_pet(pet)) + '\n'
+    
+    def iter_json_document(self, rows):
+        yield '{"status": "success", "results": ['
+        separator = ''
+        for pet in rows:
+            yield separator + json.dumps(self.serialize_pet(pet))
+            separator = ', '
+        yield ']}'
+    
+    async def aiter_ndjson(self, rows):
+        async for pet in rows:
+            yield json.dumps(self.serialize_pet(pet)) + '\n'
+    
+    async def aiter_json_document(self, rows):
+        yield '{"status": "success", "results": ['
+        separator = ''
+        async for pet in rows:
+            yield separator + json.dumps(self.serialize_pet(pet))
+            separator = ', '
+        yield ']}'
+    
+    def stream_export(self, queryset, ordering, export_format):
+        """Stream every matching pet, reading the table in chunks so memory stays flat.
         
-        if breed_id:
-            try:
-                pets = pets.filter(breed_id=int(breed_id))
-            except (ValueError, TypeError):
-                pass
+        Each server gets the iterator kind it can stream without buffering:
+        async under ASGI, sync under WSGI.
+        """
+        rows = queryset.values(*self.fields).order_by(*ordering)
+        if isinstance(self.request, ASGIRequest):
+            rows = rows.aiterator(chunk_size=self.export_chunk_size)
+            body = self.aiter_ndjson(rows) if export_format == 'ndjson' else self.aiter_json_document(rows)
+        else:
+            rows = rows.iterator(chunk_size=self.export_chunk_size)
+            body = self.iter_ndjson(rows) if export_format == 'ndjson' else self.iter_json_document(rows)
+        content_type = 'application/x-ndjson' if export_format == 'ndjson' else 'application/json'
+        return StreamingHttpResponse(body, content_type=content_type)
+    
+    async def get(self, request, *args, **kwargs):
+        # The first search on a connection introspects it for the FTS table.
+        queryset = await sync_to_async(self.get_queryset)()
+        fields = list(self.fields)
+        ordering = ['-created_at', '-id']
+        if 'search_rank' in queryset.query.annotations:
+            fields.append('search_rank')
+            ordering.insert(0, 'search_rank')
         
-        if search:
-            pets = pets.filter(
-                Q(name__icontains=search) |
-                Q(breed__name__icontains=search) |
-                Q(description__icontains=search)
-            )
+        export_format = self.get_export_format()
+        if export_format:
+            return self.stream_export(queryset, ordering, export_format)
         
-        return pets.order_by('-created_at')
-    
-    def render_to_response(self, context, **response_kwargs):
-        pets = list(self.get_queryset().values(
-            'id', 'name', 'breed__name', 'breed__id', 'age', 'gender',
-            'status', 'image', 'description', 'health_status', 'created_at'
-        ))
+        paginator = CursorPaginator(queryset.values(*fields), ordering)
+        lookups = {'page': paginator.apage(request.GET.get('cursor'), self.get_limit())}
+        if request.GET.get('include_total'):
+            lookups['estimated_total'] = self.get_estimated_total(queryset)
+        if request.GET.get('facets'):
+            lookups['facets'] = sync_to_async(facets.get_facets)(self.get_filters())
+        try:
+            results = dict(zip(lookups, await asyncio.gather(*lookups.values())))
+        except InvalidCursor:
+            return JsonResponse({'status': 'error', 'message': 'Invalid cursor'}, status=400)
+        page = results.pop('page')
         
-        pets_data = []
-        for pet in pets:
-            pets_data.append({
-                'id': pet['id'],
-                'name': pet['name'],
-                'breed': pet['breed__name'],
-                'breed_id': pet['breed__id'],
-                'age': pet['age'],
-                'gender': pet['gender'],
-                'status': pet['status'],
-                'image': pet['image'],
-                'description': pet['description'],
-                'health_status': pet['health_status'],
-                'created_at': str(pet['created_at']),
-            })
+        pets_data = [self.serialize_pet(pet) for pet in page.items]
         
-        return JsonResponse({
+        data = {
             'count': len(pets_data),
+            'next': page.next_cursor,
+            'prev': page.prev_cursor,
             'results': pets_data,
             'status': 'success'
-        })
+        }
+        data.update(results)
+        return JsonResponse(data)
 
 
+@method_decorator(pet_condition, name='get')
 class PetDetailAPIView(DetailView):
     model = Pet
     pk_url_kwarg = 'pet_id'
+    query_budget = 3
+    
+    def get_queryset(self):
+        return Pet.objects.select_related('breed', 'posted_by__profile')
+    
+    async def get(self, request, *args, **kwargs):
+        # Adoption stats and the review aggregate are counters on the pet row,
+        # so the whole payload is one query.
+        try:
+            self.object = await self.get_queryset().aget(pk=kwargs[self.pk_url_kwarg])
+        except Pet.DoesNotExist:
+            raise Http404('No pet found matching the query')
+        return self.render_to_response({})
     
     def render_to_response(self, context, **response_kwargs):
-        pet = self.get_object()
-        
-        adoption_requests = AdoptionRequest.objects.filter(pet=pet)
-        approved_count = adoption_requests.filter(status='approved').count()
-        pending_count = adoption_requests.filter(status='pending').count()
-        
-        reviews = Review.objects.filter(pet=pet)
-        avg_rating = reviews.aggregate(Avg('rating'))['rating__avg']
+        pet = self.object
+        avg_rating = pet.average_rating
         
         pet_data = {
             'id': pet.id,
@@ -554,6 +860,10 @@ class PetDetailAPIView(DetailView):
             'gender': pet.gender,
             'status': pet.status,
             'image': pet.image.url if pet.image else None,
+            'image_srcset': {
+                'webp': images.srcset(pet.image.name, 'webp'),
+                'jpeg': images.srcset(pet.image.name),
+            },
             'description': pet.description,
             'health_status': pet.health_status,
             'arrival_date': str(pet.arrival_date),
@@ -565,12 +875,12 @@ class PetDetailAPIView(DetailView):
                 'profile_url': f'/profiles/{pet.posted_by.profile.id}/'
             } if pet.posted_by else None,
             'adoption_stats': {
-                'total_requests': adoption_requests.count(),
-                'approved_count': approved_count,
-                'pending_count': pending_count,
+                'total_requests': pet.adoption_request_count,
+                'approved_count': pet.approved_request_count,
+                'pending_count': pet.pending_request_count,
             },
             'reviews': {
-                'count': reviews.count(),
+                'count': pet.review_count,
                 'average_rating': round(avg_rating, 2) if avg_rating else None,
             }
         }
@@ -581,25 +891,29 @@ class PetDetailAPIView(DetailView):
         })
 
 
+@method_decorator(catalog_condition, name='get')
 class BreedListAPIView(ListView):
     model = Breed
+    query_budget = 3
     
     def get_queryset(self):
         return Breed.objects.all().order_by('name')
     
+    async def get(self, request, *args, **kwargs):
+        return self.render_to_response({'breeds': await alist(self.get_queryset())})
+    
     def render_to_response(self, context, **response_kwargs):
-        breeds = self.get_queryset()
+        breeds = context['breeds']
         
         breeds_data = []
         for breed in breeds:
-            pet_count = Pet.objects.filter(breed=breed, status='available').count()
             breeds_data.append({
                 'id': breed.id,
                 'name': breed.name,
                 'size': breed.size,
                 'temperament': breed.temperament,
                 'description': breed.description,
-                'available_pets': pet_count,
+                'available_pets': breed.available_pets,
                 'created_at': str(breed.created_at),
             })
         
@@ -608,3 +922,21 @@ class BreedListAPIView(ListView):
             'results': breeds_data,
             'status': 'success'
         })
+
+
+@method_decorator(breeds_condition, name='get')
+class BreedAutocompleteAPIView(View):
+    # Answered from the in-process breed index; no queries once it is built.
+    query_budget = 1
+    default_limit = 10
+    max_limit = 20
+    
+    def get(self, request, *args, **kwargs):
+        try:
+            limit = min(max(int(request.GET.get('limit', self.default_limit)), 1), self.max_limit)
+        except ValueError:
+            limit = self.default_limit
+        return JsonResponse({
+            'results': breeds.get_index().search(request.GET.get('q', ''), limit),
+            'status': 'success'
+        })
@@ -3,6 +3,7 @@ document.addEventListener('DOMContentLoaded', function() {
     initAlerts();
     initSearch();
     initDelete();
+    initBreedAutocomplete();
 });
 
 // Initialize menu toggle
@@ -51,7 +52,7 @@ function searchPets(query) {
         if (xhr.status === 200) {
             try {
                 var data = JSON.parse(xhr.responseText);
-                displayResults(data.pets);
+                displayResults(data.pets, data.truncated ? url : null);
             } catch(e) {
                 console.log('Error parsing response');
             }
@@ -65,8 +66,8 @@ function searchPets(query) {
     xhr.send();
 }
 
-// Display search results
-function displayResults(pets) {
+// Display search results; moreUrl links to the full list when only the first matches came back
+function displayResults(pets, moreUrl) {
     var grid = document.querySelector('.pets-grid');
     if (!grid) return;
     
@@ -89,6 +90,9 @@ function displayResults(pets) {
                 '</div>' +
                 '</div>';
     }
+    if (moreUrl) {
+        html += '<p><a href="' + moreUrl + '" class="btn">See all results</a></p>';
+    }
     
     grid.innerHTML = html;
 }
@@ -105,3 +109,50 @@ function initDelete() {
         });
     });
 }
+
+// Suggest existing breeds while typing, so pets are not filed under near-duplicates
+function initBreedAutocomplete() {
+    var inputs = document.querySelectorAll('input[data-autocomplete-url]');
+    inputs.forEach(function(input) {
+        var listId = input.getAttribute('list');
+        var datalist = document.getElementById(listId);
+        if (!datalist) {
+            datalist = document.createElement('datalist');
+            datalist.id = listId;
+            input.parentNode.appendChild(datalist);
+        }
+        var timer = null;
+        
+        input.addEventListener('input', function() {
+            clearTimeout(timer);
+            var query = input.value.trim();
+            if (query.length < 1) return;
+            timer = setTimeout(function() {
+                fetchBreeds(input.getAttribute('data-autocomplete-url'), query, datalist);
+            }, 150);
+        });
+    });
+}
+
+function fetchBreeds(url, query, datalist) {
+    var xhr = new XMLHttpRequest();
+    xhr.open('GET', url + '?q=' + encodeURIComponent(query), true);
+    
+    xhr.onload = function() {
+        if (xhr.status === 200) {
+            try {
+                var data = JSON.parse(xhr.responseText);
+                datalist.innerHTML = '';
+                data.results.forEach(function(breed) {
+                    var option = document.createElement('option');
+                    option.value = breed.name;
+                    datalist.appendChild(option);
+                });
+            } catch(e) {
+                console.log('Error parsing response');
+            }
+        }
+    };
+    
+    xhr.send();
+}